@@ -1,173 +1,88 @@
+import uuid
 import streamlit as st
-from utils.util import format_price
-from utils.database import get_db_connection
+from utils.util import format_price, get_register_id
+from utils.catalog import get_catalog
+from utils.cart import Cart
+from utils.orders import insert_order, apply_live_cart_changes
+from utils.writer import run_write
+from utils.profiler import phase, profile_rerun
 from utils.style import load_css
 
-# Page layout
-st.set_page_config(page_title="Orders", page_icon="🗒", layout="wide", initial_sidebar_state="collapsed")
-load_css()
-
 # Initialize session state for cart
-if 'cart' not in st.session_state:
-    st.session_state.cart = []
+def init_session_state():
+    if not isinstance(st.session_state.get('cart'), Cart):
+        st.session_state.cart = Cart()
+
+    if 'order_id' not in st.session_state:
+        st.session_state.order_id = None
 
-if 'order_id' not in st.session_state:
-    st.session_state.order_id = None
+    # Idempotency key for the cart as it stands; a new one whenever the cart changes or is placed
+    if 'order_key' not in st.session_state:
+        st.session_state.order_key = uuid.uuid4().hex
 
 
 
 # --- Database Sync Logic for CFD ---
 
 def sync_live_cart():
-    """Flushes Live_Cart and inserts current session cart for CFD."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    """Upserts/deletes only the cart lines that changed since the last sync, for this register's CFD."""
+    cart = st.session_state.cart
+    with phase('dataframe'):
+        upserts, deletes = cart.changes()
+    if not upserts and not deletes:
+        return
+
     try:
-        cursor.execute("DELETE FROM Live_Cart")
-        for item in st.session_state.cart:
-            mod_text = ", ".join([m['description'] for m in item['modifiers']]) if item['modifiers'] else ""
-            cursor.execute('''
-                INSERT INTO Live_Cart (product_name, modifiers_text, quantity, unit_price, total_price)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (
-                item['product_name'],
-                mod_text,
-                item['quantity'],
-                item['price'],
-                item['price'] * item['quantity']
-            ))
-        conn.commit()
+        run_write(apply_live_cart_changes, get_register_id(), upserts, deletes)
+        cart.mark_synced(upserts, deletes)
     except Exception as e:
         st.error(f"Error syncing to CFD: {e}")
-    finally:
-        conn.close()
 
+# Menu reads come from the process-wide catalog cache (no queries per rerun)
 def get_category():
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT category_id, description FROM category WHERE status = 1 ORDER BY category_id")
-    groups = cursor.fetchall()
-    conn.close()
-    return groups
+    return get_catalog().categories
 
 def get_products(group_id):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute('''
-        SELECT product_id, description, price
-        FROM Product
-        WHERE category_id = ?
-        ORDER BY rank
-    ''', (group_id,))
-    items = cursor.fetchall()
-    conn.close()
-    return items
+    return get_catalog().products(group_id)
 
 def get_modifiers(product_id):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute('''
-        SELECT
-            m.modifier_id,
-            m.description,
-            m.modifier_type_id,
-            m.price,
-            mt.description as group_description
-        FROM Modifier m
-        LEFT JOIN Modifier_Type mt ON m.modifier_type_id = mt.modifier_type_id
-        WHERE m.product_id = ? AND m.status = 1
-        ORDER BY m.modifier_type_id, m.modifier_id
-    ''', (product_id,))
-    modifiers = cursor.fetchall()
-    conn.close()
-
-    modifier_groups = {}
-    for mod_id, description, group_id, price, group_desc in modifiers:
-        if group_id not in modifier_groups:
-            modifier_groups[group_id] = {
-                'group_description': group_desc,
-                'modifiers': []
-            }
-        modifier_groups[group_id]['modifiers'].append({
-            'modifier_id':      mod_id,
-            'description':      description,
-            'price':            price,
-            'modifier_type_id': group_id
-        })
-    return modifier_groups
+    return get_catalog().modifier_groups(product_id)
 
 def get_modifier_type_items(modifier_type_id):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute('''
-        SELECT description
-        FROM Modifier_Type_Item
-        WHERE modifier_type_id = ?
-        ORDER BY rowid
-    ''', (modifier_type_id,))
-    items = [row[0] for row in cursor.fetchall()]
-    conn.close()
-    return items
+    return get_catalog().type_items(modifier_type_id)
 
 def add_to_cart(product_id, product_name, price, modifiers):
-    sorted_modifiers = sorted(modifiers, key=lambda x: x['modifier_id']) if modifiers else []
-    for item in st.session_state.cart:
-        item_modifiers = sorted(item['modifiers'], key=lambda x: x['modifier_id']) if item['modifiers'] else []
-        if item['product_id'] == product_id and item_modifiers == sorted_modifiers:
-            item['quantity'] += 1
-            return
-    modifier_price = sum(mod['price'] for mod in modifiers) if modifiers else 0
-    total_price = price + modifier_price
-    st.session_state.cart.append({
-        'product_id': product_id,
-        'product_name': product_name,
-        'base_price': price,
-        'price': total_price,
-        'modifiers': sorted_modifiers,
-        'quantity': 1
-    })
+    st.session_state.order_key = uuid.uuid4().hex
+    st.session_state.cart.add(product_id, product_name, price, modifiers)
     sync_live_cart()
 
 def update_quantity(index, delta):
-    if 0 <= index < len(st.session_state.cart):
-        st.session_state.cart[index]['quantity'] += delta
-        if st.session_state.cart[index]['quantity'] <= 0:
-            st.session_state.cart.pop(index)
+    st.session_state.order_key = uuid.uuid4().hex
+    st.session_state.cart.change_quantity(index, delta)
     sync_live_cart()
 
-def calculate_subtotal():
-    return sum(item['price'] * item['quantity'] for item in st.session_state.cart)
-
 def create_order():
     if not st.session_state.cart:
         return False
-    conn = get_db_connection()
-    cursor = conn.cursor()
     try:
-        cursor.execute('''
-            INSERT INTO Order_Cart (service_area_id, order_status, username, provided_name, note)
-            VALUES (0, 10, ?, ?, ?)
-        ''', (st.session_state.get('username'), st.session_state.provided_name, st.session_state.note))
-        order_id = cursor.lastrowid
+        order_id = run_write(
+            insert_order,
+            st.session_state.get('username'),
+            st.session_state.provided_name,
+            st.session_state.note,
+            st.session_state.cart.order_items(),
+            idempotency_key=st.session_state.order_key,
+        )
         st.session_state.order_id = order_id
-        for item in st.session_state.cart:
-            modifier_ids = ','.join(str(mod['modifier_id']) for mod in item['modifiers']) if item['modifiers'] else None
-            cursor.execute('''
-                INSERT INTO Order_Product (order_id, product_id, modifiers, product_quantity)
-                VALUES (?, ?, ?, ?)
-            ''', (order_id, item['product_id'], modifier_ids, item['quantity']))
-        conn.commit()
-        st.session_state.cart = []
+        st.session_state.order_key = uuid.uuid4().hex
+        st.session_state.cart.clear()
         st.session_state.provided_name = ''
         st.session_state.note = ''
         sync_live_cart()
         return True
     except Exception as e:
-        conn.rollback()
         st.error(f"Error creating order: {e}")
         return False
-    finally:
-        conn.close()
 
 
 @st.dialog("Customize Your Order")
@@ -237,7 +152,7 @@ def show_modifier_dialog():
                             if mod_type == 1:
                                 key = f"dialog_check_{product_id}_{mod_id}"
                                 if st.session_state.get(key, False):
-                                    selected_modifiers.append(modifier)
+                                    selected_modifiers.append(dict(modifier))
                             else:
                                 key      = f"dialog_select_{product_id}_{mod_id}"
                                 selected = st.session_state.get(key, "None")
@@ -264,12 +179,11 @@ def show_order_page():
                         cart_col1, cart_col2, cart_col3 = st.columns([3, 2, 2])
 
                         with cart_col1:
-                            st.write(f"**{item['product_name']}**")
-                            st.caption(f"Base: {format_price(item['base_price'])}")
-                            if item['modifiers']:
-                                for modifier in item['modifiers']:
-                                    mp = f" (+{format_price(modifier['price'])})" if modifier['price'] > 0 else ""
-                                    st.caption(f"• {modifier['description']}{mp}")
+                            st.write(f"**{item.product_name}**")
+                            st.caption(f"Base: {format_price(item.base_price)}")
+                            for _, description, mod_price in item.modifiers:
+                                mp = f" (+{format_price(mod_price)})" if mod_price > 0 else ""
+                                st.caption(f"• {description}{mp}")
 
                         with cart_col2:
                             dec_col, qty_col, inc_col = st.columns([1, 1, 1])
@@ -279,7 +193,7 @@ def show_order_page():
                                     st.rerun()
                             with qty_col:
                                 st.markdown(
-                                    f"<div style='text-align:center; font-size:16px;'>{item['quantity']}</div>",
+                                    f"<div style='text-align:center; font-size:16px;'>{item.quantity}</div>",
                                     unsafe_allow_html=True
                                 )
                             with inc_col:
@@ -288,7 +202,7 @@ def show_order_page():
                                     st.rerun()
 
                         with cart_col3:
-                            st.write(format_price(item['price'] * item['quantity']))
+                            st.write(format_price(item.total))
 
                         st.divider()
             else:
@@ -304,8 +218,7 @@ def show_order_page():
         with col2:
             st.session_state.note = st.text_input("Special request? 👋")
 
-        subtotal = calculate_subtotal()
-        st.write(f"Subtotal: {format_price(subtotal)}")
+        st.write(f"Subtotal: {format_price(st.session_state.cart.subtotal)}")
 
         checkout_disabled = len(st.session_state.cart) == 0
         if st.button("Checkout", type="primary", use_container_width=True, disabled=checkout_disabled):
@@ -354,4 +267,9 @@ def show_order_page():
 
 # Run the page
 if __name__ == "__main__":
-    show_order_page()
+    # The whole run is timed: page setup and session state as well as the page itself
+    with profile_rerun("10_Order"):
+        st.set_page_config(page_title="Orders", page_icon="🗒", layout="wide", initial_sidebar_state="collapsed")
+        load_css()
+        init_session_state()
+        show_order_page()
@@ -1,21 +1,26 @@
 import streamlit as st
 import pandas as pd
-from utils.util import format_price
-from utils.database import get_db_connection
+from utils.util import format_price, get_register_id
+from utils.database import get_db_connection, get_order_details, load_if_changed
+from utils.pricing import price_orders, price_cart, format_rate
+from utils.catalog import get_catalog
 from utils.style import load_css
+from utils.events import (subscribe_rerun, LIVE_CART_CHANGED, ORDER_CREATED, ORDER_UPDATED, ORDER_REMOVED,
+                          ORDER_PAID)
 from streamlit_autorefresh import st_autorefresh
 
 
 # ── Data fetchers ────────────────────────────────────────────────────────────
 
-def get_live_cart_data():
-    """Fetch rows from Live_Cart (used by the POS live display)."""
+def get_live_cart_data(register_id):
+    """Fetch one register's rows from Live_Cart (used by the POS live display)."""
     try:
         conn = get_db_connection()
         cursor = conn.cursor()
         cursor.execute(
-            "SELECT product_name, modifiers_text, quantity, unit_price, total_price "
-            "FROM Live_Cart"
+            "SELECT product_name, modifiers_text, quantity, unit_price, total_price, line_key "
+            "FROM Live_Cart WHERE session_id = ? ORDER BY rowid",
+            (register_id,)
         )
         rows = cursor.fetchall()
         conn.close()
@@ -24,73 +29,28 @@ def get_live_cart_data():
         return []
 
 
-def get_modifiers_details(modifier_ids):
-    """Return a list of modifier dicts given a modifier id string/list."""
-    if not modifier_ids:
-        return []
-    try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        # modifier_ids may be a comma-separated string or already a list
-        if isinstance(modifier_ids, str):
-            ids = [m.strip() for m in modifier_ids.split(",") if m.strip()]
-        else:
-            ids = list(modifier_ids)
-        if not ids:
-            return []
-        placeholders = ",".join("?" * len(ids))
-        cursor.execute(
-            f"SELECT description, price FROM Modifier WHERE modifier_id IN ({placeholders})",
-            ids,
-        )
-        rows = cursor.fetchall()
-        conn.close()
-        return [{"description": r[0], "price": r[1]} for r in rows]
-    except Exception:
-        return []
-
-
-def get_order_details():
-    """Fetch the active order from Order_Cart / Order_Product (order_status = 10)."""
-    try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT
-                oc.order_id,
-                oc.subtotal,
-                op.product_id,
-                op.modifiers,
-                pi.description  AS product_description,
-                op.product_quantity,
-                pi.price        AS product_price,
-                pi.tax          AS tax
-            FROM Order_Cart oc
-            LEFT JOIN Order_Product op ON oc.order_id = op.order_id
-            LEFT JOIN Product pi       ON op.product_id = pi.product_id
-            WHERE oc.order_status = 10
-            ORDER BY oc.order_id, pi.description
-        """)
-        columns = [col[0] for col in cursor.description]
-        rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
-        conn.close()
-        return rows
-    except Exception:
-        return []
+# ── Display helpers ──────────────────────────────────────────────────────────
 
+def _show_totals(totals, style="### {}"):
+    """Subtotal, one column per tax rate, total."""
+    cols = st.columns(2 + len(totals['tax_by_rate']))
+    cols[0].markdown(style.format(f"Subtotal: {format_price(totals['subtotal'])}"))
+    for col, (units, tax) in zip(cols[1:], totals['tax_by_rate'].items()):
+        col.markdown(style.format(f"Tax ({format_rate(units)}): {format_price(tax)}"))
+    cols[-1].markdown(style.format(f"Total: {format_price(totals['total'])}"))
 
-# ── Display helpers ──────────────────────────────────────────────────────────
 
-DEFAULT_TAX_RATE = 4.712
+def _product_id(line_key):
+    product_id = (line_key or '').split('|', 1)[0]
+    return int(product_id) if product_id.isdigit() else None
 
 
 def _display_from_live_cart(rows):
     """Render the CFD from Live_Cart data."""
     table_data = []
-    subtotal = 0
 
     for row in rows:
-        name, mods, qty, unit_p, total_p = row
+        name, mods, qty, unit_p, total_p, line_key = row
         description = name
         if mods:
             description += f"\n  └─ {mods}"
@@ -99,70 +59,33 @@ def _display_from_live_cart(rows):
             "Qty": qty,
             "Price": format_price(total_p),
         })
-        subtotal += total_p
 
-    tax_amount = subtotal * (DEFAULT_TAX_RATE / 100)
-    total = subtotal + tax_amount
+    # Each line at its product's rate, as checkout will charge it; the line key
+    # starts with the product_id (utils.cart.CartLine)
+    catalog = get_catalog()
+    totals = price_cart([(row[4], catalog.tax_rate(_product_id(row[5]))) for row in rows])
 
     # st.subheader("Current Order")
     df = pd.DataFrame(table_data)
     st.table(df)
 
     st.divider()
-    col1, col2, col3 = st.columns(3)
-    col1.markdown(f"### Subtotal: {format_price(subtotal)}")
-    col2.markdown(f"### Tax ({DEFAULT_TAX_RATE}%): {format_price(tax_amount)}")
-    col3.markdown(f"### Total: {format_price(total)}")
+    _show_totals(totals)
 
 
 def _display_from_order_details(order_data):
     """Render the CFD from Order_Cart / Order_Product data."""
-    orders = {}
-    subtotal = 0
-    tax_amount = 0
-
-    for row in order_data:
-        order_id = row["order_id"]
-        if order_id not in orders:
-            orders[order_id] = []
-
-        if row.get("product_id"):
-            modifiers = get_modifiers_details(row.get("modifiers"))
-            modifier_total_price = sum(mod["price"] for mod in modifiers)
-            item_total = (row["product_price"] + modifier_total_price) * row["product_quantity"]
-
-            try:
-                tax_rate = row["tax"] if row["tax"] is not None else DEFAULT_TAX_RATE
-            except (KeyError, TypeError):
-                tax_rate = DEFAULT_TAX_RATE
-
-            item_tax = item_total * (tax_rate / 100)
-
-            orders[order_id].append({
-                "description": row["product_description"],
-                "quantity": row["product_quantity"],
-                "base_price": row["product_price"],
-                "modifiers": modifiers,
-                "modifier_total": modifier_total_price,
-                "item_total": item_total,
-                "tax_rate": tax_rate,
-                "item_tax": item_tax,
-            })
-
-            subtotal += item_total
-            tax_amount += item_tax
-
-    total = subtotal + tax_amount
+    orders, totals = price_orders(order_data)
 
     # st.subheader(f'Order: {", ".join(str(k) for k in orders.keys())}')
 
     table_data = []
-    for order_id, items in orders.items():
-        for item in items:
+    for order in orders.values():
+        for item in order["items"]:
             description = item["description"]
             if item["modifiers"]:
                 modifier_text = ", ".join(
-                    f"{mod['description']} (+{format_price(mod['price'])})"
+                    f"{mod['description']} (+{format_price(mod['price'] or 0)})"
                     for mod in item["modifiers"]
                 )
                 description += f"\n  └─ {modifier_text}"
@@ -179,14 +102,7 @@ def _display_from_order_details(order_data):
         with st.container(height=500, border=True):
             st.dataframe(df.set_index(df.columns[0]), width='stretch')
 
-        display_tax_rate = orders[list(orders.keys())[-1]][-1]["tax_rate"]
-        col1, col2, col3 = st.columns(3)
-        with col1:
-            st.markdown(f"**Subtotal: {format_price(subtotal)}**")
-        with col2:
-            st.markdown(f"**Tax ({display_tax_rate:.3f}%): {format_price(tax_amount)}**")
-        with col3:
-            st.markdown(f"**Total: {format_price(total)}**")
+        _show_totals(totals, style="**{}**")
     else:
         st.info("No items to display in the order.")
 
@@ -204,14 +120,18 @@ def display_cfd():
 
     with st.container(height=600, border=True):
 
+        # Only re-query when the live cart or an order has changed since the last tick
+        register_id = get_register_id()
+        live_rows, order_data = load_if_changed(
+            'cfd_data', ['live_cart', 'orders'], lambda: (get_live_cart_data(register_id), get_order_details())
+        )
+
         # 1. Try Live_Cart first
-        live_rows = get_live_cart_data()
         if live_rows:
             _display_from_live_cart(live_rows)
             return
 
         # 2. Fall back to Order_Cart / Order_Product
-        order_data = get_order_details()
         if order_data:
             _display_from_order_details(order_data)
             return
@@ -221,6 +141,9 @@ def display_cfd():
 
 
 if __name__ == "__main__":
-    st_autorefresh(interval=1000, limit=None, key="cfd_refresh")
+    # Cart changes are pushed; the slow refresh only catches writes from other processes
+    subscribe_rerun([LIVE_CART_CHANGED, ORDER_CREATED, ORDER_UPDATED, ORDER_REMOVED, ORDER_PAID],
+                    register_id=get_register_id())
+    st_autorefresh(interval=30 * 1000, limit=None, key="cfd_refresh")
     display_cfd()
  
\ No newline at end of file
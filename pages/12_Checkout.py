@@ -1,49 +1,48 @@
 import streamlit as st
 import pandas as pd
-from utils.util import format_price, calculate_split_amounts, print_receipt
-from utils.database import get_db_connection, get_order_details, get_modifiers_details
+from utils.util import format_price, calculate_split_amounts, print_receipt, get_register_id
+from utils.database import get_order_details
+from utils.pricing import price_orders, format_rate
+from utils.orders import clear_live_cart, delete_order, settle_orders, set_line_price
+from utils.cart import Cart
+from utils.writer import run_write
+from utils.printing import get_print_status, DONE, FAILED
+from utils.routing import dispatch_tickets
+from utils.events import subscribe_rerun, ORDER_UPDATED, PRINT_JOB_UPDATED
+from utils.profiler import phase, profile_rerun
 from utils.style import load_css 
 
-st.set_page_config(page_title="Checkout", page_icon="💳", layout="wide", initial_sidebar_state="collapsed")
-load_css()
-
 def remove_item_from_db(order_id):
     """Helper to remove a specific item from the order in the database"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
     try:
-        cursor.execute("""
-            DELETE FROM Order_Cart 
-            WHERE order_id = ?
-        """, (order_id,))
-        conn.commit()
+        run_write(delete_order, order_id)
         return True
     except Exception as e:
         st.error(f"Error removing item: {e}")
         return False
-    finally:
-        conn.close()
 
-def settle_order(order_ids, total):
-    conn = get_db_connection()
-    cursor = conn.cursor()
+def settle_order(totals):
     try:
-        for order_id in order_ids:
-            cursor.execute("""
-                UPDATE Order_Cart 
-                SET order_status = 11, total = ?
-                WHERE order_id = ?
-            """, (total, order_id))
-        conn.commit()
-        return True
+        settled = run_write(settle_orders, totals)
     except Exception as e:
         st.error(f"Error settling order: {e}")
         return False
-    finally:
-        conn.close()
+    if not settled:
+        # Already paid, e.g. Settle tapped twice; tickets went out the first time
+        return True
+    try:
+        # Paid orders go to the kitchen stations' printers
+        dispatch_tickets(settled)
+    except Exception as e:
+        st.warning(f"Order settled, but kitchen tickets were not sent: {e}")
+    return True
+
+def is_dummy(item):
+    """The open-priced 'dummy' product, priced by hand at checkout."""
+    return str(item['description']).strip().lower() == 'dummy'
 
-def set_dummy_price(new_price=0):
-    """Update the price of the 'dummy' product with the current input value."""
+def set_dummy_price(order_product_id):
+    """Price the 'dummy' line with the current input value."""
     if not st.session_state.current_input:
         st.warning("Please enter a price first using the number pad.")
         return False
@@ -54,41 +53,31 @@ def set_dummy_price(new_price=0):
         st.error("Invalid price input.")
         return False
 
-    conn = get_db_connection()
-    cursor = conn.cursor()
     try:
-        cursor.execute("""
-            UPDATE Product
-            SET price = ?
-            WHERE description = 'dummy'
-        """, (new_price,))
-        conn.commit()
+        run_write(set_line_price, order_product_id, new_price)
         st.success(f"Dummy price updated to {format_price(new_price)}")
         st.session_state.current_input = ""
         return True
     except Exception as e:
         st.error(f"Error setting dummy price: {e}")
         return False
-    finally:
-        conn.close()
 
-def clear_dummy_price():
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    try:
-        cursor.execute("""
-            UPDATE Product
-            SET price = 0
-            WHERE description = 'dummy'
-        """)
-        conn.commit()
-        st.success(f"Dummy price cleared.")
-        return True
-    except Exception as e:
-        st.error(f"Error clearing dummy price: {e}")
-        return False
-    finally:
-        conn.close()
+def show_print_status():
+    """Status of the last receipt sent from this register; reruns as it changes."""
+    job_id = st.session_state.get("print_job_id")
+    if not job_id:
+        return
+    job = get_print_status(job_id)
+    if job is None:
+        return
+    if job['status'] == DONE:
+        st.success("Receipt printed.")
+    elif job['status'] == FAILED:
+        st.error(f"Receipt failed to print: {job['error']}")
+    elif job['attempts'] > 1 or job['error']:
+        st.warning(f"Printer not responding, retrying (attempt {job['attempts']})...")
+    else:
+        st.info("Printing...")
 
 def handle_calculator_input(value):
     if value == "delete":
@@ -114,18 +103,19 @@ def initialize_session_state():
         st.session_state.split_count = 1
 
 def clear_live_cart_data():
-    """Clear all rows from Live_Cart."""
+    """Clear this register's rows from Live_Cart."""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM Live_Cart")
-        conn.commit()
-        conn.close()
+        run_write(clear_live_cart, get_register_id())
+        if isinstance(st.session_state.get('cart'), Cart):
+            st.session_state.cart.resync()
     except Exception as e:
         st.error(f"Error clearing Live_Cart: {e}")
 
 def show_checkout_page():
     initialize_session_state()
+    register_id = get_register_id()
+    # Print status arrives from the spooler thread; rerun to show it
+    subscribe_rerun([ORDER_UPDATED, PRINT_JOB_UPDATED], register_id=register_id)
 
     col1, col2, col3 = st.columns([3, 1, 1])
 
@@ -138,52 +128,15 @@ def show_checkout_page():
                 st.switch_page("pages/10_Order.py")
             return
 
-        orders = {}
-        subtotal = 0
-        tax_amount = 0
-        has_dummy_item = False  # Track if any dummy item exists
-
-        for row in order_data:
-            order_id = row['order_id']
-            if order_id not in orders:
-                orders[order_id] = []
-
-            if row['product_id']:
-                modifiers = get_modifiers_details(row['modifiers'])
-                modifier_total_price = sum(mod['price'] for mod in modifiers)
-                item_total = (row['product_price'] + modifier_total_price) * row['product_quantity']
-
-                # Tax rate from Product table (e.g. 4.712 means 4.712%)
-                try:
-                    tax_rate = row['tax'] if row['tax'] is not None else 4.712
-                except (KeyError, IndexError):
-                    tax_rate = 4.712
-
-                item_tax = item_total * (tax_rate / 100)
-
-                is_dummy = str(row['product_description']).strip().lower() == 'dummy'
-                if is_dummy:
-                    has_dummy_item = True
-
-                orders[order_id].append({
-                    'order_id': order_id,
-                    'description': row['product_description'],
-                    'note': row['note'],
-                    'quantity': row['product_quantity'],
-                    'base_price': row['product_price'],
-                    'modifiers': modifiers,
-                    'modifier_total': modifier_total_price,
-                    'item_total': item_total,
-                    'tax_rate': tax_rate,
-                    'item_tax': item_tax,
-                    'is_dummy': is_dummy
-                })
-                subtotal += item_total
-                tax_amount += item_tax
+        # Line, tax and order totals from the prices snapshotted when the orders were placed
+        with phase('dataframe'):
+            orders, totals = price_orders(order_data)
+        subtotal = totals['subtotal']
+        balance_due = totals['total']
 
         # --- ITEMS LIST ---
         with st.container(height=500, border=True):
-            for order_id, items in orders.items():
+            for order_id, order in orders.items():
                 hdr_col1, hdr_col2 = st.columns([9, 0.9])
                 with hdr_col1:
                     st.subheader(f'Order: {order_id}')
@@ -191,7 +144,7 @@ def show_checkout_page():
                     if remove_item_from_db(order_id):
                         st.rerun()
 
-                for idx, item in enumerate(items):
+                for idx, item in enumerate(order['items']):
                     icol1, icol2, icol3, icol4 = st.columns([3, 1, 1, 1])
 
                     with icol1:
@@ -201,14 +154,14 @@ def show_checkout_page():
                                 st.caption(f"└─ {mod['description']} (+{format_price(mod['price'])})")
 
                         # Show "Set Dummy Price" button inline under the dummy item
-                        if item['is_dummy']:
+                        if is_dummy(item):
                             st.write(f"**{item['note']}**")
                             if st.button(
                                 "💲 Set Dummy Price",
                                 key=f"set_dummy_{order_id}_{idx}",
                                 type="secondary"
                             ):
-                                if set_dummy_price():
+                                if set_dummy_price(item['order_product_id']):
                                     st.rerun()
 
                     icol2.write(f"{item['quantity']}")
@@ -216,14 +169,9 @@ def show_checkout_page():
                     icol4.write(format_price(item['item_total']))
 
         # Payment Summary Section
-        display_tax_rate = orders[list(orders.keys())[-1]][-1]['tax_rate']
-        balance_due = subtotal + tax_amount
-
-        payment_items = [
-            ("Subtotal", subtotal),
-            (f"Tax ({display_tax_rate:.3f}%)", tax_amount),
-            ("Total", balance_due)
-        ]
+        payment_items = [("Subtotal", subtotal)]
+        payment_items += [(f"Tax ({format_rate(units)})", tax) for units, tax in totals['tax_by_rate'].items()]
+        payment_items.append(("Total", balance_due))
 
         for label, amount in payment_items:
             st.markdown(f"""
@@ -300,9 +248,8 @@ def show_checkout_page():
             st.markdown("---")
 
         if st.button("Settle", key="settle", width='stretch', type="primary"):
-            if settle_order(list(orders.keys()), balance_due):
+            if settle_order({order_id: order['total'] for order_id, order in orders.items()}):
                 clear_live_cart_data()
-                clear_dummy_price()  # Reset dummy price to 0  
                 st.session_state.amount_tendered = 0
                 st.session_state.current_input = ""
                 st.session_state.split_count = 1
@@ -310,8 +257,15 @@ def show_checkout_page():
                 st.switch_page("pages/10_Order.py")
 
         if st.button("Print Receipt", key="receipt", width='stretch'):
-            if print_receipt(orders, subtotal, tax_amount):
-                st.success("Printing...")
+            job_id = print_receipt(orders, totals, register_id=register_id)
+            if job_id:
+                st.session_state.print_job_id = job_id
+
+        show_print_status()
 
 if __name__ == "__main__":
-    show_checkout_page()
\ No newline at end of file
+    # The whole run is timed: page setup as well as the page itself
+    with profile_rerun("12_Checkout"):
+        st.set_page_config(page_title="Checkout", page_icon="💳", layout="wide", initial_sidebar_state="collapsed")
+        load_css()
+        show_checkout_page()
\ No newline at end of file
@@ -2,7 +2,12 @@ import streamlit as st
 import pandas as pd
 import time
 from utils.util import format_price, play_background_audio
-from utils.database import get_db_connection 
+from utils.database import get_db_connection, get_kitchen_board, load_if_changed
+from utils.catalog import get_catalog
+from utils.routing import split_order
+from utils.order_state import advance, confirm_station, READY
+from utils.writer import run_write
+from utils.events import subscribe_rerun, ORDER_PAID, ORDER_CONFIRMED, ORDER_REMOVED
 from utils.style import load_css 
 from streamlit_autorefresh import st_autorefresh
 
@@ -16,91 +21,15 @@ def init_session_state():
     if 'known_orders' not in st.session_state:
         st.session_state.known_orders = set()
 
-# Get all open orders (order_status = 11)
-def get_open_orders():
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT DISTINCT 
-            oc.order_id,
-            oc.note,                   
-            oc.order_status,
-            oc.created_at
-        FROM Order_Cart oc
-        INNER JOIN Order_Product op ON oc.order_id = op.order_id
-        WHERE oc.order_status = 11
-        ORDER BY oc.created_at ASC
-    """)
-    orders = cursor.fetchall()
-    conn.close()
-    return orders
-
-# Get modifier names
-def get_modifier_names(modifier_ids_str):
-    if not modifier_ids_str or modifier_ids_str.strip() == '':
-        return None
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    try:
-        modifier_ids = [id.strip() for id in modifier_ids_str.split(',') if id.strip()]
-        if not modifier_ids:
-            return None
-        placeholders = ','.join(['?' for _ in modifier_ids])
-        cursor.execute(f"""
-            SELECT description
-            FROM Modifier
-            WHERE modifier_id IN ({placeholders})
-            AND status = 1
-            ORDER BY modifier_id
-        """, modifier_ids)
-        modifiers = cursor.fetchall()
-        if modifiers:
-            return ', '.join([mod['description'] for mod in modifiers])
-        return None
-    except Exception as e:
-        print(f"Error getting modifier names: {e}")
-        return None
-    finally:
-        conn.close()
-
-# Get order items
-def get_order_items(order_id):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT 
-            op.order_id,
-            op.product_id,
-            op.modifiers,
-            pi.description as product_name,
-            op.product_quantity
-        FROM Order_Product op
-        INNER JOIN Order_Cart oc ON op.order_id = oc.order_id
-        INNER JOIN Product pi ON op.product_id = pi.product_id
-        WHERE op.order_id = ? AND oc.order_status = 11
-        ORDER BY pi.description
-    """, (order_id,))
-    items = cursor.fetchall()
-    conn.close()
-
-    processed_items = []
-    for item in items:
-        item_dict = dict(item)
-        item_dict['modifier_names'] = get_modifier_names(item['modifiers'])
-        processed_items.append(item_dict)
-    return processed_items
-
-# Confirm order
-def confirm_order(order_id):
-    conn = get_db_connection()
-    cursor = conn.cursor()
+# Confirm order; on a station screen only the station's part (the order is ready
+# once every station it is routed to has confirmed)
+def confirm_order(order, workcenter_id=None):
+    order_id = order['order_id']
     try:
-        cursor.execute("""
-            UPDATE Order_Cart 
-            SET order_status = 12 
-            WHERE order_id = ?
-        """, (order_id,))
-        conn.commit()
+        if workcenter_id is None:
+            run_write(advance, [order_id], READY)
+        else:
+            run_write(confirm_station, order_id, workcenter_id, order['stations'])
         keys_to_remove = [key for key in st.session_state.item_states.keys() 
                          if key.startswith(f"{order_id}_")]
         for key in keys_to_remove:
@@ -109,8 +38,40 @@ def confirm_order(order_id):
     except Exception as e:
         st.error(f"Error confirming order: {e}")
         return False
+
+# Station this screen is bound to (?workcenter=2); None shows every station
+def get_workcenter_id(catalog):
+    workcenter_id = st.query_params.get("workcenter")
+    if workcenter_id is None:
+        return None
+    if not workcenter_id.isdigit() or int(workcenter_id) not in catalog.workcenters:
+        st.warning(f"Unknown workcenter {workcenter_id}; showing all stations.")
+        return None
+    return int(workcenter_id)
+
+# Orders among order_ids whose part the station has already confirmed
+def get_station_confirmed(workcenter_id, order_ids):
+    if not order_ids:
+        return set()
+    conn = get_db_connection()
+    try:
+        rows = conn.execute(f"""
+            SELECT order_id FROM Order_Station_Ready
+            WHERE workcenter_id = ? AND order_id IN ({','.join('?' for _ in order_ids)})
+        """, [workcenter_id, *order_ids]).fetchall()
     finally:
         conn.close()
+    return {row[0] for row in rows}
+
+# Keep only the orders with items routed to the station that it hasn't confirmed yet,
+# with only those items, and note every station each order is routed to
+def filter_station(orders, catalog, workcenter_id, confirmed):
+    station_orders = []
+    for order in orders:
+        tickets = split_order(order, catalog)
+        if order['order_id'] not in confirmed and tickets.get(workcenter_id):
+            station_orders.append(dict(order, items=tickets[workcenter_id], stations=sorted(tickets)))
+    return station_orders
 
 # Create unique item key
 def create_item_key(order_id, product_id, modifiers, index):
@@ -118,7 +79,7 @@ def create_item_key(order_id, product_id, modifiers, index):
     return f"{order_id}_{product_id}_{modifier_part}_{index}"
 
 # Display order
-def display_order_with_checkboxes(order, items):
+def display_order_with_checkboxes(order, items, workcenter_id=None):
     st.subheader(f'Order: {order["order_id"]%100}')
     if order['note'] and str(order['note']).strip():
         st.info(f"📝 Note: {order['note']}")
@@ -160,7 +121,7 @@ def display_order_with_checkboxes(order, items):
         </style>
         """, unsafe_allow_html=True)
     if st.button(button_text, key=f"confirm_{order['order_id']}", disabled=button_disabled, width='stretch', type=button_type):
-        if confirm_order(order['order_id']):
+        if confirm_order(order, workcenter_id):
             st.success(f"Order {order['order_id']} confirmed!")
             st.rerun()
 
@@ -168,7 +129,18 @@ def display_order_with_checkboxes(order, items):
 def show_kds_page():
 
     init_session_state()
-    orders = get_open_orders()
+    # Only re-query the board when an order has changed since the last tick
+    orders = load_if_changed('kds_board', ['orders'], get_kitchen_board)
+
+    catalog = get_catalog()
+    workcenter_id = get_workcenter_id(catalog)
+    if workcenter_id is not None:
+        st.caption(f"Station: {catalog.workcenters[workcenter_id][0]}")
+        confirmed = load_if_changed(
+            f'kds_station_{workcenter_id}', ['orders'],
+            lambda: get_station_confirmed(workcenter_id, [order['order_id'] for order in orders])
+        )
+        orders = filter_station(orders, catalog, workcenter_id, confirmed)
 
     # Detect new orders
     current_order_ids = {order['order_id'] for order in orders}
@@ -186,14 +158,14 @@ def show_kds_page():
     for i, order in enumerate(orders):
         col_index = i % 3
         with cols[col_index]:
-            items = get_order_items(order['order_id'])
-            if items:
-                display_order_with_checkboxes(order, items)
+            display_order_with_checkboxes(order, order['items'], workcenter_id)
 
     st.markdown("---")
     st.write("Last updated:", time.strftime("%Y-%m-%d %H:%M:%S"))
 
 # Run the page
 if __name__ == "__main__":
-    st_autorefresh(interval=2000, limit=None, key="refresh")
+    # New tickets are pushed; the slow refresh only catches writes from other processes
+    subscribe_rerun([ORDER_PAID, ORDER_CONFIRMED, ORDER_REMOVED])
+    st_autorefresh(interval=30 * 1000, limit=None, key="refresh")
     show_kds_page()
@@ -2,57 +2,14 @@ import streamlit as st
 import pandas as pd
 import time
 from utils.util import format_price
-from utils.database import  get_db_connection 
+from utils.database import get_kitchen_board, load_if_changed
+from utils.events import subscribe_rerun, ORDER_PAID, ORDER_CONFIRMED, ORDER_DELIVERED, ORDER_REMOVED
 from utils.style import load_css 
 from streamlit_autorefresh import st_autorefresh
 
 st.set_page_config(page_title="Customer-Facing Display",page_icon="🍳",layout="wide",initial_sidebar_state="collapsed")
 load_css()
 
-# Get orders by status
-def get_orders_by_status(status):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    cursor.execute("""
-        SELECT DISTINCT 
-            oc.order_id,
-            oc.service_area_id,
-            oc.order_status,
-            oc.provided_name,
-            oc.created_at
-        FROM Order_Cart oc
-        INNER JOIN Order_Product op ON oc.order_id = op.order_id
-        WHERE oc.order_status = ? 
-        ORDER BY oc.created_at ASC
-    """, (status,))
-    
-    orders = cursor.fetchall()
-    conn.close()
-    return orders
-
-# Get order items for a specific order
-def get_order_items(order_id, status):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    cursor.execute("""
-        SELECT 
-            op.order_id,
-            op.product_id,
-            pi.description as product_name,
-            op.product_quantity
-        FROM Order_Product op
-        INNER JOIN Order_Cart oc ON op.order_id = oc.order_id
-        INNER JOIN Product pi ON op.product_id = pi.product_id
-        WHERE op.order_id = ? AND oc.order_status = ? 
-        ORDER BY pi.description
-    """, (order_id, status))
-    
-    items = cursor.fetchall()
-    conn.close()
-    return items
-
 # Display orders in a column
 def display_orders_column(orders, status, title):
     st.subheader(title)
@@ -68,8 +25,7 @@ def display_orders_column(orders, status, title):
         col_index = i % 2
         
         with sub_cols[col_index]:
-            # Get items for this order
-            items = get_order_items(order['order_id'],status)
+            items = order['items']
             
             if items:  # Only display if order has items
                 with st.container():
@@ -85,19 +41,22 @@ def display_orders_column(orders, status, title):
 # Main CFD page
 def show_cod_page():
     
+    # Only re-query when an order has changed since the last tick
+    prep_orders, ready_orders = load_if_changed(
+        'cod_board', ['orders'], lambda: (get_kitchen_board(11), get_kitchen_board(12))
+    )
+
     # Create two main columns
     left_col, right_col = st.columns(2)
     
     # Left column: In Preparation (status 12 confirmed)
     with left_col:
         st.markdown("### 🍳 In Preparation")
-        prep_orders = get_orders_by_status(11)
         display_orders_column(prep_orders, 11, "")
     
     # Right column: Ready for Pickup (status 13 delivered)
     with right_col:
         st.markdown("### 🛍️ Ready for Pickup")
-        ready_orders = get_orders_by_status(12)
         display_orders_column(ready_orders, 12, "")
     
     # Footer with last updated time
@@ -106,6 +65,7 @@ def show_cod_page():
 
 # Run the page
 if __name__ == "__main__":
-    # Uncomment to enable auto-refresh every 10 seconds
-    st_autorefresh(interval=2000, limit=None, key="refresh")
+    # Status changes are pushed; the slow refresh only catches writes from other processes
+    subscribe_rerun([ORDER_PAID, ORDER_CONFIRMED, ORDER_DELIVERED, ORDER_REMOVED])
+    st_autorefresh(interval=30 * 1000, limit=None, key="refresh")
     show_cod_page()
\ No newline at end of file
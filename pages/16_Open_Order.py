@@ -3,47 +3,91 @@ import sqlite3
 import pandas as pd
 from datetime import datetime, date, timedelta
 from utils.util import format_price, format_timestamp
-from utils.database import  get_db_connection
+from utils.database import get_db_connection, date_bounds
+from utils.archive import history_sources, history_tables
+from utils.paging import page_cursor, page_controls, last_key, seek_union
 from utils.style import load_css 
 
 # Page configuration
 st.set_page_config(page_title="On Hold History", page_icon="📑", layout="wide")
 
-def get_transaction_data(start_date, end_date):
-    """Fetch transaction data for the selected date range"""
+# Newest first; a page is the next history entries (an order reaching a status,
+# with all its lines) after the previous page's last (timestamp, order_id)
+KEY_COLUMNS = ['timestamp', 'order_id']
+FIRST_KEY = ('9999-12-31', 0)
+
+# Page keys from each source of history entries, each seeking past the cursor on
+# its own timestamp index (utils.paging.seek_union). {Order_History} is the hot
+# table and then each attached archive.
+HISTORY_KEYS = """
+    SELECT timestamp, order_id FROM {Order_History}
+    WHERE timestamp >= :start AND timestamp < :end AND timestamp <= :after_timestamp
+        AND (timestamp, order_id) < (:after_timestamp, :after_order_id)
+    ORDER BY timestamp DESC, order_id DESC
+    LIMIT :limit
+"""
+# kitchen and delivery moves are only logged in Order_Event
+EVENT_KEYS = """
+    SELECT timestamp, order_id FROM Order_Event
+    WHERE to_status IN (12, 13) AND timestamp >= :start AND timestamp < :end AND timestamp <= :after_timestamp
+        AND (timestamp, order_id) < (:after_timestamp, :after_order_id)
+    ORDER BY timestamp DESC, order_id DESC
+    LIMIT :limit
+"""
+
+def get_transaction_data(start_date, end_date, after=FIRST_KEY, limit=25):
+    """Fetch one page of transactions for the selected date range: the lines of
+    the `limit` history entries after `after` (a KEY_COLUMNS tuple), newest first"""
     conn = get_db_connection()
     if not conn:
         return pd.DataFrame()
     
     try:
-        query = """
-        SELECT 
-            oh.order_id,
-            CASE oh.order_status
-                --WHEN 9 THEN 'on hold'
-                WHEN 10 THEN 'order created'
-                WHEN 11 THEN 'order paid & printed'
-                WHEN 12 THEN 'order confirmed by kitchen'
-                --WHEN 13 THEN 'order delivered'
-                --WHEN 33 THEN 'dummy order'
-                --ELSE 'other'
-            END AS order_status,
-            oh.username,
-            oh.timestamp,
-            -- pi.product_id,
-            pi.description as product_description,
-            pi.price,
-            op.product_quantity
-            -- op.service_area_id,
-            --(pi.price * op.product_quantity) as amount
-        FROM Order_History oh
-        LEFT JOIN Order_Product op ON oh.order_id = op.order_id
-        LEFT JOIN Product pi ON op.product_id = pi.product_id
-        WHERE DATE(oh.timestamp) BETWEEN ? AND ?
-        ORDER BY oh.timestamp DESC, oh.order_id, pi.product_id
-        """
+        with history_sources(conn, start_date, end_date) as sources:
+            history = sources['Order_History']
+            page = seek_union([HISTORY_KEYS.format(Order_History=table) for table in history] + [EVENT_KEYS],
+                              KEY_COLUMNS)
+            # The page's entries, looked up by key in each source
+            entries = " UNION ALL ".join(
+                [f"SELECT order_id, order_status, username, timestamp FROM {table} WHERE (timestamp, order_id) IN page"
+                 for table in history]
+                + ["""SELECT ev.order_id, ev.to_status, oc.username, ev.timestamp
+                      FROM Order_Event ev JOIN Order_Cart oc ON oc.order_id = ev.order_id
+                      WHERE ev.to_status IN (12, 13) AND (ev.timestamp, ev.order_id) IN page"""]
+            )
+            query = f"""
+            WITH page AS MATERIALIZED ({page})
+            SELECT 
+                oh.order_id,
+                CASE oh.order_status
+                    --WHEN 9 THEN 'on hold'
+                    WHEN 10 THEN 'order created'
+                    WHEN 11 THEN 'order paid & printed'
+                    WHEN 12 THEN 'order confirmed by kitchen'
+                    --WHEN 13 THEN 'order delivered'
+                    --WHEN 33 THEN 'dummy order'
+                    --ELSE 'other'
+                END AS order_status,
+                oh.username,
+                oh.timestamp,
+                -- pi.product_id,
+                pi.description as product_description,
+                op.unit_price + op.modifier_total as price,
+                op.product_quantity,
+                oh.order_status AS status_code,
+                COALESCE(op.order_product_id, 0) AS line_id
+                -- op.service_area_id,
+                --(pi.price * op.product_quantity) as amount
+            FROM ({entries}) oh
+            LEFT JOIN Order_Product op ON oh.order_id = op.order_id
+            LEFT JOIN Product pi ON op.product_id = pi.product_id
+            ORDER BY oh.timestamp DESC, oh.order_id DESC, oh.order_status DESC, line_id DESC
+            """
         
-        df = pd.read_sql_query(query, conn, params=(start_date, end_date))
+            start, end = date_bounds(start_date, end_date)
+            params = {'start': start, 'end': end, 'after_timestamp': after[0], 'after_order_id': after[1],
+                      'limit': limit}
+            df = pd.read_sql_query(query, conn, params=params)
         return df
         
     except sqlite3.Error as e:
@@ -52,6 +96,31 @@ def get_transaction_data(start_date, end_date):
     finally:
         conn.close()
 
+def count_transactions(start_date, end_date):
+    """Number of history entries (the paging unit) in the selected date range"""
+    conn = get_db_connection()
+    if not conn:
+        return 0
+    
+    try:
+        with history_sources(conn, start_date, end_date) as sources:
+            keys = " UNION ".join(
+                [f"SELECT timestamp, order_id FROM {table} WHERE timestamp >= :start AND timestamp < :end"
+                 for table in sources['Order_History']]
+                + ["SELECT timestamp, order_id FROM Order_Event"
+                   " WHERE to_status IN (12, 13) AND timestamp >= :start AND timestamp < :end"]
+            )
+            query = f"SELECT COUNT(*) FROM ({keys})"
+        
+            start, end = date_bounds(start_date, end_date)
+            return conn.execute(query, {'start': start, 'end': end}).fetchone()[0]
+        
+    except sqlite3.Error as e:
+        st.error(f"Database query error: {e}")
+        return 0
+    finally:
+        conn.close()
+
 def get_summary_data(start_date, end_date):
     """Get summary statistics for the selected date range"""
     conn = get_db_connection()
@@ -59,19 +128,24 @@ def get_summary_data(start_date, end_date):
         return {}
     
     try:
-        query = """
-        SELECT 
-            COUNT(DISTINCT oh.order_id) as total_orders,
-            COUNT(op.product_id) as total_items,
-            SUM(op.product_quantity) as total_quantity,
-            SUM((pi.price) * op.product_quantity) as total_revenue
-        FROM Order_History oh
-        LEFT JOIN Order_Product op ON oh.order_id = op.order_id
-        LEFT JOIN Product pi ON op.product_id = pi.product_id
-        WHERE DATE(oh.timestamp) BETWEEN ? AND ? AND oh.order_status IN (12, 13)
-        """
+        with history_tables(conn, start_date, end_date) as tables:
+            query = f"""
+            SELECT 
+                COUNT(DISTINCT oh.order_id) as total_orders,
+                COUNT(op.product_id) as total_items,
+                SUM(op.product_quantity) as total_quantity,
+                SUM(op.line_total) as total_revenue
+            FROM (SELECT order_id, order_status, username, timestamp FROM {tables['Order_History']}
+                  UNION ALL
+                  -- kitchen and delivery moves are only logged in Order_Event
+                  SELECT ev.order_id, ev.to_status, oc.username, ev.timestamp
+                  FROM Order_Event ev JOIN Order_Cart oc ON oc.order_id = ev.order_id
+                  WHERE ev.to_status IN (12, 13)) oh
+            LEFT JOIN Order_Product op ON oh.order_id = op.order_id
+            WHERE oh.timestamp >= ? AND oh.timestamp < ? AND oh.order_status IN (12, 13)
+            """
         
-        result = conn.execute(query, (start_date, end_date)).fetchone()
+            result = conn.execute(query, date_bounds(start_date, end_date)).fetchone()
         return {
             'total_orders': result[0] or 0,
             'total_items': result[1] or 0,
@@ -142,13 +216,21 @@ if st.sidebar.button("Refresh Data", type="primary"):
 
 # Get transaction data
 st.subheader(" Transaction Details")
-df = get_transaction_data(start_date, end_date)
+# Display options
+items_per_page = st.selectbox("Items per page", [10, 25, 50, 100], index=1)
+
+# Fetch only the page being shown
+total_rows = count_transactions(start_date, end_date)
+after = page_cursor('on_hold_history', (start_date, end_date, items_per_page), first=FIRST_KEY)
+df = get_transaction_data(start_date, end_date, after, items_per_page) if total_rows else pd.DataFrame()
 
 if df.empty:
     st.info("No transactions found for the selected date range.")
 else:
+    last = last_key(df, KEY_COLUMNS)
+
     # Format the data for display
-    display_df = df.copy()
+    display_df = df.drop(columns=['status_code', 'line_id'])
     
     # Format price columns
     if 'price' in display_df.columns:
@@ -185,23 +267,6 @@ else:
     
     display_df = display_df.rename(columns=column_mapping)
     
-    # Display options
-    items_per_page = st.selectbox("Items per page", [10, 25, 50, 100], index=1)
-
-    # Show detailed view with pagination
-    total_rows = len(display_df)
-    
-    if total_rows > items_per_page:
-        page_num = st.number_input(
-            f"Page (showing {items_per_page} of {total_rows} records)",
-            min_value=1,
-            max_value=(total_rows - 1) // items_per_page + 1,
-            value=1
-        )
-        start_idx = (page_num - 1) * items_per_page
-        end_idx = start_idx + items_per_page
-        display_df = display_df.iloc[start_idx:end_idx]
-    
     # Display the data editor
     edited_df = st.data_editor(
         display_df,
@@ -226,6 +291,5 @@ else:
         }
     )
     
-    # Show record count
-    st.info(f"Showing {len(display_df)} of {total_rows} records")
+    page_controls('on_hold_history', last, items_per_page, total_rows)
 
@@ -1,6 +1,7 @@
 import streamlit as st
 from utils.util import format_price
-from utils.database import  get_db_connection 
+from utils.database import get_db_connection, get_write_connection
+from utils.catalog import invalidate_catalog
 from utils.style import load_css 
 
 # Page configuration
@@ -30,23 +31,20 @@ def get_categories():
     return categories
 
 def insert_category(description, status):
-    conn = get_db_connection()
-    conn.execute('INSERT INTO Category (description, status) VALUES (?, ?)', (description, status))
-    conn.commit()
-    conn.close()
+    with get_write_connection() as conn:
+        conn.execute('INSERT INTO Category (description, status) VALUES (?, ?)', (description, status))
+    invalidate_catalog()
 
 def update_category(category_id, description, status):
-    conn = get_db_connection()
-    conn.execute('UPDATE Category SET description = ?, status = ? WHERE category_id = ?', 
-                 (description, status, category_id))
-    conn.commit()
-    conn.close()
+    with get_write_connection() as conn:
+        conn.execute('UPDATE Category SET description = ?, status = ? WHERE category_id = ?', 
+                     (description, status, category_id))
+    invalidate_catalog()
 
 def delete_category(category_id):
-    conn = get_db_connection()
-    conn.execute('DELETE FROM Category WHERE category_id = ?', (category_id,))
-    conn.commit()
-    conn.close()
+    with get_write_connection() as conn:
+        conn.execute('DELETE FROM Category WHERE category_id = ?', (category_id,))
+    invalidate_catalog()
 
 # Product Functions
 def get_products():
@@ -61,27 +59,24 @@ def get_products():
     return products
 
 def insert_product(description, category_id, price, tax, status):
-    conn = get_db_connection()
-    conn.execute('''INSERT INTO Product (description, category_id, price, tax, status) 
-                    VALUES (?, ?, ?, ?, ?)''', 
-                 (description, category_id, price, tax, status))
-    conn.commit()
-    conn.close()
+    with get_write_connection() as conn:
+        conn.execute('''INSERT INTO Product (description, category_id, price, tax, status) 
+                        VALUES (?, ?, ?, ?, ?)''', 
+                     (description, category_id, price, tax, status))
+    invalidate_catalog()
 
 def update_product(product_id, description, category_id, price, tax, status):
-    conn = get_db_connection()
-    conn.execute('''UPDATE Product 
-                    SET description = ?, category_id = ?, price = ?, tax = ?, status = ? 
-                    WHERE product_id = ?''', 
-                 (description, category_id, price, tax, status, product_id))
-    conn.commit()
-    conn.close()
+    with get_write_connection() as conn:
+        conn.execute('''UPDATE Product 
+                        SET description = ?, category_id = ?, price = ?, tax = ?, status = ? 
+                        WHERE product_id = ?''', 
+                     (description, category_id, price, tax, status, product_id))
+    invalidate_catalog()
 
 def delete_product(product_id):
-    conn = get_db_connection()
-    conn.execute('DELETE FROM Product WHERE product_id = ?', (product_id,))
-    conn.commit()
-    conn.close()
+    with get_write_connection() as conn:
+        conn.execute('DELETE FROM Product WHERE product_id = ?', (product_id,))
+    invalidate_catalog()
 
 # Modifier Functions
 def get_modifiers():
@@ -96,27 +91,24 @@ def get_modifiers():
     return modifiers
 
 def insert_modifier(description, product_id, price, status):
-    conn = get_db_connection()
-    conn.execute('''INSERT INTO Modifier (description, product_id, price, status) 
-                    VALUES (?, ?, ?, ?)''', 
-                 (description, product_id, price, status))
-    conn.commit()
-    conn.close()
+    with get_write_connection() as conn:
+        conn.execute('''INSERT INTO Modifier (description, product_id, price, status) 
+                        VALUES (?, ?, ?, ?)''', 
+                     (description, product_id, price, status))
+    invalidate_catalog()
 
 def update_modifier(modifier_id, description, product_id, price, status):
-    conn = get_db_connection()
-    conn.execute('''UPDATE Modifier 
-                    SET description = ?, product_id = ?, price = ?, status = ? 
-                    WHERE modifier_id = ?''', 
-                 (description, product_id, price, status, modifier_id))
-    conn.commit()
-    conn.close()
+    with get_write_connection() as conn:
+        conn.execute('''UPDATE Modifier 
+                        SET description = ?, product_id = ?, price = ?, status = ? 
+                        WHERE modifier_id = ?''', 
+                     (description, product_id, price, status, modifier_id))
+    invalidate_catalog()
 
 def delete_modifier(modifier_id):
-    conn = get_db_connection()
-    conn.execute('DELETE FROM Modifier WHERE modifier_id = ?', (modifier_id,))
-    conn.commit()
-    conn.close()
+    with get_write_connection() as conn:
+        conn.execute('DELETE FROM Modifier WHERE modifier_id = ?', (modifier_id,))
+    invalidate_catalog()
 
 # Main App
 def display_dashboard():
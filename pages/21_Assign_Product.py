@@ -1,6 +1,7 @@
 import streamlit as st
 import pandas as pd
-from utils.database import get_db_connection
+from utils.database import get_db_connection, get_write_connection
+from utils.catalog import invalidate_catalog
 from utils.style import load_css
 
 # ── Session state ─────────────────────────────────────────────────────────────
@@ -35,22 +36,20 @@ def get_assigned_products(category_id):
     return df
 
 def assign_product(product_id, category_id):
-    conn = get_db_connection()
-    conn.execute(
-        "UPDATE Product SET category_id = ? WHERE product_id = ?",
-        (category_id, product_id)
-    )
-    conn.commit()
-    conn.close()
+    with get_write_connection() as conn:
+        conn.execute(
+            "UPDATE Product SET category_id = ? WHERE product_id = ?",
+            (category_id, product_id)
+        )
+    invalidate_catalog()
 
 def unassign_product(product_id):
-    conn = get_db_connection()
-    conn.execute(
-        "UPDATE Product SET category_id = NULL WHERE product_id = ?",
-        (product_id,)
-    )
-    conn.commit()
-    conn.close()
+    with get_write_connection() as conn:
+        conn.execute(
+            "UPDATE Product SET category_id = NULL WHERE product_id = ?",
+            (product_id,)
+        )
+    invalidate_catalog()
 
 # ── Page config ───────────────────────────────────────────────────────────────
 st.set_page_config(
@@ -1,7 +1,8 @@
 import streamlit as st
 import pandas as pd
 from datetime import datetime
-from utils.database import get_db_connection 
+from utils.database import get_db_connection, get_write_connection
+from utils.catalog import invalidate_catalog
 from utils.style import load_css
 
 # Initialize session state
@@ -31,31 +32,28 @@ def get_modifiers(product_id=None):
 
 # Assign modifier to product by creating a new row
 def assign_modifier(modifier_id, product_id):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    # Get the original modifier details
-    cursor.execute("SELECT description, price FROM Modifier WHERE modifier_id = ?", (modifier_id,))
-    modifier = cursor.fetchone()
-    
-    if modifier:
-        description, price = modifier
-        # Insert a new modifier row with the product_id
-        cursor.execute(
-            "INSERT INTO Modifier (description, product_id, price, status) VALUES (?, ?, ?, 1)",
-            (description, product_id, price)
-        )
-        conn.commit()
-    
-    conn.close()
+    with get_write_connection() as conn:
+        cursor = conn.cursor()
+        
+        # Get the original modifier details
+        cursor.execute("SELECT description, price FROM Modifier WHERE modifier_id = ?", (modifier_id,))
+        modifier = cursor.fetchone()
+        
+        if modifier:
+            description, price = modifier
+            # Insert a new modifier row with the product_id
+            cursor.execute(
+                "INSERT INTO Modifier (description, product_id, price, status) VALUES (?, ?, ?, 1)",
+                (description, product_id, price)
+            )
+    invalidate_catalog()
 
 # Delete assigned modifier
 def delete_modifier(modifier_id):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM Modifier WHERE modifier_id = ?", (modifier_id,))
-    conn.commit()
-    conn.close()
+    with get_write_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM Modifier WHERE modifier_id = ?", (modifier_id,))
+    invalidate_catalog()
 
 # Main app
 st.set_page_config(
@@ -1,7 +1,8 @@
 import streamlit as st
 import sqlite3
 import pandas as pd
-from utils.database import get_db_connection 
+from utils.database import get_db_connection, get_write_connection
+from utils.catalog import invalidate_catalog
 from utils.style import load_css 
 
 # ── Page config ──────────────────────────────────────────────────────────────
@@ -31,10 +32,9 @@ def load_categories():
 
 def bulk_update_ranks(updates: list[tuple]):
     """updates: list of (rank, product_id)"""
-    conn = get_db_connection()
-    conn.executemany("UPDATE Product SET rank = ? WHERE product_id = ?", updates)
-    conn.commit()
-    conn.close()
+    with get_write_connection() as conn:
+        conn.executemany("UPDATE Product SET rank = ? WHERE product_id = ?", updates)
+    invalidate_catalog()
 
 
 # ── UI ────────────────────────────────────────────────────────────────────────
@@ -0,0 +1,155 @@
+import streamlit as st
+from utils.database import get_db_connection, get_write_connection
+from utils.catalog import invalidate_catalog
+from utils.style import load_css
+
+# ── Session state ─────────────────────────────────────────────────────────────
+if 'selected_workcenter' not in st.session_state:
+    st.session_state.selected_workcenter = None
+
+# ── DB helpers ────────────────────────────────────────────────────────────────
+def get_workcenters():
+    conn = get_db_connection()
+    rows = conn.execute("SELECT * FROM Workcenter ORDER BY workcenter_id").fetchall()
+    conn.close()
+    return rows
+
+def insert_workcenter(description, ip_address):
+    with get_write_connection() as conn:
+        conn.execute(
+            "INSERT INTO Workcenter (description, ip_address) VALUES (?, ?)",
+            (description, ip_address or None)
+        )
+    invalidate_catalog()
+
+def update_workcenter(workcenter_id, description, ip_address):
+    with get_write_connection() as conn:
+        conn.execute(
+            "UPDATE Workcenter SET description = ?, ip_address = ? WHERE workcenter_id = ?",
+            (description, ip_address or None, workcenter_id)
+        )
+    invalidate_catalog()
+
+def get_unrouted(kind):
+    """Active categories or products without a route of their own."""
+    table = 'Category' if kind == 'category' else 'Product'
+    conn = get_db_connection()
+    rows = conn.execute(f'''
+        SELECT t.{kind}_id AS id, t.description
+        FROM {table} t
+        LEFT JOIN Workcenter_Route r ON r.{kind}_id = t.{kind}_id
+        WHERE r.route_id IS NULL AND t.status = 1
+        ORDER BY t.description
+    ''').fetchall()
+    conn.close()
+    return rows
+
+def get_routes(workcenter_id):
+    conn = get_db_connection()
+    rows = conn.execute('''
+        SELECT r.route_id,
+               COALESCE(c.description, p.description) AS description,
+               CASE WHEN r.product_id IS NULL THEN 'Category' ELSE 'Product' END AS kind
+        FROM Workcenter_Route r
+        LEFT JOIN Category c ON r.category_id = c.category_id
+        LEFT JOIN Product p ON r.product_id = p.product_id
+        WHERE r.workcenter_id = ?
+        ORDER BY kind, description
+    ''', (workcenter_id,)).fetchall()
+    conn.close()
+    return rows
+
+def add_route(workcenter_id, kind, target_id):
+    with get_write_connection() as conn:
+        conn.execute(
+            f"INSERT INTO Workcenter_Route (workcenter_id, {kind}_id) VALUES (?, ?)",
+            (workcenter_id, target_id)
+        )
+    invalidate_catalog()
+
+def delete_route(route_id):
+    with get_write_connection() as conn:
+        conn.execute("DELETE FROM Workcenter_Route WHERE route_id = ?", (route_id,))
+    invalidate_catalog()
+
+# ── Page config ───────────────────────────────────────────────────────────────
+st.set_page_config(
+    page_title="Workcenter Routing",
+    page_icon="🖨️",
+    layout="wide",
+    initial_sidebar_state="collapsed"
+)
+
+load_css()
+
+# ── Layout ────────────────────────────────────────────────────────────────────
+col1, col2, col3 = st.columns([2, 2, 2])
+
+with col1:
+    st.subheader("🖨️ Workcenters")
+    workcenters = get_workcenters()
+
+    for wc in workcenters:
+        label = f"**{wc['description']}**  \n{wc['ip_address'] or 'screen only'}"
+        if st.button(
+            label,
+            key=f"wc_{wc['workcenter_id']}",
+            width='stretch',
+            type="primary" if st.session_state.selected_workcenter == wc['workcenter_id'] else "secondary"
+        ):
+            st.session_state.selected_workcenter = wc['workcenter_id']
+            st.rerun()
+    st.caption("Unrouted items go to the first workcenter.")
+
+    with st.form(key="add_workcenter"):
+        wc_desc = st.text_input("Description")
+        wc_ip = st.text_input("Printer address", placeholder="192.168.0.60 or 192.168.0.60:9100")
+        if st.form_submit_button("Add Workcenter"):
+            if wc_desc:
+                insert_workcenter(wc_desc, wc_ip.strip())
+                st.success("Workcenter added!")
+                st.rerun()
+            else:
+                st.error("Description is required")
+
+selected = next((wc for wc in workcenters
+                 if wc['workcenter_id'] == st.session_state.selected_workcenter), None)
+
+with col2:
+    st.subheader("➕ Unrouted")
+    if selected is None:
+        st.info("👈 Select a workcenter")
+    else:
+        for kind, label in (('category', "Categories"), ('product', "Products")):
+            with st.expander(label, expanded=(kind == 'category')):
+                for row in get_unrouted(kind):
+                    col_a, col_b = st.columns([4, 1])
+                    col_a.markdown(f"**{row['description']}**")
+                    if col_b.button("➡️", key=f"route_{kind}_{row['id']}"):
+                        add_route(selected['workcenter_id'], kind, row['id'])
+                        st.rerun()
+
+with col3:
+    st.subheader("✅ Routed Here")
+    if selected is not None:
+        with st.form(key=f"edit_workcenter_{selected['workcenter_id']}"):
+            new_desc = st.text_input("Description", value=selected['description'])
+            new_ip = st.text_input("Printer address", value=selected['ip_address'] or "")
+            if st.form_submit_button("Update"):
+                if new_desc:
+                    update_workcenter(selected['workcenter_id'], new_desc, new_ip.strip())
+                    st.success("Workcenter updated!")
+                    st.rerun()
+
+        routes = get_routes(selected['workcenter_id'])
+        if not routes:
+            st.warning("Nothing routed to this workcenter.")
+        for route in routes:
+            col_a, col_b = st.columns([4, 1])
+            with col_a:
+                st.markdown(f"**{route['description']}**")
+                st.caption(route['kind'])
+            with col_b:
+                if st.button("❌", key=f"unroute_{route['route_id']}"):
+                    delete_route(route['route_id'])
+                    st.rerun()
@@ -3,7 +3,8 @@ import sqlite3
 import pandas as pd
 from datetime import datetime, date, timedelta
 from utils.util import format_price, format_timestamp
-from utils.database import get_db_connection
+from utils.database import get_db_connection, date_bounds
+from utils.paging import page_cursor, page_controls, last_key
 from utils.style import load_css
 
 # Page configuration
@@ -17,36 +18,30 @@ def get_summary_data(start_date, end_date):
         return {}
     
     try:
-        # Get total revenue separately to avoid duplication from JOIN
-        revenue_query = """
-        SELECT SUM(total) as total_revenue
-        FROM Order_History
-        WHERE DATE(timestamp) BETWEEN ? AND ? AND order_status = 11  
+        # Order-level totals come from the daily order rollup (one row per user / service area / day).
+        # Rollups only count orders that reached status 11 (paid & printed).
+        orders_query = """
+        SELECT SUM(order_count) as total_orders, SUM(revenue) as total_revenue
+        FROM Sales_Rollup_Order
+        WHERE grain = 'day' AND period >= ? AND period < ?
         """
-        # status 11 indicates paid and printed orders, adjust if needed based on your order status definitions
-        # WHEN 10 THEN 'order created'
-        # WHEN 11 THEN 'order paid & printed'
-        # WHEN 12 THEN 'order confirmed by kitchen'
-        revenue_result = conn.execute(revenue_query, (start_date, end_date)).fetchone()
-        total_revenue = revenue_result[0] or 0
-        
-        # Get other statistics
+        orders_result = conn.execute(orders_query, date_bounds(start_date, end_date)).fetchone()
+
+        # Product statistics from the daily product rollup
         query = """
         SELECT 
-            COUNT(DISTINCT oh.order_id) as total_orders,
-            COUNT(DISTINCT op.product_id) as unique_products,
-            SUM(op.product_quantity) as total_quantity
-        FROM Order_History oh
-        LEFT JOIN Order_Product op ON oh.order_id = op.order_id
-        WHERE DATE(oh.timestamp) BETWEEN ? AND ? AND oh.order_status = 11
+            COUNT(DISTINCT product_id) as unique_products,
+            SUM(quantity) as total_quantity
+        FROM Sales_Rollup
+        WHERE grain = 'day' AND period >= ? AND period < ?
         """
         
-        result = conn.execute(query, (start_date, end_date)).fetchone()
+        result = conn.execute(query, date_bounds(start_date, end_date)).fetchone()
         return {
-            'total_orders': result[0] or 0,
-            'unique_products': result[1] or 0,
-            'total_quantity': result[2] or 0,
-            'total_revenue': total_revenue
+            'total_orders': orders_result[0] or 0,
+            'unique_products': result[0] or 0,
+            'total_quantity': result[1] or 0,
+            'total_revenue': orders_result[1] or 0
         }
         
     except sqlite3.Error as e:
@@ -56,8 +51,13 @@ def get_summary_data(start_date, end_date):
         conn.close()
 
 
-def get_sales_summary_data(start_date, end_date):
-    """Get sales summary grouped by product"""
+# Best sellers first; a page continues after the previous page's last key
+KEY_COLUMNS = ['total_quantity', 'product_id']
+FIRST_KEY = (2 ** 62, 0)
+
+def get_sales_summary_data(start_date, end_date, after=FIRST_KEY, limit=25):
+    """Get one page of the sales summary grouped by product: the products
+    sorted after `after` (a KEY_COLUMNS tuple)"""
     conn = get_db_connection()
     if not conn:
         return pd.DataFrame()
@@ -67,22 +67,73 @@ def get_sales_summary_data(start_date, end_date):
         SELECT 
             p.product_id,
             p.description as product_description,
-            SUM(op.product_quantity) as total_quantity,
-            p.price as unit_price,
-            p.tax as unit_tax,
-            SUM(op.product_quantity * p.price) as subtotal,
-            SUM(op.product_quantity * p.tax) as total_tax,
-            SUM(op.product_quantity * (p.price + p.tax)) as total_amount,
-            COUNT(DISTINCT oh.order_id) as order_count
-        FROM Order_History oh
-        INNER JOIN Order_Product op ON oh.order_id = op.order_id
-        INNER JOIN Product p ON op.product_id = p.product_id
-        WHERE DATE(oh.timestamp) BETWEEN ? AND ? AND oh.order_status = 11
-        GROUP BY p.product_id, p.description, p.price, p.tax
-        ORDER BY total_quantity DESC
+            SUM(r.quantity) as total_quantity,
+            SUM(r.subtotal) / SUM(r.quantity) as unit_price,
+            SUM(r.tax) / SUM(r.quantity) as unit_tax,
+            SUM(r.subtotal) as subtotal,
+            SUM(r.tax) as total_tax,
+            SUM(r.subtotal + r.tax) as total_amount,
+            SUM(r.order_count) as order_count
+        FROM Sales_Rollup r
+        INNER JOIN Product p ON r.product_id = p.product_id
+        WHERE r.grain = 'day' AND r.period >= ? AND r.period < ?
+        GROUP BY p.product_id, p.description
+        HAVING (SUM(r.quantity), p.product_id) < (?, ?)
+        ORDER BY total_quantity DESC, p.product_id DESC
+        LIMIT ?
         """
         
-        df = pd.read_sql_query(query, conn, params=(start_date, end_date))
+        df = pd.read_sql_query(query, conn, params=[*date_bounds(start_date, end_date), *after, limit])
+        return df
+        
+    except sqlite3.Error as e:
+        st.error(f"Database query error: {e}")
+        return pd.DataFrame()
+    finally:
+        conn.close()
+
+def count_sales_products(start_date, end_date):
+    """Number of products sold in the selected date range"""
+    conn = get_db_connection()
+    if not conn:
+        return 0
+    
+    try:
+        query = """
+        SELECT COUNT(DISTINCT r.product_id)
+        FROM Sales_Rollup r
+        INNER JOIN Product p ON r.product_id = p.product_id
+        WHERE r.grain = 'day' AND r.period >= ? AND r.period < ?
+        """
+        
+        return conn.execute(query, date_bounds(start_date, end_date)).fetchone()[0]
+        
+    except sqlite3.Error as e:
+        st.error(f"Database query error: {e}")
+        return 0
+    finally:
+        conn.close()
+
+
+def get_hourly_sales_data(start_date, end_date):
+    """Revenue and order count per hour from the hourly rollup"""
+    conn = get_db_connection()
+    if not conn:
+        return pd.DataFrame()
+    
+    try:
+        query = """
+        SELECT 
+            substr(period, 12, 5) as hour,
+            SUM(order_count) as orders,
+            SUM(revenue) / 100.0 as revenue
+        FROM Sales_Rollup_Order
+        WHERE grain = 'hour' AND period >= ? AND period < ?
+        GROUP BY hour
+        ORDER BY hour
+        """
+        
+        df = pd.read_sql_query(query, conn, params=date_bounds(start_date, end_date))
         return df
         
     except sqlite3.Error as e:
@@ -145,13 +196,27 @@ if summary:
     with col4:
         st.metric("Total Revenue", format_price(summary['total_revenue']))
 
+# Revenue by hour for a single day
+if start_date == end_date:
+    hourly_df = get_hourly_sales_data(start_date, end_date)
+    if not hourly_df.empty:
+        st.bar_chart(hourly_df, x='hour', y='revenue', height=200)
+
 # Get sales summary data
 # st.subheader("Product Sales Summary")
-df = get_sales_summary_data(start_date, end_date)
+# Display options
+items_per_page = st.selectbox("Items per page", [10, 25, 50, 100], index=1)
+
+# Fetch only the page being shown
+total_rows = count_sales_products(start_date, end_date)
+after = page_cursor('sales_history', (start_date, end_date, items_per_page), first=FIRST_KEY)
+df = get_sales_summary_data(start_date, end_date, after, items_per_page) if total_rows else pd.DataFrame()
 
 if df.empty:
     st.info("No sales found for the selected date range.")
 else:
+    last = last_key(df, KEY_COLUMNS)
+
     # Format the data for display
     display_df = df.copy()
     
@@ -182,23 +247,6 @@ else:
     
     display_df = display_df.rename(columns=column_mapping)
     
-    # Display options
-    items_per_page = st.selectbox("Items per page", [10, 25, 50, 100], index=1)
-
-    # Show detailed view with pagination
-    total_rows = len(display_df)
-    
-    if total_rows > items_per_page:
-        page_num = st.number_input(
-            f"Page (showing {items_per_page} of {total_rows} records)",
-            min_value=1,
-            max_value=(total_rows - 1) // items_per_page + 1,
-            value=1
-        )
-        start_idx = (page_num - 1) * items_per_page
-        end_idx = start_idx + items_per_page
-        display_df = display_df.iloc[start_idx:end_idx]
-    
     # Display the data editor
     edited_df = st.data_editor(
         display_df,
@@ -219,6 +267,5 @@ else:
         }
     )
     
-    # Show record count
-    st.info(f"Showing {len(display_df)} of {total_rows} records")
+    page_controls('sales_history', last, items_per_page, total_rows)
     
@@ -0,0 +1,144 @@
+import streamlit as st
+import sqlite3
+import pandas as pd
+from datetime import date, timedelta
+from utils.database import get_db_connection, date_bounds
+from utils.style import load_css
+
+# Page configuration
+st.set_page_config(page_title="Speed of Service", page_icon="⏱️", layout="wide")
+load_css()
+
+# Ticket time columns (minutes) and their labels
+STAGES = {
+    'kitchen_min': 'Paid → confirmed',
+    'delivery_min': 'Confirmed → delivered',
+    'ticket_min': 'Paid → delivered',
+}
+PERCENTILES = [0.5, 0.9, 0.95]
+BUCKET = '15min'
+
+def get_lifecycle_data(start_date, end_date):
+    """Order lines paid in the date range, with their station and lifecycle times (UTC)"""
+    conn = get_db_connection()
+    if not conn:
+        return pd.DataFrame()
+
+    try:
+        query = """
+        SELECT
+            l.order_id,
+            l.product_id,
+            p.description as product,
+            COALESCE(w.description, 'Kitchen') as station,
+            l.quantity,
+            l.paid_at,
+            l.ready_at,
+            l.delivered_at
+        FROM Order_Lifecycle l
+        LEFT JOIN Product p ON l.product_id = p.product_id
+        LEFT JOIN Workcenter w ON l.workcenter_id = w.workcenter_id
+        WHERE l.paid_at >= ? AND l.paid_at < ?
+        """
+        df = pd.read_sql_query(query, conn, params=date_bounds(start_date, end_date))
+    except sqlite3.Error as e:
+        st.error(f"Database query error: {e}")
+        return pd.DataFrame()
+    finally:
+        conn.close()
+
+    for col in ('paid_at', 'ready_at', 'delivered_at'):
+        df[col] = pd.to_datetime(df[col])
+    df['kitchen_min'] = (df['ready_at'] - df['paid_at']).dt.total_seconds() / 60
+    df['delivery_min'] = (df['delivered_at'] - df['ready_at']).dt.total_seconds() / 60
+    df['ticket_min'] = (df['delivered_at'] - df['paid_at']).dt.total_seconds() / 60
+    return df
+
+def percentile_table(frame, by):
+    """Ticket count and p50/p90/p95 of each stage per group"""
+    grouped = frame.groupby(by)
+    table = grouped[list(STAGES)].quantile(PERCENTILES).unstack()
+    table.columns = [f"{STAGES[stage]} p{round(q * 100)}" for stage, q in table.columns]
+    table.insert(0, 'tickets', grouped.size())
+    return table.round(1)
+
+def minutes(value):
+    """Metric text for a stage time; '—' when no order has reached the stage yet"""
+    return "—" if pd.isna(value) else f"{value:.1f} min"
+
+def throughput(orders):
+    """Orders paid, confirmed and delivered in each 15-minute bucket"""
+    counts = pd.DataFrame({
+        'paid': orders['paid_at'].dt.floor(BUCKET).value_counts(),
+        'confirmed': orders['ready_at'].dt.floor(BUCKET).value_counts(),
+        'delivered': orders['delivered_at'].dt.floor(BUCKET).value_counts(),
+    })
+    return counts.fillna(0).astype(int).sort_index()
+
+
+# Sidebar for date selection
+st.sidebar.header("📅 Date Selection")
+
+# Date range selection
+date_option = st.sidebar.radio(
+    "Select date range:",
+    ["Single Day", "Last 7 Days", "Last 30 Days"]
+)
+
+today = date.today()
+
+if date_option == "Single Day":
+    selected_date = st.sidebar.date_input(
+        "Select date:",
+        value=today,
+        max_value=today
+    )
+    start_date = end_date = selected_date
+
+elif date_option == "Last 7 Days":
+    start_date = today - timedelta(days=7)
+    end_date = today
+
+elif date_option == "Last 30 Days":
+    start_date = today - timedelta(days=30)
+    end_date = today
+
+# Display selected date range
+if start_date == end_date:
+    st.sidebar.info(f"Selected: {start_date}")
+else:
+    st.sidebar.info(f"Selected: {start_date} to {end_date}")
+
+df = get_lifecycle_data(start_date, end_date)
+
+if df.empty:
+    st.info("No paid orders found for the selected date range.")
+    st.stop()
+
+# One row per ticket: the order as a whole, and the order's part at each station
+orders = df.drop_duplicates('order_id')
+station_tickets = df.drop_duplicates(['order_id', 'station'])
+
+col1, col2, col3, col4 = st.columns(4)
+with col1:
+    st.metric("Orders", len(orders))
+with col2:
+    st.metric("Confirmed", int(orders['ready_at'].notna().sum()))
+with col3:
+    st.metric("Median paid → confirmed", minutes(orders['kitchen_min'].median()))
+with col4:
+    st.metric("p90 paid → delivered", minutes(orders['ticket_min'].quantile(0.9)))
+
+st.subheader("Throughput per 15 minutes (UTC)")
+st.bar_chart(throughput(orders), height=250)
+
+tab_hour, tab_station, tab_product = st.tabs(["By hour", "By station", "By product"])
+with tab_hour:
+    hourly = percentile_table(orders, orders['paid_at'].dt.floor('h').rename('hour (UTC)'))
+    st.dataframe(hourly, width='stretch')
+with tab_station:
+    st.dataframe(percentile_table(station_tickets, 'station'), width='stretch')
+with tab_product:
+    products = percentile_table(df, 'product')
+    products.insert(1, 'quantity', df.groupby('product')['quantity'].sum())
+    st.dataframe(products.sort_values('tickets', ascending=False), width='stretch')
@@ -0,0 +1,74 @@
+import streamlit as st
+import pandas as pd
+from utils.query_stats import get_query_stats, get_slow_queries, reset_query_stats, SLOW_QUERY_MS, SLOW_QUERY_LOG
+from utils.database import get_pool_metrics
+from utils.writer import get_write_queue
+from utils.style import load_css
+
+# Page configuration
+st.set_page_config(page_title="Query Stats", page_icon="⏱️", layout="wide", initial_sidebar_state="collapsed")
+load_css()
+
+# Stats are collected by every pooled connection in this server process since it started (or the last reset)
+stats = pd.DataFrame(get_query_stats(), columns=['sql', 'source', 'count', 'total_ms', 'avg_ms', 'max_ms', 'slow'])
+
+col1, col2, col3, col4 = st.columns(4)
+col1.metric("Statements", f"{int(stats['count'].sum()):,}")
+col2.metric("Total time", f"{stats['total_ms'].sum() / 1000:,.1f} s")
+col3.metric(f"Slow (≥ {SLOW_QUERY_MS:.0f} ms)", f"{int(stats['slow'].sum()):,}")
+pool = get_pool_metrics()
+col4.metric("Pool waits", f"{pool['waits']:,}", help=f"{pool['wait_ms_total']:.0f} ms waiting for a read connection")
+
+if st.button("🔄 Reset stats"):
+    reset_query_stats()
+    st.rerun()
+
+by_query, by_page, slow_tab, writer_tab = st.tabs(["By query", "By page", "Slow log", "Writer / pool"])
+
+with by_query:
+    if stats.empty:
+        st.info("No statements recorded yet.")
+    else:
+        queries = stats.groupby('sql', as_index=False).agg(
+            count=('count', 'sum'), total_ms=('total_ms', 'sum'), max_ms=('max_ms', 'max'),
+            slow=('slow', 'sum'), sources=('source', lambda sources: ', '.join(sorted(set(sources))))
+        )
+        queries['avg_ms'] = queries['total_ms'] / queries['count']
+        queries = queries.sort_values('total_ms', ascending=False)
+        st.dataframe(
+            queries[['total_ms', 'count', 'avg_ms', 'max_ms', 'slow', 'sql', 'sources']],
+            hide_index=True, width='stretch',
+            column_config={
+                'total_ms': st.column_config.NumberColumn("Total ms", format="%.1f"),
+                'avg_ms': st.column_config.NumberColumn("Avg ms", format="%.2f"),
+                'max_ms': st.column_config.NumberColumn("Max ms", format="%.1f"),
+                'sql': st.column_config.TextColumn("SQL", width='large'),
+            }
+        )
+
+with by_page:
+    if not stats.empty:
+        pages = stats.groupby('source', as_index=False).agg(
+            statements=('count', 'sum'), distinct=('sql', 'nunique'), total_ms=('total_ms', 'sum'),
+            max_ms=('max_ms', 'max'), slow=('slow', 'sum')
+        ).sort_values('total_ms', ascending=False)
+        st.bar_chart(pages.set_index('source')['total_ms'], horizontal=True)
+        st.dataframe(pages, hide_index=True, width='stretch')
+
+        source = st.selectbox("Queries from", pages['source'])
+        st.dataframe(
+            stats[stats['source'] == source][['total_ms', 'count', 'avg_ms', 'max_ms', 'slow', 'sql']],
+            hide_index=True, width='stretch'
+        )
+
+with slow_tab:
+    st.caption(f"Newest first; also appended to {SLOW_QUERY_LOG}")
+    slow = get_slow_queries()
+    if slow:
+        st.dataframe(pd.DataFrame(slow), hide_index=True, width='stretch')
+    else:
+        st.info("No slow statements.")
+
+with writer_tab:
+    writer = get_write_queue().metrics()
+    st.json({'write_queue': writer, 'pool': pool})
@@ -0,0 +1,62 @@
+import streamlit as st
+import pandas as pd
+from utils.profiler import get_reruns, clear_reruns, arm_profiler, get_armed
+from utils.style import load_css
+
+# Page configuration
+st.set_page_config(page_title="Rerun Profiler", page_icon="🐢", layout="wide", initial_sidebar_state="collapsed")
+load_css()
+
+reruns = get_reruns()
+if not reruns:
+    st.info("No reruns recorded yet. Profiled pages (Order, Checkout) record every rerun in this server process.")
+    st.stop()
+
+df = pd.DataFrame(reruns)
+phase_cols = [col for col in df.columns if col.endswith('_ms') and col != 'total_ms']
+df[phase_cols] = df[phase_cols].fillna(0.0)
+
+col1, col2 = st.columns([3, 1])
+with col1:
+    st.subheader("Per page")
+    summary = df.groupby('page').agg(
+        reruns=('total_ms', 'size'),
+        p50_ms=('total_ms', 'median'),
+        p95_ms=('total_ms', lambda ms: ms.quantile(0.95)),
+        max_ms=('total_ms', 'max'),
+        statements=('statements', 'mean'),
+    )
+    st.dataframe(summary.round(1), width='stretch')
+    # Average split of a rerun into phases
+    st.bar_chart(df.groupby('page')[phase_cols].mean(), horizontal=True)
+
+with col2:
+    st.subheader("cProfile")
+    sessions = df.drop_duplicates('session')[['session', 'page', 'at']].dropna()
+    if not sessions.empty:
+        labels = {row['session']: f"{row['page']} · last seen {row['at'][11:]}" for _, row in sessions.iterrows()}
+        session = st.selectbox("Session", list(labels), format_func=labels.get)
+        count = st.number_input("Next reruns", min_value=1, max_value=20, value=3)
+        if st.button("Arm profiler", width='stretch'):
+            arm_profiler(session, int(count))
+            st.success("Armed; interact with that screen, then refresh here.")
+    armed = get_armed()
+    if armed:
+        st.caption("Waiting: " + ", ".join(f"{session[:8]}… ×{left}" for session, left in armed.items()))
+    if st.button("🗑️ Clear history", width='stretch'):
+        clear_reruns()
+        st.rerun()
+
+st.subheader("Recent reruns")
+pages = st.multiselect("Pages", sorted(df['page'].unique()))
+recent = df[df['page'].isin(pages)] if pages else df
+st.dataframe(
+    recent[['at', 'page', 'outcome', 'total_ms', 'statements'] + phase_cols].round(2),
+    hide_index=True, width='stretch'
+)
+
+if 'profile' in df.columns:
+    st.subheader("Profiled reruns")
+    for _, row in df[df['profile'].notna()].iterrows():
+        with st.expander(f"{row['at']} · {row['page']} · {row['total_ms']:.1f} ms ({row['outcome']})"):
+            st.code(row['profile'], language=None)
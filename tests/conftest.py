@@ -0,0 +1,23 @@
+# Shared fixtures: each test runs against its own copy of pos.database with the
+# order tables emptied.
+import shutil
+import pytest
+from utils import database
+from utils.catalog import invalidate_catalog
+from utils.database import configure_pool, DB_PATH
+
+ORDER_TABLES = ('Order_Product', 'Order_Cart', 'Order_History', 'Order_Event', 'Order_Station_Ready',
+                'Sales_Rollup', 'Sales_Rollup_Order')
+
+@pytest.fixture
+def db(tmp_path):
+    path = str(tmp_path / 'pos.database')
+    shutil.copy(DB_PATH, path)
+    configure_pool(path)
+    invalidate_catalog()
+    with database.get_write_connection() as conn:
+        for table in ORDER_TABLES:
+            conn.execute(f"DELETE FROM {table}")
+    yield path
+    configure_pool()
+    invalidate_catalog()
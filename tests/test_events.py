@@ -0,0 +1,51 @@
+# Pushed events rerun the subscribed Streamlit session on the page it is showing.
+#
+#   python -m pytest tests
+from types import SimpleNamespace
+from unittest import mock
+import pytest
+from streamlit.proto.ClientState_pb2 import ClientState
+from utils import events
+
+class FakeSession:
+    """The parts of AppSession that events._rerun_session uses."""
+
+    def __init__(self, page_script_hash, query_string):
+        self._client_state = ClientState(page_script_hash=page_script_hash, query_string=query_string)
+        self._event_loop = SimpleNamespace(call_soon_threadsafe=lambda fn, *args: fn(*args))
+        self.reruns = []
+
+    def request_rerun(self, client_state):
+        self.reruns.append(client_state)
+
+@pytest.fixture
+def session():
+    session = FakeSession('kds-page-hash', 'workcenter=2')
+    session_mgr = SimpleNamespace(get_active_session_info=lambda session_id: SimpleNamespace(session=session))
+    ctx = SimpleNamespace(session_id='s1', page_script_hash='kds-page-hash')
+    with mock.patch('streamlit.runtime.Runtime.exists', return_value=True), \
+         mock.patch('streamlit.runtime.Runtime.instance', return_value=SimpleNamespace(_session_mgr=session_mgr)), \
+         mock.patch('streamlit.runtime.scriptrunner.get_script_run_ctx', return_value=ctx):
+        yield session
+    events._session_subscriptions.clear()
+    events.bus._subscribers.clear()
+
+def test_rerun_keeps_page_and_query_string(session):
+    assert events.subscribe_rerun([events.ORDER_PAID])
+    events.bus.publish(events.ORDER_PAID, order_ids=[1])
+    events.bus.publish(events.ORDER_PAID, order_ids=[2])
+
+    assert len(session.reruns) == 2
+    for client_state in session.reruns:
+        assert client_state is not None
+        assert client_state.page_script_hash == 'kds-page-hash'
+        assert client_state.query_string == 'workcenter=2'
+    assert 's1' in events._session_subscriptions
+
+def test_subscription_dropped_after_leaving_page(session):
+    events.subscribe_rerun([events.ORDER_PAID])
+    session._client_state.page_script_hash = 'home-page-hash'
+    events.bus.publish(events.ORDER_PAID, order_ids=[1])
+
+    assert session.reruns == []
+    assert 's1' not in events._session_subscriptions
@@ -0,0 +1,45 @@
+# A day exported by utils.export reads back as a Hive-partitioned dataset with
+# the rows that were in the database.
+from datetime import datetime, timezone
+import pyarrow.dataset as ds
+import pytest
+from utils import database
+from utils.database import get_order_lines
+from utils.export import export, DATASETS
+from utils.orders import insert_order, settle_orders
+from utils.pricing import price_orders
+
+def _seed_day():
+    """Place and pay two orders today; returns {order_id: total}."""
+    with database.get_write_connection() as conn:
+        ids = [row[0] for row in conn.execute("SELECT product_id FROM Product ORDER BY product_id LIMIT 2")]
+        order_ids = [insert_order(conn, 'test', '', '', [{'product_id': product_id, 'quantity': 2, 'modifiers': []}])
+                     for product_id in ids]
+    orders, _ = price_orders(get_order_lines(10, order_ids))
+    totals = {order_id: orders[order_id]['total'] for order_id in order_ids}
+    with database.get_write_connection() as conn:
+        settle_orders(conn, totals)
+    return totals
+
+@pytest.mark.parametrize('fmt, file_format', [('parquet', 'parquet'), ('arrow', 'ipc')])
+def test_export_day_reads_back(db, tmp_path, fmt, file_format):
+    totals = _seed_day()
+    today = datetime.now(timezone.utc).date()
+    out_dir = str(tmp_path / 'export')
+
+    written = export(today, today, out_dir, fmt)
+    assert set(written) == set(DATASETS)
+
+    lines = ds.dataset(f"{out_dir}/order_lines", format=file_format, partitioning='hive').to_table()
+    assert written['order_lines'] == {today: lines.num_rows}
+    assert sorted(lines.column('order_id').to_pylist()) == sorted(totals)
+    assert lines.column('quantity').to_pylist() == [2, 2]
+    assert str(lines.column('day')[0]) == today.isoformat()
+
+    rollup = ds.dataset(f"{out_dir}/sales_rollup_order", format=file_format, partitioning='hive').to_table()
+    revenue = dict(zip(rollup.column('grain').to_pylist(), rollup.column('revenue').to_pylist()))
+    assert revenue == {'day': sum(totals.values()), 'hour': sum(totals.values())}
+
+    history = ds.dataset(f"{out_dir}/order_history", format=file_format, partitioning='hive').to_table()
+    paid = {row['order_id']: row['total'] for row in history.to_pylist() if row['order_status'] == 11}
+    assert paid == totals
@@ -0,0 +1,144 @@
+# PrintSpooler against utils.fake_printer: retries with backoff, dropped and
+# stalled connections, giving up after MAX_ATTEMPTS, and resuming spooled jobs
+# when a spooler starts.
+import socket
+import time
+import pytest
+from utils import printing
+from utils.fake_printer import FakePrinter, CUT
+from utils.printing import PrintSpooler, configure_spooler, get_spooler, DONE, FAILED, PRINTING, QUEUED
+
+@pytest.fixture(autouse=True)
+def fast_retries(monkeypatch):
+    monkeypatch.setattr(printing, 'BACKOFF_BASE', 0.01)
+    monkeypatch.setattr(printing, 'BACKOFF_MAX', 0.05)
+    monkeypatch.setattr(printing, 'CONNECT_TIMEOUT', 0.5)
+    monkeypatch.setattr(printing, 'WRITE_TIMEOUT', 0.3)
+
+@pytest.fixture
+def fake_printers():
+    printers = []
+    def start(**options):
+        printers.append(FakePrinter(**options).start())
+        return printers[-1]
+    yield start
+    for printer in printers:
+        printer.stop()
+
+@pytest.fixture
+def spoolers(tmp_path):
+    started = []
+    def start(printers):
+        started.append(PrintSpooler(printers, str(tmp_path / 'spool')))
+        return started[-1]
+    yield start
+    for spooler in started:
+        spooler.stop()
+
+def _dead_address():
+    """An address nothing listens on (connection refused)."""
+    with socket.create_server(('127.0.0.1', 0)) as server:
+        return server.getsockname()[:2]
+
+def _wait(predicate, timeout=15.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out waiting"
+        time.sleep(0.01)
+
+def _received(printer, count):
+    """The printer's receipts once it has read count of them (DONE only means the spooler sent them)."""
+    _wait(lambda: len(printer.receipts) >= count)
+    return printer.receipts
+
+def _wait_status(spooler, job_id, status):
+    _wait(lambda: spooler.status(job_id)['status'] == status)
+    return spooler.status(job_id)
+
+def test_backoff_doubles_up_to_max():
+    assert [printing.backoff_delay(n) for n in range(1, 7)] == [0.01, 0.02, 0.04, 0.05, 0.05, 0.05]
+
+def test_prints_over_one_connection(fake_printers, spoolers):
+    printer = fake_printers()
+    spooler = spoolers({'receipt': printer.address})
+    job_ids = [spooler.submit('receipt', f"receipt {i}".encode() + CUT) for i in range(3)]
+    for job_id in job_ids:
+        assert _wait_status(spooler, job_id, DONE)['attempts'] == 1
+    assert _received(printer, 3) == [b"receipt 0", b"receipt 1", b"receipt 2"]
+    assert printer.connections == 1
+
+def test_retries_until_printer_comes_back(fake_printers, spoolers):
+    spooler = spoolers({'receipt': _dead_address()})
+    job_id = spooler.submit('receipt', b"late" + CUT)
+    _wait(lambda: spooler.status(job_id)['attempts'] >= 2)
+    assert spooler.status(job_id)['status'] in (QUEUED, PRINTING)
+    assert spooler.status(job_id)['error']
+
+    printer = fake_printers()
+    spooler.set_printer('receipt', printer.address)
+    job = _wait_status(spooler, job_id, DONE)
+    assert job['attempts'] >= 3 and job['error'] is None
+    assert _received(printer, 1) == [b"late"]
+
+def test_reconnects_after_printer_hangs_up(fake_printers, spoolers):
+    printer = fake_printers(drop_every=1)
+    spooler = spoolers({'receipt': printer.address})
+    for i in range(3):
+        _wait_status(spooler, spooler.submit('receipt', f"receipt {i}".encode() + CUT), DONE)
+        # the printer hangs up after each receipt; send the next one once the spooler can see that
+        _wait(lambda: spooler._workers['receipt']._peer_closed())
+    assert _received(printer, 3) == [b"receipt 0", b"receipt 1", b"receipt 2"]
+    assert printer.connections == 3
+
+def test_fails_after_max_attempts(monkeypatch, spoolers):
+    monkeypatch.setattr(printing, 'MAX_ATTEMPTS', 3)
+    spooler = spoolers({'receipt': _dead_address()})
+    job = _wait_status(spooler, spooler.submit('receipt', b"never" + CUT), FAILED)
+    assert job['attempts'] == 3
+    assert job['error']
+
+def test_write_timeout_on_stalled_printer(monkeypatch, fake_printers, spoolers):
+    monkeypatch.setattr(printing, 'MAX_ATTEMPTS', 2)
+    printer = fake_printers(delay=2.0)  # accepts, then doesn't read
+    spooler = spoolers({'receipt': printer.address})
+    job = _wait_status(spooler, spooler.submit('receipt', b"x" * (8 << 20)), FAILED)
+    assert job['attempts'] == 2
+    assert 'timed out' in job['error']
+
+def test_spooled_jobs_resume_on_start(fake_printers, spoolers):
+    dead = _dead_address()
+    first = spoolers({'receipt': dead, 'workcenter-2': dead})
+    receipt = first.submit('receipt', b"receipt" + CUT)
+    ticket = first.submit('workcenter-2', b"ticket" + CUT)
+    _wait(lambda: first.status(receipt)['attempts'] and first.status(ticket)['attempts'])
+    first.stop()
+    assert first.status(receipt)['status'] == QUEUED
+
+    printer = fake_printers()
+    bar = fake_printers()
+    second = spoolers({'receipt': printer.address})
+    _wait_status(second, receipt, DONE)
+    assert _received(printer, 1) == [b"receipt"]
+    # a printer the new spooler doesn't know yet keeps its jobs until it is added
+    assert second.status(ticket)['status'] == QUEUED
+    second.set_printer('workcenter-2', bar.address)
+    _wait_status(second, ticket, DONE)
+    assert _received(bar, 1) == [b"ticket"]
+
+def test_configure_spooler_stops_previous_workers(monkeypatch, tmp_path, fake_printers):
+    monkeypatch.setattr(printing, '_spooler', None)
+    spool_dir = str(tmp_path / 'spool')
+    old = configure_spooler({'receipt': _dead_address()}, spool_dir)
+    job_id = old.submit('receipt', b"moved" + CUT)
+    _wait(lambda: old.status(job_id)['attempts'])
+    workers = list(old._workers.values())
+
+    printer = fake_printers()
+    new = configure_spooler({'receipt': printer.address}, spool_dir)
+    try:
+        assert get_spooler() is new
+        assert not any(worker.is_alive() for worker in workers)
+        _wait_status(new, job_id, DONE)
+        assert _received(printer, 1) == [b"moved"]
+    finally:
+        new.stop()
@@ -0,0 +1,99 @@
+# EXPLAIN QUERY PLAN check for the date-range report pages.
+#
+# Every SQL string that reads the history or rollup tables is pulled out of the
+# report pages (so the check can't drift from what the pages run) and explained
+# against the migrated test database. Each must search an index on those tables
+# rather than scan them. Run after touching these queries or their indexes.
+import ast
+import re
+import pytest
+from utils.database import get_db_connection
+from utils.paging import seek_union
+
+REPORT_PAGES = (
+    'pages/16_Open_Order.py',
+    'pages/30_Order_History.py',
+    'pages/31_Sales_History.py',
+)
+HOT_TABLES = ('Order_History', 'Order_Event', 'Sales_Rollup', 'Sales_Rollup_Order')
+HOT_TABLE = re.compile(rf"\bFROM\s+({'|'.join(HOT_TABLES)})\b")
+
+# "SCAN Order_History", even "USING COVERING INDEX", reads the whole table (or index)
+SCAN = re.compile(r'^SCAN (\S+)')
+# "SEARCH Order_History USING COVERING INDEX ..." / "SEARCH r USING PRIMARY KEY ..."
+SEARCH = re.compile(r'^SEARCH \S+ USING .*(INDEX|PRIMARY KEY)')
+
+def _literal(node):
+    """Text of a string literal; f-string fields (history_tables() sources, tables) become Order_History."""
+    if isinstance(node, ast.Constant) and isinstance(node.value, str):
+        return node.value
+    if isinstance(node, ast.JoinedStr):
+        return ''.join(part.value if isinstance(part, ast.Constant) else 'Order_History'
+                       for part in node.values)
+    return None
+
+def _tree(page):
+    with open(page, encoding='utf-8') as f:
+        return ast.parse(f.read(), page)
+
+def report_queries(page):
+    """(lineno, sql) for the SQL string literals in a page that select from a hot table."""
+    tree = _tree(page)
+    inside_fstrings = {id(part) for node in ast.walk(tree) if isinstance(node, ast.JoinedStr)
+                       for part in node.values}
+    for node in ast.walk(tree):
+        if id(node) in inside_fstrings:
+            continue
+        sql = _literal(node)
+        if sql is None:
+            continue
+        sql = sql.strip().replace('{Order_History}', 'Order_History')  # per-table templates
+        if re.search(r'\bIN page\b', sql):
+            continue  # lookups of the keys seek_union() found; see test_history_page_query
+        if re.match(r'SELECT\s', sql, re.I) and HOT_TABLE.search(sql):
+            yield node.lineno, sql
+
+def page_constants(page, *names):
+    """Values of a page's module-level string/list constants."""
+    values = {}
+    for node in _tree(page).body:
+        if isinstance(node, ast.Assign) and len(node.targets) == 1 and getattr(node.targets[0], 'id', None) in names:
+            values[node.targets[0].id] = ast.literal_eval(node.value)
+    return [values[name] for name in names]
+
+def explain(conn, sql):
+    named = re.findall(r':(\w+)', sql)
+    params = dict.fromkeys(named) if named else [None] * sql.count('?')
+    return [row['detail'] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+
+def assert_uses_indexes(plan, sql):
+    # Scanning a subquery's result (the history/event union named oh, the page CTE) reads no table
+    subqueries = {step.split()[-1] for step in plan if re.match(r'(CO-ROUTINE|MATERIALIZE) ', step)}
+    scans = [step for step in plan if SCAN.match(step) and SCAN.match(step).group(1) not in subqueries]
+    assert not scans and any(SEARCH.match(step) for step in plan), "\n".join([sql, *plan])
+
+QUERIES = [pytest.param(sql, id=f"{page.split('/')[-1]}:{lineno}")
+           for page in REPORT_PAGES for lineno, sql in report_queries(page)]
+
+@pytest.mark.parametrize('sql', QUERIES)
+def test_report_query_uses_index(db, sql):
+    with get_db_connection() as conn:
+        assert_uses_indexes(explain(conn, sql), sql)
+
+@pytest.mark.parametrize('page', ['pages/16_Open_Order.py', 'pages/30_Order_History.py'])
+def test_history_page_query(db, page):
+    """The paging query as the page assembles it: every branch seeks its index."""
+    history_keys, event_keys, key_columns = page_constants(page, 'HISTORY_KEYS', 'EVENT_KEYS', 'KEY_COLUMNS')
+    keys = seek_union([history_keys.format(Order_History='main.Order_History'), event_keys], key_columns)
+    lookup = f"""
+        WITH page AS MATERIALIZED ({keys})
+        SELECT order_id FROM main.Order_History WHERE (timestamp, order_id) IN page
+        UNION ALL
+        SELECT ev.order_id FROM Order_Event ev JOIN Order_Cart oc ON oc.order_id = ev.order_id
+        WHERE ev.to_status IN (12, 13) AND (ev.timestamp, ev.order_id) IN page
+    """
+    with get_db_connection() as conn:
+        plan = explain(conn, lookup)
+    assert_uses_indexes(plan, lookup)
+    assert any('Order_History USING COVERING INDEX idx_order_history_timestamp_status' in step for step in plan)
+    assert any('Order_Event USING COVERING INDEX idx_order_event_timestamp_status' in step for step in plan)
@@ -0,0 +1,66 @@
+# Sales rollup tax must add up to what checkout charged (utils.pricing), both as
+# the rollup_order_paid trigger records a payment and after a rebuild.
+#
+#   python -m pytest tests
+import pytest
+from utils import database
+from utils.database import get_db_connection, get_order_lines
+from utils.orders import insert_order, settle_orders
+from utils.pricing import price_orders
+from utils.rollups import rebuild_sales_rollup
+
+def _products(conn, prices):
+    """Give the first len(prices) products these prices (cents) at 4.5%; returns their ids."""
+    ids = [row[0] for row in conn.execute("SELECT product_id FROM Product ORDER BY product_id LIMIT ?",
+                                          (len(prices),))]
+    conn.executemany("UPDATE Product SET price = ?, tax = 4.5 WHERE product_id = ?", zip(prices, ids))
+    return ids
+
+def _place_and_pay(prices):
+    with database.get_write_connection() as conn:
+        ids = _products(conn, prices)
+        items = [{'product_id': product_id, 'quantity': 1, 'modifiers': []} for product_id in ids]
+        order_id = insert_order(conn, 'test', '', '', items)
+    orders, _ = price_orders(get_order_lines(10, [order_id]))
+    with database.get_write_connection() as conn:
+        settle_orders(conn, {order_id: orders[order_id]['total']})
+    return orders[order_id]['tax']
+
+def _rollup_tax():
+    with get_db_connection() as conn:
+        return conn.execute("SELECT grain, SUM(tax) FROM Sales_Rollup GROUP BY grain ORDER BY grain").fetchall()
+
+@pytest.mark.parametrize('prices, expected', [
+    ([100, 100], 9),         # per product: 4.5¢ → 5¢ each, 10¢; per order: 9¢
+    ([100, 100, 100], 14),   # 13.5¢ → 14¢, not 15¢
+    ([111, 222, 333], 30),   # 29.97¢ → 30¢
+])
+def test_rollup_tax_matches_checkout(db, prices, expected):
+    charged = _place_and_pay(prices)
+    assert charged == expected
+    assert [tuple(row) for row in _rollup_tax()] == [('day', charged), ('hour', charged)]
+
+    with database.get_write_connection() as conn:
+        rebuild_sales_rollup(conn)
+    assert [tuple(row) for row in _rollup_tax()] == [('day', charged), ('hour', charged)]
+
+def test_settling_orders_together_keeps_each_total(db):
+    with database.get_write_connection() as conn:
+        ids = _products(conn, [100, 250])
+        order_ids = [insert_order(conn, 'test', '', '', [{'product_id': product_id, 'quantity': 1, 'modifiers': []}])
+                     for product_id in ids]
+    orders, totals = price_orders(get_order_lines(10, order_ids))
+    with database.get_write_connection() as conn:
+        settle_orders(conn, {order_id: orders[order_id]['total'] for order_id in order_ids})
+
+    with get_db_connection() as conn:
+        stored = dict(conn.execute("SELECT order_id, total FROM Order_Cart WHERE order_id IN (?, ?)", order_ids).fetchall())
+        revenue = conn.execute("SELECT grain, order_count, revenue FROM Sales_Rollup_Order ORDER BY grain").fetchall()
+    assert stored == {order_id: orders[order_id]['total'] for order_id in order_ids}
+    assert [tuple(row) for row in revenue] == [('day', 2, totals['total']), ('hour', 2, totals['total'])]
+
+    with database.get_write_connection() as conn:
+        rebuild_sales_rollup(conn)
+    with get_db_connection() as conn:
+        revenue = conn.execute("SELECT grain, order_count, revenue FROM Sales_Rollup_Order ORDER BY grain").fetchall()
+    assert [tuple(row) for row in revenue] == [('day', 2, totals['total']), ('hour', 2, totals['total'])]
@@ -0,0 +1,43 @@
+# An order routed to two stations is ready only once both KDS screens have
+# confirmed their part (utils.order_state.confirm_station).
+from utils import database
+from utils.catalog import get_catalog, invalidate_catalog
+from utils.database import get_db_connection, get_kitchen_board
+from utils.order_state import confirm_station, PAID, READY
+from utils.orders import insert_order, settle_orders
+from utils.routing import split_order
+
+def _two_station_order():
+    """Route the second product to a new 'Bar' station and pay an order for both products."""
+    with database.get_write_connection() as conn:
+        ids = [row[0] for row in conn.execute("SELECT product_id FROM Product ORDER BY product_id LIMIT 2")]
+        bar = conn.execute("INSERT INTO Workcenter (description) VALUES ('Bar')").lastrowid
+        conn.execute("INSERT INTO Workcenter_Route (workcenter_id, product_id) VALUES (?, ?)", (bar, ids[1]))
+        items = [{'product_id': product_id, 'quantity': 1, 'modifiers': []} for product_id in ids]
+        order_id = insert_order(conn, 'test', '', '', items)
+        settle_orders(conn, {order_id: 0})
+    invalidate_catalog()
+    order, = get_kitchen_board(PAID, [order_id])
+    return order_id, sorted(split_order(order, get_catalog()))
+
+def _status(order_id):
+    with get_db_connection() as conn:
+        return conn.execute("SELECT order_status FROM Order_Cart WHERE order_id = ?", (order_id,)).fetchone()[0]
+
+def test_order_ready_once_every_station_confirms(db):
+    order_id, stations = _two_station_order()
+    assert len(stations) == 2
+    kitchen, bar = stations
+
+    with database.get_write_connection() as conn:
+        assert confirm_station(conn, order_id, kitchen, stations) == []
+    assert _status(order_id) == PAID
+
+    # a second tap on the same screen changes nothing
+    with database.get_write_connection() as conn:
+        assert confirm_station(conn, order_id, kitchen, stations) == []
+    assert _status(order_id) == PAID
+
+    with database.get_write_connection() as conn:
+        assert confirm_station(conn, order_id, bar, stations) == [order_id]
+    assert _status(order_id) == READY
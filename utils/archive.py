@@ -0,0 +1,173 @@
+# Monthly archives for the audit tables (Order_History, Customer_History).
+#
+# Closed months are copied into archive/history-YYYY-MM.database and then
+# deleted from pos.database, keeping the hot file small. Archive_Month lists
+# what has been moved; history_tables() attaches the archives a date range
+# needs so reports read hot and archived rows as one table, and
+# history_sources() lists them separately for queries that seek in each.
+#
+#   python -m utils.archive [--retain-months 3] [--vacuum]
+import argparse
+import os
+import sqlite3
+from contextlib import contextmanager
+from datetime import date
+from utils.database import get_pool, get_db_connection, get_write_connection
+
+ARCHIVE_DIR = 'archive'
+HISTORY_TABLES = ('Order_History', 'Customer_History')
+RETAIN_MONTHS = 3  # current month plus this many before it stay in pos.database
+
+def archive_path(month):
+    return os.path.join(ARCHIVE_DIR, f"history-{month}.database")
+
+def _month_start(month):
+    return f"{month}-01"
+
+def _next_month(month):
+    year, mon = int(month[:4]), int(month[5:7])
+    return f"{year + mon // 12:04d}-{mon % 12 + 1:02d}"
+
+def _columns(conn, table, schema='main'):
+    return [row[1] for row in conn.execute(f"PRAGMA {schema}.table_info({table})")]
+
+# ── Reading ───────────────────────────────────────────────────────────────────
+
+@contextmanager
+def history_sources(conn, start_date, end_date):
+    """
+    Attach the archives overlapping start_date..end_date (inclusive dates) to
+    conn for the duration of the block. Yields {table: [qualified table names]}:
+    the hot table first, then each archive's copy. Use outside a transaction
+    (ATTACH rule).
+    """
+    months = [row[0] for row in conn.execute(
+        "SELECT month FROM Archive_Month WHERE month >= ? AND month <= ? ORDER BY month",
+        (start_date.isoformat()[:7], end_date.isoformat()[:7])
+    )]
+    attached = []
+    try:
+        for month in months:
+            alias = f"archive_{month.replace('-', '_')}"
+            conn.execute(f"ATTACH DATABASE ? AS {alias}", (archive_path(month),))
+            attached.append(alias)
+        yield {table: [f"main.{table}"] + [f"{alias}.{table}" for alias in attached]
+               for table in HISTORY_TABLES}
+    finally:
+        for alias in attached:
+            conn.execute(f"DETACH DATABASE {alias}")
+
+@contextmanager
+def history_tables(conn, start_date, end_date):
+    """
+    Like history_sources(), but yields {table: FROM-clause source}: the plain
+    table name when nothing is archived, otherwise a UNION ALL of the hot
+    table and each archive.
+    """
+    with history_sources(conn, start_date, end_date) as sources:
+        tables = {}
+        for table, names in sources.items():
+            if len(names) == 1:
+                tables[table] = table
+                continue
+            columns = ', '.join(_columns(conn, table))
+            tables[table] = "(" + " UNION ALL ".join(f"SELECT {columns} FROM {name}" for name in names) + ")"
+        yield tables
+
+# ── Archiving ─────────────────────────────────────────────────────────────────
+
+def closed_months(retain_months=RETAIN_MONTHS, today=None):
+    """Months with hot history rows older than the retention window."""
+    today = today or date.today()
+    cutoff_index = today.year * 12 + today.month - 1 - retain_months
+    cutoff = f"{cutoff_index // 12:04d}-{cutoff_index % 12 + 1:02d}-01"
+    months = set()
+    with get_db_connection() as conn:
+        for table in HISTORY_TABLES:
+            months.update(row[0] for row in conn.execute(
+                f"SELECT DISTINCT substr(timestamp, 1, 7) FROM {table} WHERE timestamp < ?", (cutoff,)
+            ) if row[0])
+    return sorted(months)
+
+def archive_month(month):
+    """
+    Move one month of history into its archive file; returns {table: rows moved}.
+    The copy is committed to the archive first, then the hot rows are deleted
+    and the month registered in Archive_Month in one write transaction, so
+    readers never see a month twice. Safe to re-run after a failure.
+    """
+    start, end = _month_start(month), _month_start(_next_month(month))
+    path = archive_path(month)
+    os.makedirs(ARCHIVE_DIR, exist_ok=True)
+    with get_db_connection() as conn:
+        row = conn.execute(
+            "SELECT order_history_rows, customer_history_rows FROM Archive_Month WHERE month = ?", (month,)
+        ).fetchone()
+    registered = dict(zip(HISTORY_TABLES, row or (0, 0)))
+
+    # 1. Copy into the archive. Rows past the registered count are left over
+    #    from an interrupted run (copied, but never deleted from the hot table).
+    copy = sqlite3.connect(get_pool().path, timeout=30)
+    copied = {}
+    try:
+        copy.execute("ATTACH DATABASE ? AS archive", (path,))
+        for table in HISTORY_TABLES:
+            ddl = copy.execute(
+                "SELECT sql FROM main.sqlite_master WHERE type = 'table' AND name = ?", (table,)
+            ).fetchone()[0]
+            copy.execute(ddl.replace(f"CREATE TABLE {table}", f"CREATE TABLE IF NOT EXISTS archive.{table}", 1))
+            copy.execute(f"CREATE INDEX IF NOT EXISTS archive.idx_{table.lower()}_timestamp ON {table}(timestamp)")
+        with copy:
+            for table in HISTORY_TABLES:
+                columns = ', '.join(_columns(copy, table))
+                copy.execute(
+                    f"DELETE FROM archive.{table} WHERE rowid NOT IN "
+                    f"(SELECT rowid FROM archive.{table} ORDER BY rowid LIMIT ?)", (registered[table],)
+                )
+                copied[table] = copy.execute(f'''
+                    INSERT INTO archive.{table} ({columns})
+                    SELECT {columns} FROM main.{table} WHERE timestamp >= ? AND timestamp < ?
+                ''', (start, end)).rowcount
+    finally:
+        copy.close()
+
+    # 2. Drop the hot rows and register the archive
+    with get_write_connection() as conn:
+        for table in HISTORY_TABLES:
+            hot = conn.execute(
+                f"SELECT COUNT(*) FROM {table} WHERE timestamp >= ? AND timestamp < ?", (start, end)
+            ).fetchone()[0]
+            if hot != copied[table]:
+                raise RuntimeError(f"{table} {month}: {hot} rows but {copied[table]} archived; not deleting")
+        for table in HISTORY_TABLES:
+            conn.execute(f"DELETE FROM {table} WHERE timestamp >= ? AND timestamp < ?", (start, end))
+        conn.execute('''
+            INSERT INTO Archive_Month (month, path, order_history_rows, customer_history_rows)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT (month) DO UPDATE SET
+                path = excluded.path,
+                order_history_rows = order_history_rows + excluded.order_history_rows,
+                customer_history_rows = customer_history_rows + excluded.customer_history_rows,
+                archived_at = CURRENT_TIMESTAMP
+        ''', (month, path, copied['Order_History'], copied['Customer_History']))
+    return copied
+
+def archive_closed_months(retain_months=RETAIN_MONTHS):
+    return {month: archive_month(month) for month in closed_months(retain_months)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move closed months of history into archive databases")
+    parser.add_argument('--retain-months', type=int, default=RETAIN_MONTHS)
+    parser.add_argument('--vacuum', action='store_true', help="reclaim the freed space in pos.database")
+    args = parser.parse_args()
+
+    moved = archive_closed_months(args.retain_months)
+    for month, counts in moved.items():
+        print(f"{month}: " + ", ".join(f"{rows} {table}" for table, rows in counts.items()))
+    if not moved:
+        print("Nothing to archive")
+    if args.vacuum and moved:
+        conn = sqlite3.connect(get_pool().path, timeout=30)
+        conn.execute("VACUUM")
+        conn.close()
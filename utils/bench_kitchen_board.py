@@ -0,0 +1,138 @@
+# Benchmark: KDS refresh cost vs number of open tickets.
+# Runs against a throwaway copy of pos.database:  python -m utils.bench_kitchen_board
+import os, shutil, sqlite3, tempfile, time
+from utils.database import (configure_pool, get_db_connection, get_write_connection, get_kitchen_board,
+                            get_order_lines, DB_PATH)
+from utils.orders import insert_order
+from utils.order_state import advance, PAID
+
+TICKETS = [5, 30, 100, 300]
+ITEMS_PER_TICKET = 3
+REPEAT = 20
+
+def seed(tickets):
+    """Replace the pooled database's orders with tickets paid orders, placed like the register does."""
+    with get_write_connection() as conn:
+        conn.execute("DELETE FROM Order_Cart")
+        conn.execute("DELETE FROM Order_Product")
+        products = [row[0] for row in conn.execute("SELECT product_id FROM Product")]
+        modifiers = [row[0] for row in conn.execute("SELECT modifier_id FROM Modifier")]
+        order_ids = []
+        for i in range(tickets):
+            items = [{'product_id': products[(i + j) % len(products)], 'quantity': 1,
+                      'modifiers': [{'modifier_id': m, 'description': None} for m in modifiers[j:j + 2]]}
+                     for j in range(ITEMS_PER_TICKET)]
+            order_ids.append(insert_order(conn, 'bench', None, f"ticket {i}", items))
+        advance(conn, order_ids, PAID)
+        # The original KDS (unpooled_refresh) reads the old comma-separated column
+        conn.execute("""
+            UPDATE Order_Product
+            SET modifiers = (SELECT group_concat(modifier_id) FROM Order_Product_Modifier opm
+                             WHERE opm.order_product_id = Order_Product.order_product_id)
+        """)
+
+def summarize(board):
+    """{order_id: sorted (product_id, quantity, modifier ids)} of a get_kitchen_board() result."""
+    return {
+        order['order_id']: sorted(
+            (item['product_id'], item['product_quantity'],
+             tuple(sorted(int(m) for m in item['modifiers'].split(',') if m)))
+            for item in order['items']
+        )
+        for order in board
+    }
+
+def count_statements():
+    """Count statements on the pooled read connection used by this thread."""
+    counter = {'statements': 0}
+    conn = get_db_connection()
+    conn.set_trace_callback(lambda sql: counter.__setitem__('statements', counter['statements'] + 1))
+    return conn, counter
+
+def per_ticket_refresh():
+    # Previous KDS shape: list open orders, then load each ticket's items
+    conn = get_db_connection()
+    order_ids = [row[0] for row in conn.execute(
+        "SELECT DISTINCT oc.order_id FROM Order_Cart oc "
+        "INNER JOIN Order_Product op ON oc.order_id = op.order_id WHERE oc.order_status = 11"
+    )]
+    conn.close()
+    board = {}
+    for order_id in order_ids:
+        board[order_id] = sorted(
+            (line['product_id'], line['product_quantity'],
+             tuple(sorted(mod['modifier_id'] for mod in line['modifiers'])))
+            for line in get_order_lines(11, [order_id])
+        )
+    return board
+
+def unpooled_refresh(path):
+    # Original KDS: a fresh connection (and WAL pragma) per query
+    def connect():
+        conn = sqlite3.connect(path)
+        conn.execute('PRAGMA journal_mode=WAL;')
+        return conn
+    conn = connect()
+    order_ids = [row[0] for row in conn.execute(
+        "SELECT DISTINCT oc.order_id FROM Order_Cart oc "
+        "INNER JOIN Order_Product op ON oc.order_id = op.order_id WHERE oc.order_status = 11"
+    )]
+    conn.close()
+    board = {}
+    for order_id in order_ids:
+        conn = connect()
+        items = conn.execute(
+            "SELECT op.product_id, op.product_quantity, op.modifiers FROM Order_Product op "
+            "INNER JOIN Product pi ON op.product_id = pi.product_id WHERE op.order_id = ?", (order_id,)
+        ).fetchall()
+        conn.close()
+        lines = []
+        for product_id, quantity, modifiers in items:
+            ids = [m for m in (modifiers or '').split(',') if m]
+            if ids:
+                conn = connect()
+                ids = [row[0] for row in conn.execute(
+                    f"SELECT modifier_id FROM Modifier WHERE modifier_id IN ({','.join('?' for _ in ids)})", ids
+                )]
+                conn.close()
+            lines.append((product_id, quantity, tuple(sorted(int(m) for m in ids))))
+        board[order_id] = sorted(lines)
+    return board
+
+def timed_unpooled(path):
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        unpooled_refresh(path)
+    return (time.perf_counter() - start) / REPEAT * 1000
+
+def timed(fn):
+    conn, counter = count_statements()
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        fn()
+    elapsed = (time.perf_counter() - start) / REPEAT
+    conn.set_trace_callback(None)
+    conn.close()
+    return elapsed * 1000, counter['statements'] // REPEAT
+
+if __name__ == "__main__":
+    workdir = tempfile.mkdtemp()
+    try:
+        print(f"{'tickets':>8} {'board ms':>9} {'stmts':>6} {'per-ticket ms':>14} {'stmts':>6} {'unpooled ms':>12}")
+        for tickets in TICKETS:
+            # A new file each round; the pool being replaced may still hold the last one's WAL
+            path = os.path.join(workdir, f'bench-{tickets}.database')
+            shutil.copy(DB_PATH, path)
+            configure_pool(path)
+            seed(tickets)
+            # All three must show the same tickets before their timings mean anything
+            board = summarize(get_kitchen_board())
+            if len(board) != tickets or per_ticket_refresh() != board or unpooled_refresh(path) != board:
+                raise SystemExit(f"Kitchen board paths disagree at {tickets} tickets")
+            board_ms, board_stmts = timed(get_kitchen_board)
+            ticket_ms, ticket_stmts = timed(per_ticket_refresh)
+            unpooled_ms = timed_unpooled(path)
+            print(f"{tickets:>8} {board_ms:>9.2f} {board_stmts:>6} {ticket_ms:>14.2f} {ticket_stmts:>6} {unpooled_ms:>12.2f}")
+    finally:
+        configure_pool()
+        shutil.rmtree(workdir, ignore_errors=True)
@@ -0,0 +1,115 @@
+# Register cart kept in st.session_state.cart while an order is rung up.
+#
+# Lines are __slots__ objects indexed by (product, modifier selection), so
+# adding the same thing again bumps a quantity without scanning the cart, the
+# subtotal is kept as lines change, and the cart remembers which lines changed
+# since the last Live_Cart sync so the CFD only gets those rows.
+
+
+class CartLine:
+    __slots__ = ('key', 'line_key', 'product_id', 'product_name', 'base_price', 'modifiers', 'price', 'quantity')
+
+    def __init__(self, key, product_id, product_name, base_price, modifiers):
+        self.key = key
+        self.product_id = product_id
+        self.product_name = product_name
+        self.base_price = base_price
+        self.modifiers = modifiers  # ((modifier_id, description, price), ...) sorted by modifier_id
+        self.price = base_price + sum(price for _, _, price in modifiers)  # per unit, with modifiers
+        self.quantity = 0
+        # Live_Cart row id: product plus its exact modifier selection
+        self.line_key = f"{product_id}|" + ",".join(f"{mod_id}={desc}" for mod_id, desc, _ in modifiers)
+
+    @property
+    def total(self):
+        return self.price * self.quantity
+
+    @property
+    def modifiers_text(self):
+        return ", ".join(desc for _, desc, _ in self.modifiers)
+
+    def live_cart_row(self):
+        """(product_name, modifiers_text, quantity, unit_price, total_price) for Live_Cart."""
+        return (self.product_name, self.modifiers_text, self.quantity, self.price, self.total)
+
+
+class Cart:
+    __slots__ = ('_lines', '_index', 'subtotal', '_dirty', '_synced')
+
+    def __init__(self):
+        self._lines = []
+        self._index = {}     # (product_id, modifiers) -> CartLine
+        self.subtotal = 0
+        self._dirty = set()  # line_keys changed since the last sync
+        self._synced = set() # line_keys currently in Live_Cart
+
+    def __len__(self):
+        return len(self._lines)
+
+    def __iter__(self):
+        return iter(self._lines)
+
+    def __bool__(self):
+        return bool(self._lines)
+
+    def add(self, product_id, product_name, base_price, modifiers, quantity=1):
+        """Add a product with its modifier dicts (modifier_id, description, price); merges identical lines."""
+        mods = tuple(sorted((mod['modifier_id'], mod['description'], mod['price'] or 0) for mod in modifiers or ()))
+        key = (product_id, mods)
+        line = self._index.get(key)
+        if line is None:
+            line = self._index[key] = CartLine(key, product_id, product_name, base_price, mods)
+            self._lines.append(line)
+        self._set_quantity(line, line.quantity + quantity)
+        return line
+
+    def change_quantity(self, index, delta):
+        """Add delta to the line at index; the line goes away at zero."""
+        if 0 <= index < len(self._lines):
+            line = self._lines[index]
+            self._set_quantity(line, line.quantity + delta)
+
+    def _set_quantity(self, line, quantity):
+        quantity = max(quantity, 0)
+        self.subtotal += line.price * (quantity - line.quantity)
+        line.quantity = quantity
+        if quantity == 0:
+            del self._index[line.key]
+            self._lines.remove(line)
+        self._dirty.add(line.line_key)
+
+    def clear(self):
+        self._dirty.update(line.line_key for line in self._lines)
+        self._lines = []
+        self._index = {}
+        self.subtotal = 0
+
+    def order_items(self):
+        """Lines in the shape utils.orders.insert_order takes."""
+        return [{
+            'product_id': line.product_id,
+            'quantity': line.quantity,
+            'modifiers': [{'modifier_id': mod_id, 'description': desc} for mod_id, desc, _ in line.modifiers],
+        } for line in self._lines]
+
+    # ── Live_Cart sync ────────────────────────────────────────────────────────
+
+    def changes(self):
+        """(upserts {line_key: row}, deletes [line_key]) since the last mark_synced()."""
+        current = {line.line_key: line for line in self._lines if line.line_key in self._dirty}
+        upserts = {key: line.live_cart_row() for key, line in current.items()}
+        deletes = [key for key in self._dirty if key not in current and key in self._synced]
+        return upserts, deletes
+
+    def mark_synced(self, upserts, deletes):
+        self._synced.update(upserts)
+        self._synced.difference_update(deletes)
+        self._dirty.difference_update(upserts)
+        self._dirty.difference_update(deletes)
+        # Lines added and removed again before a sync never reached Live_Cart
+        self._dirty.intersection_update(line.line_key for line in self._lines)
+
+    def resync(self):
+        """Live_Cart was emptied elsewhere (e.g. by Checkout): send every line again."""
+        self._synced = set()
+        self._dirty = {line.line_key for line in self._lines}
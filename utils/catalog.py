@@ -0,0 +1,149 @@
+import threading
+import time
+from utils.database import get_db_connection, get_feed_versions
+
+
+class MenuCatalog:
+    """Snapshot of the register menu: categories → ranked products → grouped modifiers,
+    plus the kitchen routing (which Workcenter makes each product)."""
+
+    def __init__(self, version, categories, products, modifier_groups, type_items,
+                 workcenters=None, routes=None, tax_rates=None):
+        self.version = version
+        self.categories = categories            # [(category_id, description)]
+        self._products = products               # {category_id: [(product_id, description, price)]}
+        self._modifier_groups = modifier_groups # {product_id: {modifier_type_id: {...}}}
+        self._type_items = type_items           # {modifier_type_id: [description]}
+        self.workcenters = workcenters or {}    # {workcenter_id: (description, ip_address)}
+        self._routes = routes or {}             # {('product' | 'category', id): workcenter_id}
+        self._tax_rates = tax_rates or {}       # {product_id: Product.tax percent}
+        self._product_category = {
+            product_id: category_id
+            for category_id, rows in products.items()
+            for product_id, _, _ in rows
+        }
+
+    def products(self, category_id):
+        return self._products.get(category_id, [])
+
+    def modifier_groups(self, product_id):
+        return self._modifier_groups.get(product_id, {})
+
+    def type_items(self, modifier_type_id):
+        return self._type_items.get(modifier_type_id, [])
+
+    def workcenter_for(self, product_id):
+        """Product route, else its category's route, else the first Workcenter."""
+        workcenter_id = self._routes.get(('product', product_id))
+        if workcenter_id is None:
+            workcenter_id = self._routes.get(('category', self._product_category.get(product_id)))
+        if workcenter_id is None and self.workcenters:
+            workcenter_id = min(self.workcenters)
+        return workcenter_id
+
+    def tax_rate(self, product_id):
+        """Product.tax (percent); None when unknown, which utils.pricing treats as the default rate."""
+        return self._tax_rates.get(product_id)
+
+
+def load_catalog():
+    """Read the catalog version and the whole menu in a handful of queries."""
+    conn = get_db_connection()
+    try:
+        (version,) = get_feed_versions(['catalog'])
+        categories = [tuple(row) for row in conn.execute(
+            "SELECT category_id, description FROM category WHERE status = 1 ORDER BY category_id"
+        )]
+
+        products = {}
+        tax_rates = {}
+        for category_id, product_id, description, price, tax in conn.execute('''
+            SELECT category_id, product_id, description, price, tax
+            FROM Product
+            WHERE category_id IS NOT NULL
+            ORDER BY category_id, rank
+        '''):
+            products.setdefault(category_id, []).append((product_id, description, price))
+            tax_rates[product_id] = tax
+
+        modifier_groups = {}
+        for product_id, mod_id, description, group_id, price, group_desc in conn.execute('''
+            SELECT
+                m.product_id,
+                m.modifier_id,
+                m.description,
+                m.modifier_type_id,
+                m.price,
+                mt.description as group_description
+            FROM Modifier m
+            LEFT JOIN Modifier_Type mt ON m.modifier_type_id = mt.modifier_type_id
+            WHERE m.product_id IS NOT NULL AND m.status = 1
+            ORDER BY m.product_id, m.modifier_type_id, m.modifier_id
+        '''):
+            groups = modifier_groups.setdefault(product_id, {})
+            if group_id not in groups:
+                groups[group_id] = {
+                    'group_description': group_desc,
+                    'modifiers': []
+                }
+            groups[group_id]['modifiers'].append({
+                'modifier_id':      mod_id,
+                'description':      description,
+                'price':            price,
+                'modifier_type_id': group_id
+            })
+
+        type_items = {}
+        for modifier_type_id, description in conn.execute('''
+            SELECT modifier_type_id, description
+            FROM Modifier_Type_Item
+            ORDER BY modifier_type_id, rowid
+        '''):
+            type_items.setdefault(modifier_type_id, []).append(description)
+
+        workcenters = {
+            workcenter_id: (description, ip_address)
+            for workcenter_id, description, ip_address in conn.execute(
+                "SELECT workcenter_id, description, ip_address FROM Workcenter"
+            )
+        }
+        routes = {}
+        for workcenter_id, category_id, product_id in conn.execute(
+            "SELECT workcenter_id, category_id, product_id FROM Workcenter_Route"
+        ):
+            if product_id is not None:
+                routes[('product', product_id)] = workcenter_id
+            else:
+                routes[('category', category_id)] = workcenter_id
+    finally:
+        conn.close()
+    return MenuCatalog(version, categories, products, modifier_groups, type_items, workcenters, routes, tax_rates)
+
+
+# Process-wide cache. Admin pages in this process invalidate it directly;
+# the catalog version in Change_Feed (bumped by triggers) catches edits made
+# elsewhere and is checked at most every VERSION_CHECK_INTERVAL seconds.
+VERSION_CHECK_INTERVAL = 30.0
+
+_catalog = None
+_checked_at = 0.0
+_catalog_lock = threading.Lock()
+
+def get_catalog():
+    global _catalog, _checked_at
+    catalog = _catalog
+    if catalog is not None and time.monotonic() - _checked_at < VERSION_CHECK_INTERVAL:
+        return catalog
+    with _catalog_lock:
+        if _catalog is not None and time.monotonic() - _checked_at < VERSION_CHECK_INTERVAL:
+            return _catalog
+        if _catalog is None or get_feed_versions(['catalog'])[0] != _catalog.version:
+            _catalog = load_catalog()
+        _checked_at = time.monotonic()
+        return _catalog
+
+def invalidate_catalog():
+    """Call after changing Category / Product / Modifier / Modifier_Type(_Item) / Workcenter(_Route)."""
+    global _catalog
+    with _catalog_lock:
+        _catalog = None
@@ -1,7 +1,14 @@
 import sqlite3
+import threading
+import time
+from contextlib import contextmanager
 import streamlit as st
 import pandas as pd
-from datetime import date, datetime
+from datetime import date, datetime, timedelta
+from utils.schema import migrate
+from utils.query_stats import InstrumentedCursor
+
+DB_PATH = 'pos.database'
 
 # Adapter: Python date → ISO 8601 string
 def adapt_date_iso(val):
@@ -15,12 +22,331 @@ def convert_date(val):
 sqlite3.register_adapter(date, adapt_date_iso)
 sqlite3.register_converter("date", convert_date)
 
-# Connect with type detection enabled
+# Pragmas applied once when a pooled connection is created
+CONNECTION_PRAGMAS = (
+    'PRAGMA journal_mode=WAL;',
+    'PRAGMA synchronous=NORMAL;',
+    'PRAGMA busy_timeout=5000;',
+    'PRAGMA temp_store=MEMORY;',
+    'PRAGMA cache_size=-8000;',
+)
+
+
+class PooledConnection(sqlite3.Connection):
+    """sqlite3 connection that goes back to its pool on close() instead of closing.
+
+    Existing helpers keep calling conn.close() / using `with conn:`; both now
+    hand the connection back to the pool.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.pool = None
+        self.last_used = time.monotonic()
+
+    # Route every statement through InstrumentedCursor so it shows up in the query stats
+    # (sqlite3's own Connection.execute shortcuts don't call cursor())
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        return self.cursor().executescript(sql_script)
+
+    def close(self):
+        if self.pool is None:
+            super().close()
+        else:
+            self.pool.release(self)
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        # Commit / rollback like sqlite3, then return to the pool
+        result = super().__exit__(exc_type, exc_value, traceback)
+        self.close()
+        return result
+
+    def discard(self):
+        """Really close the underlying sqlite3 connection."""
+        self.pool = None
+        super().close()
+
+
+class ConnectionPool:
+    """Thread-safe SQLite pool: per-thread read connections plus one writer.
+
+    A thread that already holds a read connection gets the same one back, so
+    nested helpers don't multiply connections. Connections left checked out by
+    threads that have exited (e.g. a Streamlit rerun that raised before close)
+    are reclaimed when the pool runs dry.
+    """
+
+    def __init__(self, path=DB_PATH, max_readers=8, timeout=10.0, health_check_interval=30.0):
+        self.path = path
+        self.max_readers = max_readers
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        self._cond = threading.Condition()
+        self._local = threading.local()
+        self._idle = []
+        self._in_use = {}  # conn -> owning thread
+        self._readers = 0
+        self._writer = None
+        self._writer_lock = threading.RLock()
+        self._closed = False
+        self._migrated = False
+        self.stats = {
+            'connections_created': 0,
+            'checkouts': 0,
+            'waits': 0,
+            'wait_ms_total': 0.0,
+            'wait_ms_max': 0.0,
+            'reclaimed': 0,
+            'health_check_failures': 0,
+            'writer_checkouts': 0,
+            'writer_wait_ms_total': 0.0,
+            'writer_wait_ms_max': 0.0,
+        }
+
+    def _connect(self):
+        conn = sqlite3.connect(
+            self.path,
+            detect_types=sqlite3.PARSE_DECLTYPES,
+            check_same_thread=False,
+            factory=PooledConnection,
+        )
+        conn.row_factory = sqlite3.Row
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        conn.pool = self
+        self.stats['connections_created'] += 1
+        return conn
+
+    def _is_healthy(self, conn):
+        if time.monotonic() - conn.last_used < self.health_check_interval:
+            return True
+        try:
+            conn.execute('SELECT 1').fetchone()
+            return True
+        except sqlite3.Error:
+            self.stats['health_check_failures'] += 1
+            return False
+
+    def _ensure_schema(self):
+        """Run pending migrations once, before the first connection is handed out."""
+        if self._migrated:
+            return
+        with self._writer_lock:
+            if self._migrated:
+                return
+            conn = self._connect()
+            conn.pool = None
+            try:
+                migrate(conn)
+            finally:
+                conn.discard()
+            self._migrated = True
+
+    def _reclaim_dead(self):
+        """Return connections held by threads that no longer exist."""
+        for conn, owner in list(self._in_use.items()):
+            if not owner.is_alive():
+                del self._in_use[conn]
+                if conn.in_transaction:
+                    conn.rollback()
+                self._idle.append(conn)
+                self.stats['reclaimed'] += 1
+
+    def acquire(self):
+        """Check out a read connection for the current thread."""
+        self._ensure_schema()
+        held = getattr(self._local, 'conn', None)
+        if held is not None:
+            self._local.depth += 1
+            return held
+
+        started = time.monotonic()
+        waited = False
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise sqlite3.ProgrammingError("Connection pool is closed")
+                if not self._idle:
+                    self._reclaim_dead()
+                if self._idle:
+                    conn = self._idle.pop()
+                    if not self._is_healthy(conn):
+                        conn.discard()
+                        self._readers -= 1
+                        continue
+                    break
+                if self._readers < self.max_readers:
+                    conn = self._connect()
+                    self._readers += 1
+                    break
+                remaining = self.timeout - (time.monotonic() - started)
+                if remaining <= 0:
+                    raise sqlite3.OperationalError(
+                        f"Timed out waiting for a database connection ({self.max_readers} in use)")
+                waited = True
+                self._cond.wait(remaining)
+
+            self._in_use[conn] = threading.current_thread()
+            self.stats['checkouts'] += 1
+            if waited:
+                wait_ms = (time.monotonic() - started) * 1000
+                self.stats['waits'] += 1
+                self.stats['wait_ms_total'] += wait_ms
+                self.stats['wait_ms_max'] = max(self.stats['wait_ms_max'], wait_ms)
+
+        self._local.conn = conn
+        self._local.depth = 1
+        return conn
+
+    def release(self, conn):
+        """Return a read connection; only the outermost release hands it back."""
+        if getattr(self._local, 'conn', None) is conn:
+            self._local.depth -= 1
+            if self._local.depth > 0:
+                return
+            self._local.conn = None
+        if conn.in_transaction:
+            # Same as closing a plain connection without commit
+            conn.rollback()
+        conn.last_used = time.monotonic()
+        with self._cond:
+            if self._in_use.pop(conn, None) is None:
+                return
+            if self._closed:
+                conn.discard()
+                return
+            self._idle.append(conn)
+            self._cond.notify()
+
+    @contextmanager
+    def writer(self):
+        """Exclusive access to the single writer connection, as one transaction."""
+        self._ensure_schema()
+        started = time.monotonic()
+        with self._writer_lock:
+            wait_ms = (time.monotonic() - started) * 1000
+            self.stats['writer_checkouts'] += 1
+            self.stats['writer_wait_ms_total'] += wait_ms
+            self.stats['writer_wait_ms_max'] = max(self.stats['writer_wait_ms_max'], wait_ms)
+
+            if self._closed:
+                raise sqlite3.ProgrammingError("Connection pool is closed")
+            if self._writer is None or not self._is_healthy(self._writer):
+                if self._writer is not None:
+                    self._writer.discard()
+                self._writer = self._connect()
+                self._writer.pool = None  # never handed out to readers
+
+            conn = self._writer
+            if conn.in_transaction:
+                # Nested use on the same thread joins the outer transaction
+                yield conn
+                return
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                yield conn
+            except BaseException:
+                conn.rollback()
+                raise
+            else:
+                conn.commit()
+            finally:
+                conn.last_used = time.monotonic()
+
+    def metrics(self):
+        """Pool size and wait-time counters."""
+        with self._cond:
+            snapshot = dict(self.stats)
+            snapshot['readers_open'] = self._readers
+            snapshot['readers_idle'] = len(self._idle)
+            snapshot['readers_in_use'] = len(self._in_use)
+            snapshot['max_readers'] = self.max_readers
+        snapshot['writer_open'] = self._writer is not None
+        return snapshot
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            for conn in self._idle:
+                conn.discard()
+            self._idle.clear()
+            self._readers = 0
+            self._cond.notify_all()
+        with self._writer_lock:
+            if self._writer is not None:
+                self._writer.discard()
+                self._writer = None
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    """Process-wide pool shared by every page and session."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool()
+    return _pool
+
+def configure_pool(path=DB_PATH, **kwargs):
+    """Replace the process-wide pool, e.g. to point a benchmark at another file."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+        _pool = ConnectionPool(path, **kwargs)
+    return _pool
+
+# Pooled read connection; close() returns it to the pool
 def get_db_connection():
-    conn = sqlite3.connect('pos.database', detect_types=sqlite3.PARSE_DECLTYPES)
-    conn.row_factory = sqlite3.Row
-    conn.execute('PRAGMA journal_mode=WAL;')
-    return conn
+    return get_pool().acquire()
+
+# Single writer connection; commits on success, rolls back on error
+def get_write_connection():
+    return get_pool().writer()
+
+def get_pool_metrics():
+    return get_pool().metrics()
+
+# Change feed: versions bumped by triggers whenever orders / Live_Cart change
+def get_feed_versions(feeds):
+    """One primary-key read; returns a tuple of versions in the order of feeds."""
+    feeds = list(feeds)
+    with get_db_connection() as conn:
+        rows = conn.execute(
+            f"SELECT feed, version FROM Change_Feed WHERE feed IN ({','.join('?' for _ in feeds)})", feeds
+        ).fetchall()
+    versions = {row['feed']: row['version'] for row in rows}
+    return tuple(versions.get(feed) for feed in feeds)
+
+def load_if_changed(cache_key, feeds, loader):
+    """
+    Return loader()'s result, re-running it only when one of the feeds has moved
+    since this session last loaded it. Polling screens call this every tick.
+    """
+    versions = get_feed_versions(feeds)
+    cached = st.session_state.get(cache_key)
+    if cached is not None and cached[0] == versions:
+        return cached[1]
+    data = loader()
+    st.session_state[cache_key] = (versions, data)
+    return data
+
+# Date picker range → half-open timestamp bounds for "timestamp >= ? AND timestamp < ?".
+# Unlike DATE(timestamp) BETWEEN ? AND ?, this lets SQLite range-scan the timestamp index.
+def date_bounds(start_date, end_date):
+    return (start_date.isoformat(), (end_date + timedelta(days=1)).isoformat())
 
 def get_table_data(table_name):
     try:
@@ -35,10 +361,9 @@ def add_item(table_name, item_value):
     """Inserts a new item into the specified generic table."""
     column_name = table_name
     try:
-        with get_db_connection() as conn:
+        with get_write_connection() as conn:
             conn.execute(f"INSERT INTO {table_name} ({column_name}) VALUES (?)", (item_value,))
-            conn.commit()
-            st.success(f"Added new {table_name}: **{item_value}**")
+        st.success(f"Added new {table_name}: **{item_value}**")
     except sqlite3.IntegrityError:
         st.warning(f"Error: {item_value} already exists in {table_name}.")
     except Exception as e:
@@ -46,78 +371,138 @@ def add_item(table_name, item_value):
         
 def update_row(table_name, row_id_col, row_data):
     try:
-        with get_db_connection() as conn:
+        with get_write_connection() as conn:
             cursor = conn.cursor()
             set_clause = ', '.join([f"{col} = ?" for col in row_data.keys() if col != row_id_col])
             values = [row_data[col] for col in row_data.keys() if col != row_id_col]
             values.append(row_data[row_id_col])
             cursor.execute(f"UPDATE {table_name} SET {set_clause} WHERE {row_id_col} = ?", values)
-            conn.commit()
     except Exception as e:
         st.error(f"Error updating row in Table {table_name}: {e}")
 
 def delete_row(table_name, row_id_col, row_id):
     try:
-        with get_db_connection() as conn:
+        with get_write_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(f"DELETE FROM {table_name} WHERE {row_id_col} = ?", (row_id,))
     except Exception as e:
         st.error(f"Error deleting row in Table {table_name}: {e}")
 
-# Get order details with modifiers
-def get_order_details():
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    # Get orders with products and their modifiers
-    cursor.execute("""
-        SELECT 
-            oc.order_id,
-            oc.subtotal,
-            oc.note,                   
-            op.product_id,
-            op.modifiers,
-            pi.description as product_description,
-            op.product_quantity,
-            pi.price as product_price
-        FROM Order_Cart oc
-        LEFT JOIN Order_Product op ON oc.order_id = op.order_id
-        LEFT JOIN Product pi ON op.product_id = pi.product_id
-        WHERE oc.order_status = 10
-        ORDER BY oc.order_id, pi.description
-    """)
-    
-    results = cursor.fetchall()
-    conn.close()
-    return results
-
-# Get modifier details for a list of modifier IDs
-def get_modifiers_details(modifier_ids_str):
+# Open orders are indexed on their own (idx_order_cart_open_status); a query only
+# uses that partial index if its WHERE clause repeats the index predicate
+OPEN_ORDERS = "oc.order_status < 13"
+
+# Get order lines with their modifiers in one query
+def get_order_lines(order_status, order_ids=None):
     """
-    Parse modifier IDs string and fetch their details
-    modifier_ids_str: "12,15,18" format
-    Returns: list of dicts with modifier info
+    Fetch every line of the orders in a status, with modifiers resolved.
+    Prices are the ones snapshotted when the order was placed.
+    order_ids: optionally restrict to these orders
+    Returns: list of dicts, one per order line, each with a 'modifiers' list
+    (orders without lines appear once with product_id None)
     """
-    if not modifier_ids_str:
-        return []
-    
+    params = [order_status]
+    order_filter = f"AND {OPEN_ORDERS}" if order_status < 13 else ""
+    if order_ids is not None:
+        order_ids = list(order_ids)
+        if not order_ids:
+            return []
+        order_filter += f" AND oc.order_id IN ({','.join('?' for _ in order_ids)})"
+        params.extend(order_ids)
+
     conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    modifier_ids = modifier_ids_str.split(',')
-    placeholders = ','.join(['?' for _ in modifier_ids])
-    
-    cursor.execute(f"""
-        SELECT 
-            modifier_id,
-            description,
-            price
-        FROM Modifier
-        WHERE modifier_id IN ({placeholders})
-        AND status = 1
-    """, modifier_ids)
-    
-    modifiers = cursor.fetchall()
-    conn.close()
-    
-    return [dict(mod) for mod in modifiers]
+    try:
+        rows = conn.execute(f"""
+            SELECT 
+                oc.order_id,
+                oc.subtotal,
+                oc.note,
+                oc.provided_name,
+                oc.created_at,
+                op.order_product_id,
+                op.product_id,
+                pi.description as product_description,
+                op.product_quantity,
+                op.unit_price as product_price,
+                op.modifier_total,
+                op.tax_rate as tax,
+                op.line_total,
+                opm.modifier_id,
+                COALESCE(opm.description, m.description) as modifier_description,
+                opm.price as modifier_price
+            FROM Order_Cart oc
+            LEFT JOIN Order_Product op ON oc.order_id = op.order_id
+            LEFT JOIN Product pi ON op.product_id = pi.product_id
+            LEFT JOIN Order_Product_Modifier opm ON op.order_product_id = opm.order_product_id
+            LEFT JOIN Modifier m ON opm.modifier_id = m.modifier_id
+            WHERE oc.order_status = ? {order_filter}
+            ORDER BY oc.order_id, pi.description, op.order_product_id, opm.modifier_id
+        """, params).fetchall()
+    finally:
+        conn.close()
+
+    lines = []
+    by_line = {}
+    for row in rows:
+        key = (row['order_id'], row['order_product_id'])
+        line = by_line.get(key)
+        if line is None:
+            line = {
+                'order_id': row['order_id'],
+                'subtotal': row['subtotal'],
+                'note': row['note'],
+                'provided_name': row['provided_name'],
+                'created_at': row['created_at'],
+                'order_product_id': row['order_product_id'],
+                'product_id': row['product_id'],
+                'product_description': row['product_description'],
+                'product_quantity': row['product_quantity'],
+                'product_price': row['product_price'],
+                'modifier_total': row['modifier_total'],
+                'tax': row['tax'],
+                'line_total': row['line_total'],
+                'modifiers': [],
+            }
+            by_line[key] = line
+            lines.append(line)
+        if row['modifier_id'] is not None:
+            line['modifiers'].append({
+                'modifier_id': row['modifier_id'],
+                'description': row['modifier_description'],
+                'price': row['modifier_price'] or 0,
+            })
+    return lines
+
+# Kitchen board: all tickets in a status with items and modifier names, one query
+def get_kitchen_board(order_status=11, order_ids=None):
+    """
+    Returns: list of order dicts (order_id, note, provided_name, order_status,
+    created_at, items), oldest first; orders without items are left out
+    """
+    orders = {}
+    for line in get_order_lines(order_status, order_ids):
+        if line['product_id'] is None:
+            continue
+        order = orders.get(line['order_id'])
+        if order is None:
+            order = orders[line['order_id']] = {
+                'order_id': line['order_id'],
+                'note': line['note'],
+                'provided_name': line['provided_name'],
+                'order_status': order_status,
+                'created_at': line['created_at'],
+                'items': [],
+            }
+        order['items'].append({
+            'order_id': line['order_id'],
+            'product_id': line['product_id'],
+            'modifiers': ','.join(str(mod['modifier_id']) for mod in line['modifiers']),
+            'modifier_names': ', '.join(mod['description'] for mod in line['modifiers'] if mod['description']) or None,
+            'product_name': line['product_description'],
+            'product_quantity': line['product_quantity'],
+        })
+    return sorted(orders.values(), key=lambda order: (order['created_at'] or '', order['order_id']))
+
+# Get order details with modifiers (orders waiting for checkout)
+def get_order_details():
+    return get_order_lines(10)
@@ -0,0 +1,145 @@
+import threading
+
+# Order lifecycle topics
+ORDER_CREATED = 'order_created'
+ORDER_UPDATED = 'order_updated'
+ORDER_REMOVED = 'order_removed'
+ORDER_PAID = 'order_paid'
+ORDER_CONFIRMED = 'order_confirmed'
+ORDER_DELIVERED = 'order_delivered'
+LIVE_CART_CHANGED = 'live_cart_changed'
+PRINT_JOB_UPDATED = 'print_job_updated'
+
+
+class EventBus:
+    """In-process publish/subscribe. Callbacks run on the publishing thread."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {}  # token -> (topics, callback)
+        self._next_token = 0
+
+    def subscribe(self, topics, callback):
+        with self._lock:
+            self._next_token += 1
+            self._subscribers[self._next_token] = (frozenset(topics), callback)
+            return self._next_token
+
+    def unsubscribe(self, token):
+        with self._lock:
+            self._subscribers.pop(token, None)
+
+    def publish(self, topic, **payload):
+        with self._lock:
+            targets = [(token, callback) for token, (topics, callback) in self._subscribers.items()
+                       if topic in topics]
+        for token, callback in targets:
+            try:
+                if callback(topic, payload) is False:
+                    # Subscriber is gone (e.g. browser tab closed)
+                    self.unsubscribe(token)
+            except Exception as e:
+                print(f"Error delivering {topic} event: {e}")
+
+
+bus = EventBus()
+
+# Events emitted inside a queued write are held until that write commits
+_pending = threading.local()
+
+def emit(topic, **payload):
+    """Publish now, or after commit when called from a write job."""
+    pending = getattr(_pending, 'events', None)
+    if pending is not None:
+        pending.append((topic, payload))
+    else:
+        bus.publish(topic, **payload)
+
+def begin_deferred():
+    _pending.events = []
+
+def end_deferred():
+    """Stop deferring; returns the events collected since begin_deferred()."""
+    events = getattr(_pending, 'events', None) or []
+    _pending.events = None
+    return events
+
+def publish_all(events):
+    for topic, payload in events:
+        bus.publish(topic, **payload)
+
+
+# ── Streamlit sessions ───────────────────────────────────────────────────────
+#
+# Waking another session uses Streamlit internals with no public API:
+# Runtime._session_mgr (find the session), AppSession._client_state (the page
+# and query string it last ran with) and AppSession._event_loop. Checked
+# against the streamlit version pinned in requirements.txt; re-check on upgrade.
+
+_session_subscriptions = {}  # session_id -> (page_script_hash, topics, match, token)
+_session_lock = threading.Lock()
+
+def _rerun_session(session_id, page_script_hash):
+    """
+    Ask Streamlit to rerun one browser session; False if it no longer exists or
+    has moved to another page (the subscription belongs to the page it left).
+    """
+    from streamlit.runtime import Runtime
+    if not Runtime.exists():
+        return False
+    session_info = Runtime.instance()._session_mgr.get_active_session_info(session_id)
+    if session_info is None:
+        return False
+    session = session_info.session
+    if session._client_state.page_script_hash != page_script_hash:
+        return False
+    # Rerun with the session's own client state, as Streamlit does on a file change;
+    # None would mean an empty one: the main script (Home) and no query params.
+    # AppSession isn't thread-safe, so hand the request to its event loop.
+    session._event_loop.call_soon_threadsafe(session.request_rerun, session._client_state)
+    return True
+
+def _drop_subscription(session_id, token):
+    """Forget the session's subscription if it is still token."""
+    with _session_lock:
+        current = _session_subscriptions.get(session_id)
+        if current is not None and current[3] == token:
+            del _session_subscriptions[session_id]
+
+def subscribe_rerun(topics, **match):
+    """
+    Rerun the current Streamlit session whenever one of the topics is published.
+    match: only wake for events whose payload has these values (events without
+    the field always wake), e.g. register_id='2' for a CFD bound to register 2.
+    Safe to call on every rerun. A session keeps one subscription, for the page
+    that made it: calling from another page or with other topics / match values
+    replaces it, and it is dropped once the session ends or leaves the page.
+    Returns False when not running inside a Streamlit session.
+    """
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+    ctx = get_script_run_ctx()
+    if ctx is None:
+        return False
+    session_id = ctx.session_id
+    page_script_hash = ctx.page_script_hash
+    topics = frozenset(topics)
+    match_items = frozenset(match.items())
+    with _session_lock:
+        current = _session_subscriptions.get(session_id)
+        if current is not None:
+            if current[:3] == (page_script_hash, topics, match_items):
+                return True
+            bus.unsubscribe(current[3])
+        token = None
+
+        def wake(topic, payload):
+            if any(payload.get(field, value) != value for field, value in match.items()):
+                return True
+            alive = _rerun_session(session_id, page_script_hash)
+            if not alive:
+                _drop_subscription(session_id, token)
+            return alive
+
+        token = bus.subscribe(topics, wake)
+        _session_subscriptions[session_id] = (page_script_hash, topics, match_items, token)
+    return True
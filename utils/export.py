@@ -0,0 +1,214 @@
+# Columnar export of order history and sales for offline analysis.
+#
+# Each dataset is written one UTC day at a time to a Hive-style partition,
+#   export/<dataset>/day=2026-10-17/part-0.parquet   (or .arrow, Arrow IPC)
+# streaming CHUNK_ROWS rows at a time from SQLite into the file, so memory
+# stays flat however long the range. Read it back with
+#   pyarrow.dataset.dataset('export/order_lines', format='parquet', partitioning='hive')
+#
+#   python -m utils.export --since 2026-01-01 [--until 2026-03-31] [--format arrow]
+#   python -m utils.export --incremental      # closed days after the last exported one
+import argparse
+import os
+from datetime import date, datetime, timedelta, timezone
+import pyarrow as pa
+import pyarrow.parquet as pq
+from utils.database import get_db_connection
+from utils.archive import history_tables
+
+EXPORT_DIR = 'export'
+CHUNK_ROWS = 50_000
+FORMATS = {'parquet': '.parquet', 'arrow': '.arrow'}
+
+# SQLite text timestamps ('2026-10-17 14:05:09', UTC) become Arrow timestamps
+TIMESTAMP = pa.timestamp('s')
+
+# name -> (query for one day's rows [start, end), Arrow schema). {Order_History}
+# is replaced with the history_tables() source, so archived months export too.
+DATASETS = {
+    'order_history': ('''
+        SELECT order_id, order_status, username, subtotal, total, timestamp
+        FROM {Order_History}
+        WHERE timestamp >= ? AND timestamp < ?
+        ORDER BY timestamp
+    ''', pa.schema([
+        ('order_id', pa.int64()), ('order_status', pa.int64()), ('username', pa.string()),
+        ('subtotal', pa.int64()), ('total', pa.int64()), ('timestamp', TIMESTAMP),
+    ])),
+    'order_event': ('''
+        SELECT order_id, from_status, to_status, timestamp
+        FROM Order_Event
+        WHERE timestamp >= ? AND timestamp < ?
+        ORDER BY timestamp
+    ''', pa.schema([
+        ('order_id', pa.int64()), ('from_status', pa.int64()), ('to_status', pa.int64()),
+        ('timestamp', TIMESTAMP),
+    ])),
+    # Paid order lines with the prices they were sold at, by the day they were paid
+    'order_lines': ('''
+        SELECT l.order_product_id, l.order_id, l.product_id, p.description AS product,
+               p.category_id, l.workcenter_id, op.product_quantity AS quantity, op.unit_price,
+               op.modifier_total, op.tax_rate, op.line_total,
+               l.created_at, l.paid_at, l.ready_at, l.delivered_at
+        FROM Order_Lifecycle l
+        JOIN Order_Product op ON op.order_product_id = l.order_product_id
+        LEFT JOIN Product p ON p.product_id = l.product_id
+        WHERE l.paid_at >= ? AND l.paid_at < ?
+        ORDER BY l.paid_at
+    ''', pa.schema([
+        ('order_product_id', pa.int64()), ('order_id', pa.int64()), ('product_id', pa.int64()),
+        ('product', pa.string()), ('category_id', pa.int64()), ('workcenter_id', pa.int64()),
+        ('quantity', pa.int64()), ('unit_price', pa.int64()), ('modifier_total', pa.int64()),
+        ('tax_rate', pa.float64()), ('line_total', pa.int64()),
+        ('created_at', TIMESTAMP), ('paid_at', TIMESTAMP), ('ready_at', TIMESTAMP),
+        ('delivered_at', TIMESTAMP),
+    ])),
+    # Both grains: the day row ('2026-10-17') and its hours ('2026-10-17 14:00:00')
+    'sales_rollup': ('''
+        SELECT grain, period, product_id, category_id, username, service_area_id,
+               quantity, subtotal, tax, order_count
+        FROM Sales_Rollup
+        WHERE period >= ? AND period < ?
+    ''', pa.schema([
+        ('grain', pa.string()), ('period', pa.string()), ('product_id', pa.int64()),
+        ('category_id', pa.int64()), ('username', pa.string()), ('service_area_id', pa.int64()),
+        ('quantity', pa.int64()), ('subtotal', pa.int64()), ('tax', pa.float64()),
+        ('order_count', pa.int64()),
+    ])),
+    'sales_rollup_order': ('''
+        SELECT grain, period, username, service_area_id, order_count, revenue
+        FROM Sales_Rollup_Order
+        WHERE period >= ? AND period < ?
+    ''', pa.schema([
+        ('grain', pa.string()), ('period', pa.string()), ('username', pa.string()),
+        ('service_area_id', pa.int64()), ('order_count', pa.int64()), ('revenue', pa.int64()),
+    ])),
+}
+
+def partition_dir(out_dir, dataset, day):
+    return os.path.join(out_dir, dataset, f"day={day.isoformat()}")
+
+def exported_days(out_dir, dataset):
+    """Days that already have a partition for dataset."""
+    root = os.path.join(out_dir, dataset)
+    if not os.path.isdir(root):
+        return set()
+    return {date.fromisoformat(name[4:]) for name in os.listdir(root) if name.startswith('day=')}
+
+def _batch(rows, schema):
+    columns = list(zip(*rows))
+    arrays = []
+    for field, values in zip(schema, columns):
+        if field.type == TIMESTAMP:
+            arrays.append(pa.array(values, pa.string()).cast(TIMESTAMP))
+        else:
+            arrays.append(pa.array(values, field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+def _open_writer(path, schema, fmt):
+    """(write_batch, close) for a new file."""
+    if fmt == 'parquet':
+        writer = pq.ParquetWriter(path, schema)
+        return writer.write_batch, writer.close
+    sink = pa.OSFile(path, 'wb')
+    writer = pa.ipc.new_file(sink, schema)
+    def close():
+        writer.close()
+        sink.close()
+    return writer.write_batch, close
+
+def export_day(conn, dataset, day, out_dir=EXPORT_DIR, fmt='parquet'):
+    """Write one day of a dataset; returns the rows written (no partition when 0).
+
+    The file is written under a temporary name and renamed when complete, so
+    an interrupted run never leaves a partition that looks exported.
+    """
+    query, schema = DATASETS[dataset]
+    bounds = (day.isoformat(), (day + timedelta(days=1)).isoformat())
+    directory = partition_dir(out_dir, dataset, day)
+    path = os.path.join(directory, f"part-0{FORMATS[fmt]}")
+    with history_tables(conn, day, day) as tables:
+        cursor = conn.execute(query.format(**tables), bounds)
+        rows = cursor.fetchmany(CHUNK_ROWS)
+        if not rows:
+            return 0
+        os.makedirs(directory, exist_ok=True)
+        for name in os.listdir(directory):
+            os.remove(os.path.join(directory, name))  # re-export replaces the day
+        written = 0
+        write_batch, close = _open_writer(path + '.tmp', schema, fmt)
+        try:
+            while rows:
+                write_batch(_batch(rows, schema))
+                written += len(rows)
+                rows = cursor.fetchmany(CHUNK_ROWS)
+        finally:
+            close()
+            cursor.close()
+    os.replace(path + '.tmp', path)
+    return written
+
+def first_day(conn):
+    """Earliest day with order history, archived months included; None if there is none."""
+    candidates = []
+    month = conn.execute("SELECT MIN(month) FROM Archive_Month").fetchone()[0]
+    if month:
+        candidates.append(date.fromisoformat(f"{month}-01"))
+    timestamp = conn.execute("SELECT MIN(timestamp) FROM Order_History").fetchone()[0]
+    if timestamp:
+        candidates.append(date.fromisoformat(timestamp[:10]))
+    return min(candidates) if candidates else None
+
+def export(since=None, until=None, out_dir=EXPORT_DIR, fmt='parquet', datasets=None, incremental=False):
+    """
+    Export each day from since to until (inclusive) for the datasets (default all).
+    incremental: start after the last day a dataset has and stop before today
+    (UTC), so each run adds only the days closed since the previous one.
+    since defaults to the first day of history.
+    Returns: {dataset: {day: rows}} for the partitions written
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format {fmt!r}")
+    datasets = datasets or list(DATASETS)
+    today = datetime.now(timezone.utc).date()
+    written = {}
+    conn = get_db_connection()
+    try:
+        since = since or first_day(conn)
+        if since is None:
+            return written
+        until = until or today
+        if incremental:
+            until = min(until, today - timedelta(days=1))
+        for dataset in datasets:
+            written[dataset] = {}
+            day = since
+            done = exported_days(out_dir, dataset) if incremental else None
+            if done:
+                day = max(day, max(done) + timedelta(days=1))
+            while day <= until:
+                rows = export_day(conn, dataset, day, out_dir, fmt)
+                if rows:
+                    written[dataset][day] = rows
+                day += timedelta(days=1)
+    finally:
+        conn.close()
+    return written
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export order history and sales to Parquet / Arrow files by day")
+    parser.add_argument('--since', type=date.fromisoformat, help="first day (YYYY-MM-DD); default: start of history")
+    parser.add_argument('--until', type=date.fromisoformat, help="last day (YYYY-MM-DD); default: today")
+    parser.add_argument('--format', choices=list(FORMATS), default='parquet')
+    parser.add_argument('--out', default=EXPORT_DIR)
+    parser.add_argument('--dataset', action='append', choices=list(DATASETS),
+                        help="export only this dataset (repeatable)")
+    parser.add_argument('--incremental', action='store_true', help="only closed days after the last exported one")
+    args = parser.parse_args()
+
+    result = export(args.since, args.until, args.out, args.format, args.dataset, args.incremental)
+    for dataset, days in result.items():
+        print(f"{dataset}: {len(days)} days, {sum(days.values())} rows")
+    if not any(result.values()):
+        print("Nothing to export")
@@ -0,0 +1,90 @@
+# Stand-in for a raw port-9100 printer, for trying the print spooler without hardware.
+#
+#   python -m utils.fake_printer --port 9100 [--delay 2] [--drop-every 3]
+#
+# Point the spooler at it with utils.printing.configure_spooler({'receipt': ('127.0.0.1', 9100)}).
+import argparse
+import socket
+import threading
+import time
+
+CUT = b"\x1dV\x00"  # ESC/POS full cut, sent after every receipt
+
+
+class FakePrinter:
+    """TCP server that records what it is sent, one entry per cut receipt.
+
+    delay: seconds to stall before reading each chunk (a slow printer)
+    drop_every: hang up after every Nth receipt (a printer that drops idle connections)
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, delay=0.0, drop_every=0):
+        self.delay = delay
+        self.drop_every = drop_every
+        self.receipts = []
+        self.connections = 0
+        self._buffer = b''
+        self._lock = threading.Lock()
+        self._server = socket.create_server((host, port))
+        self.address = self._server.getsockname()[:2]
+        self._running = False
+
+    def start(self):
+        self._running = True
+        threading.Thread(target=self._accept, name="fake-printer", daemon=True).start()
+        return self
+
+    def stop(self):
+        self._running = False
+        self._server.close()
+
+    def _accept(self):
+        while self._running:
+            try:
+                conn, _ = self._server.accept()
+            except OSError:
+                return
+            with self._lock:
+                self.connections += 1
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _serve(self, conn):
+        with conn:
+            while self._running:
+                if self.delay:
+                    time.sleep(self.delay)
+                try:
+                    chunk = conn.recv(65536)
+                except OSError:
+                    return
+                if not chunk:
+                    return
+                with self._lock:
+                    self._buffer += chunk
+                    while CUT in self._buffer:
+                        receipt, self._buffer = self._buffer.split(CUT, 1)
+                        self.receipts.append(receipt)
+                        if self.drop_every and len(self.receipts) % self.drop_every == 0:
+                            return
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake raw TCP printer")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=9100)
+    parser.add_argument('--delay', type=float, default=0.0)
+    parser.add_argument('--drop-every', type=int, default=0)
+    args = parser.parse_args()
+
+    printer = FakePrinter(args.host, args.port, args.delay, args.drop_every).start()
+    print(f"Fake printer listening on {printer.address[0]}:{printer.address[1]}")
+    seen = 0
+    try:
+        while True:
+            time.sleep(0.2)
+            for receipt in printer.receipts[seen:]:
+                print(receipt.decode('utf-8', errors='replace'))
+                print("---- cut ----")
+            seen = len(printer.receipts)
+    except KeyboardInterrupt:
+        printer.stop()
@@ -0,0 +1,60 @@
+# Order lifecycle facts (Order_Lifecycle, see utils/schema.py migration 17).
+#
+# One row per paid order line with the station that makes it and the UTC time
+# the order was created, paid, confirmed by the kitchen and delivered. Triggers
+# on Order_Event fill it in as orders move (utils.order_state); the Speed of
+# Service page reads it without joining history. Rebuild after restoring a
+# backup or changing routes:
+#
+#   python -m utils.lifecycle
+import argparse
+from utils.database import get_write_connection
+
+# When each order reached 11 / 12 / 13. Moves before migration 16 are only in
+# Order_History; later ones only in Order_Event.
+_ORDER_TIMES = '''
+    SELECT order_id,
+           MIN(CASE WHEN status = 11 THEN timestamp END) AS paid_at,
+           MIN(CASE WHEN status = 12 THEN timestamp END) AS ready_at,
+           MIN(CASE WHEN status = 13 THEN timestamp END) AS delivered_at
+    FROM (SELECT order_id, order_status AS status, timestamp FROM Order_History
+          WHERE order_status IN (11, 12, 13)
+          UNION ALL
+          SELECT order_id, to_status, timestamp FROM Order_Event)
+    GROUP BY order_id
+'''
+
+def rebuild_order_lifecycle(conn):
+    """Recompute Order_Lifecycle for the orders paid in the hot history; returns the number of lines.
+
+    Only those orders' facts are replaced. Orders whose payment is in archive
+    databases (utils.archive), or no longer in history at all, keep the facts
+    recorded when they moved. Lines are routed with today's Workcenter_Route.
+    """
+    conn.execute(f'''
+        DELETE FROM Order_Lifecycle
+        WHERE order_id IN (SELECT order_id FROM ({_ORDER_TIMES}) WHERE paid_at IS NOT NULL)
+    ''')
+    return conn.execute(f'''
+        INSERT INTO Order_Lifecycle (order_product_id, order_id, product_id, workcenter_id, quantity,
+                                     created_at, paid_at, ready_at, delivered_at)
+        SELECT op.order_product_id, op.order_id, op.product_id,
+               COALESCE(rp.workcenter_id, rc.workcenter_id, (SELECT MIN(workcenter_id) FROM Workcenter)),
+               op.product_quantity, datetime(oc.created_at, 'utc'),
+               t.paid_at, t.ready_at, t.delivered_at
+        FROM ({_ORDER_TIMES}) t
+        JOIN Order_Cart oc ON oc.order_id = t.order_id
+        JOIN Order_Product op ON op.order_id = t.order_id
+        LEFT JOIN Product p ON p.product_id = op.product_id
+        LEFT JOIN Workcenter_Route rp ON rp.product_id = op.product_id
+        LEFT JOIN Workcenter_Route rc ON rc.category_id = p.category_id
+        WHERE t.paid_at IS NOT NULL AND op.product_id IS NOT NULL
+    ''').rowcount
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild Order_Lifecycle for the orders in the hot order history")
+    parser.parse_args()
+    with get_write_connection() as conn:
+        lines = rebuild_order_lifecycle(conn)
+    print(f"Order lifecycle rebuilt ({lines} lines)")
@@ -0,0 +1,90 @@
+# Order status transitions.
+#
+#   10 UNPAID ──settle──▶ 11 PAID ──kitchen──▶ 12 READY ──runner──▶ 13 DELIVERED
+#
+# advance() is the only code that moves an order along. It takes the writer
+# connection first (queue it with utils.writer.run_write), moves a batch of
+# orders with one UPDATE per allowed previous status, and records each move
+# in Order_Event as (order_id, from_status, to_status, timestamp). Order_History
+# only gets a full copy of the order when it is paid or its amounts/owner change
+# (trigger log_order_update, utils/schema.py migration 16).
+#
+# A kitchen with several stations confirms an order one station at a time with
+# confirm_station(); the last station to confirm moves it to READY.
+from utils.events import emit, ORDER_PAID, ORDER_CONFIRMED, ORDER_DELIVERED
+
+UNPAID, PAID, READY, DELIVERED = 10, 11, 12, 13
+
+STATUS_NAMES = {
+    UNPAID: 'created',
+    PAID: 'paid',
+    READY: 'confirmed by kitchen',
+    DELIVERED: 'delivered',
+}
+
+# to_status -> statuses an order may be moved from
+TRANSITIONS = {
+    PAID: (UNPAID,),
+    READY: (PAID,),
+    DELIVERED: (READY,),
+}
+
+STATUS_EVENTS = {PAID: ORDER_PAID, READY: ORDER_CONFIRMED, DELIVERED: ORDER_DELIVERED}
+
+def _in_list(values):
+    return ','.join('?' for _ in values)
+
+def advance(conn, order_ids, to_status, totals=None):
+    """Move orders to to_status; returns the ids actually moved.
+
+    Orders not in a status that may move to to_status (already there, deleted,
+    a second tap on the same button) are left alone. totals ({order_id: cents})
+    stores each order's own total with the move when given (settling).
+    Raises ValueError for an unknown target status.
+    """
+    if to_status not in TRANSITIONS:
+        raise ValueError(f"No transition to order status {to_status}")
+    order_ids = list(order_ids)
+    if not order_ids:
+        return []
+
+    assignments = "order_status = ?"
+    values = [to_status]
+    if totals is not None:
+        assignments += f", total = CASE order_id {' '.join('WHEN ? THEN ?' for _ in order_ids)} ELSE total END"
+        values.extend(value for order_id in order_ids for value in (order_id, totals[order_id]))
+    moved = []
+    events = []
+    for from_status in TRANSITIONS[to_status]:
+        ids = [row[0] for row in conn.execute(f"""
+            UPDATE Order_Cart
+            SET {assignments}
+            WHERE order_id IN ({_in_list(order_ids)}) AND order_status = ?
+            RETURNING order_id
+        """, [*values, *order_ids, from_status])]
+        moved.extend(ids)
+        events.extend((order_id, from_status, to_status) for order_id in ids)
+    if events:
+        conn.executemany(
+            "INSERT INTO Order_Event (order_id, from_status, to_status) VALUES (?, ?, ?)", events
+        )
+        emit(STATUS_EVENTS[to_status], order_ids=moved)
+    return moved
+
+def confirm_station(conn, order_id, workcenter_id, workcenter_ids):
+    """Record that one station has made its part of an order; returns the ids moved to READY.
+
+    workcenter_ids: every station the order's items are routed to
+    (utils.routing.split_order). The order moves to READY once all of them
+    have confirmed; until then it stays on the other stations' boards.
+    """
+    conn.execute(
+        "INSERT OR IGNORE INTO Order_Station_Ready (order_id, workcenter_id) VALUES (?, ?)",
+        (order_id, workcenter_id)
+    )
+    confirmed = {row[0] for row in conn.execute(
+        "SELECT workcenter_id FROM Order_Station_Ready WHERE order_id = ?", (order_id,)
+    )}
+    if set(workcenter_ids) - confirmed:
+        return []
+    return advance(conn, [order_id], READY)
@@ -0,0 +1,133 @@
+# Order mutations. Each takes the writer connection as its first argument so it
+# can be queued with utils.writer.run_write / submit_write.
+from utils.events import emit, ORDER_CREATED, ORDER_UPDATED, ORDER_REMOVED, LIVE_CART_CHANGED
+from utils.order_state import advance, PAID
+from utils.pricing import DEFAULT_TAX_RATE, line_total
+
+def _in_list(values):
+    return ','.join('?' for _ in values)
+
+def insert_order(conn, username, provided_name, note, items, idempotency_key=None):
+    """Insert an order header and its lines; returns the new order_id.
+
+    items: cart lines with product_id, quantity and modifiers (dicts with modifier_id, description)
+    Prices and tax rates are read from Product / Modifier now and stored on the
+    lines, so later price changes don't alter what this order costs.
+    idempotency_key: sent again with a retried "Place Order" (double tap, timed-out
+    write); the order already stored under it is returned instead of a duplicate.
+    """
+    if idempotency_key is not None:
+        row = conn.execute(
+            "SELECT order_id FROM Order_Cart WHERE idempotency_key = ?", (idempotency_key,)
+        ).fetchone()
+        if row is not None:
+            return row[0]
+
+    product_ids = {item['product_id'] for item in items}
+    modifier_ids = {mod['modifier_id'] for item in items for mod in (item['modifiers'] or [])}
+    products = {
+        row[0]: (row[1], row[2])
+        for row in conn.execute(
+            f"SELECT product_id, price, tax FROM Product WHERE product_id IN ({_in_list(product_ids)})",
+            list(product_ids)
+        )
+    }
+    modifier_prices = dict(conn.execute(
+        f"SELECT modifier_id, price FROM Modifier WHERE modifier_id IN ({_in_list(modifier_ids)})",
+        list(modifier_ids)
+    )) if modifier_ids else {}
+
+    order_id = conn.execute('''
+        INSERT INTO Order_Cart (service_area_id, order_status, username, provided_name, note, idempotency_key)
+        VALUES (0, 10, ?, ?, ?, ?)
+    ''', (username, provided_name, note, idempotency_key)).lastrowid
+
+    lines = []
+    line_modifiers = []
+    for item in items:
+        unit_price, tax_rate = products.get(item['product_id'], (0, None))
+        modifiers = [(mod['modifier_id'], mod.get('description'), modifier_prices.get(mod['modifier_id']) or 0)
+                     for mod in (item['modifiers'] or [])]
+        modifier_total = sum(price for _, _, price in modifiers)
+        lines.append((order_id, item['product_id'], item['quantity'],
+                      unit_price or 0, modifier_total,
+                      DEFAULT_TAX_RATE if tax_rate is None else tax_rate,
+                      line_total(unit_price, modifier_total, item['quantity'])))
+        line_modifiers.append(modifiers)
+    conn.executemany('''
+        INSERT INTO Order_Product (order_id, product_id, product_quantity,
+                                   unit_price, modifier_total, tax_rate, line_total)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    ''', lines)
+
+    if any(line_modifiers):
+        # order_product_id is AUTOINCREMENT, so the new ids follow the order the lines were inserted in
+        line_ids = [row[0] for row in conn.execute(
+            "SELECT order_product_id FROM Order_Product WHERE order_id = ? ORDER BY order_product_id", (order_id,)
+        )]
+        conn.executemany('''
+            INSERT INTO Order_Product_Modifier (order_product_id, modifier_id, description, price)
+            VALUES (?, ?, ?, ?)
+        ''', [(order_product_id, *mod)
+              for order_product_id, modifiers in zip(line_ids, line_modifiers)
+              for mod in modifiers])
+    emit(ORDER_CREATED, order_id=order_id)
+    return order_id
+
+def set_line_price(conn, order_product_id, unit_price):
+    """Price an open-priced line (the 'dummy' product) at checkout."""
+    row = conn.execute("""
+        UPDATE Order_Product
+        SET unit_price = ?, line_total = (? + COALESCE(modifier_total, 0)) * product_quantity
+        WHERE order_product_id = ?
+        RETURNING order_id
+    """, (unit_price, unit_price, order_product_id)).fetchone()
+    if row is not None:
+        emit(ORDER_UPDATED, order_id=row[0])
+
+def delete_order(conn, order_id):
+    """Remove an unpaid order from checkout."""
+    conn.execute("""
+        DELETE FROM Order_Cart 
+        WHERE order_id = ?
+    """, (order_id,))
+    emit(ORDER_REMOVED, order_id=order_id)
+
+def settle_orders(conn, totals):
+    """Mark orders waiting at checkout as paid (status 11), each with its own total.
+
+    totals: {order_id: total in cents}, e.g. from utils.pricing.price_orders.
+    Returns the ids actually settled; orders already paid (a repeated tap on
+    Settle) are left alone.
+    """
+    return advance(conn, list(totals), PAID, totals=totals)
+
+def apply_live_cart_changes(conn, register_id, upserts, deletes):
+    """
+    Bring one register's Live_Cart rows up to date.
+    upserts: {line_key: (product_name, modifiers_text, quantity, unit_price, total_price)}
+    deletes: line_keys no longer in the cart
+    """
+    if deletes:
+        conn.executemany(
+            "DELETE FROM Live_Cart WHERE session_id = ? AND line_key = ?",
+            [(register_id, line_key) for line_key in deletes]
+        )
+    if upserts:
+        conn.executemany('''
+            INSERT INTO Live_Cart (session_id, line_key, product_name, modifiers_text, quantity, unit_price, total_price)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (session_id, line_key) DO UPDATE SET
+                product_name = excluded.product_name,
+                modifiers_text = excluded.modifiers_text,
+                quantity = excluded.quantity,
+                unit_price = excluded.unit_price,
+                total_price = excluded.total_price,
+                last_updated = datetime('now', 'localtime')
+        ''', [(register_id, line_key, *row) for line_key, row in upserts.items()])
+    emit(LIVE_CART_CHANGED, register_id=register_id)
+
+def clear_live_cart(conn, register_id):
+    """Empty one register's customer-facing display cart."""
+    conn.execute("DELETE FROM Live_Cart WHERE session_id = ?", (register_id,))
+    emit(LIVE_CART_CHANGED, register_id=register_id)
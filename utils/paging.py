@@ -0,0 +1,63 @@
+# Keyset paging for the report pages.
+#
+# A page is fetched with "rows after the last key of the previous page,
+# LIMIT n" instead of loading the whole date range and slicing it, so the
+# cost of a page doesn't grow with how far back the range goes. The keys of
+# the pages already passed are kept in session state to step back.
+#
+#   after = page_cursor('history', (start_date, end_date, per_page), first=FIRST_KEY)
+#   df = fetch(after, per_page)  # ... WHERE (sort key) < (?, ?) ORDER BY sort key DESC LIMIT ?
+#   page_controls('history', last_key(df, KEY_COLUMNS), per_page, total_rows)
+#
+# When the rows come from several tables (hot and archived history, events),
+# seek_union() merges per-table pages rather than seeking in a UNION ALL, which
+# SQLite would build in full before filtering it.
+import streamlit as st
+
+def _state(name):
+    return st.session_state.setdefault(f"{name}_pager", {'scope': None, 'cursors': []})
+
+def page_cursor(name, scope, first=None):
+    """Key to fetch the current page after; first on page 1.
+
+    scope: the query's inputs (date range, page size); when it changes the
+    pager goes back to page 1.
+    """
+    state = _state(name)
+    if state['scope'] != scope:
+        state['scope'] = scope
+        state['cursors'] = []
+    return state['cursors'][-1] if state['cursors'] else first
+
+def seek_union(branches, key):
+    """SQL for one page of keys, newest first, over several sources.
+
+    branches: SELECTs of the key columns, each with its own seek past the
+    cursor, ORDER BY key DESC and LIMIT :limit, so each reads at most a page
+    from its index. Their UNION is cut to the first :limit keys.
+    """
+    columns = ', '.join(key)
+    order = ', '.join(f"{column} DESC" for column in key)
+    arms = " UNION ".join(f"SELECT * FROM ({branch})" for branch in branches)
+    return f"SELECT {columns} FROM ({arms}) ORDER BY {order} LIMIT :limit"
+
+def last_key(df, columns):
+    """Sort key of a page's last row, as plain Python values (numpy ints don't bind in sqlite3)."""
+    return tuple(value.item() if hasattr(value, 'item') else value for value in df.iloc[-1][columns])
+
+def page_controls(name, last_key, per_page, total_rows):
+    """Previous / Next buttons and the page position; Next pages on from last_key."""
+    state = _state(name)
+    page = len(state['cursors']) + 1
+    pages = max(1, (total_rows - 1) // per_page + 1)
+    col1, col2, col3 = st.columns([1, 3, 1])
+    with col1:
+        if st.button("◀ Previous", key=f"{name}_previous", disabled=page == 1, width='stretch'):
+            state['cursors'].pop()
+            st.rerun()
+    with col2:
+        st.caption(f"Page {page} of {pages} · {total_rows} records")
+    with col3:
+        if st.button("Next ▶", key=f"{name}_next", disabled=page >= pages or last_key is None, width='stretch'):
+            state['cursors'].append(last_key)
+            st.rerun()
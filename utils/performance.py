@@ -1,26 +1,242 @@
-import sqlite3, time
+# Load test: simulated registers, kitchen screens and customer displays hitting
+# the real data-access functions at the same time, against a throwaway copy of
+# pos.database.
+#
+#   python -m utils.performance --registers 4 --kitchens 2 --cfds 1 --duration 30
+#
+# Prints throughput and p50 / p95 / p99 latency per operation, plus writer and
+# pool counters. --json FILE also writes the numbers for comparing runs.
+import argparse
+import json
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from utils.database import DB_PATH, configure_pool, get_db_connection, get_feed_versions, \
+    get_kitchen_board, get_order_details, get_pool_metrics, date_bounds
+from utils.archive import history_tables
+from utils.catalog import get_catalog
+from utils.orders import insert_order, settle_orders, apply_live_cart_changes, clear_live_cart
+from utils.order_state import advance, READY, DELIVERED
+from utils.writer import run_write, get_write_queue
 
-conn = sqlite3.connect("pos.database")
-conn.execute('PRAGMA journal_mode=WAL;')  # Enable WAL mode
-cur = conn.cursor()
 
-start = time.time()
+class Recorder:
+    """Per-operation latency samples (ms) and error counts, shared by all actors."""
 
-# Insert records
-cur.execute("BEGIN")
-for i in range(1000):
-    cur.execute("""
-        INSERT INTO Order_Cart (order_status, service_area_id, customer_id, subtotal, total, provided_name)
-        VALUES (?, ?, ?, ?, ?, ?)""",
-        (0, (i % 8) + 1, None, 1000 + i * 10, 1100 + i * 10, f'Test order #{i+1}')
-    )
-    conn.commit()
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = {}
+        self.errors = {}
 
-# Update records
-    cur.execute("UPDATE Order_Cart SET order_status = 11 WHERE order_status = 10")
-    conn.commit()
-    cur.execute("select * from order_history order by timestamp;")
+    def time(self, op, fn, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        except Exception:
+            with self._lock:
+                self.errors[op] = self.errors.get(op, 0) + 1
+            return None
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000
+            with self._lock:
+                self.samples.setdefault(op, []).append(elapsed)
 
-end = time.time()
-print(f"Total time: {end - start:.4f} seconds")
+    def summary(self, duration):
+        rows = {}
+        for op, samples in sorted(self.samples.items()):
+            ordered = sorted(samples)
+            rows[op] = {
+                'count': len(ordered),
+                'errors': self.errors.get(op, 0),
+                'per_sec': len(ordered) / duration,
+                'p50': percentile(ordered, 50),
+                'p95': percentile(ordered, 95),
+                'p99': percentile(ordered, 99),
+                'max': ordered[-1],
+            }
+        return rows
 
+def percentile(ordered, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not ordered:
+        return 0.0
+    rank = max(1, -(-len(ordered) * pct // 100))
+    return ordered[int(rank) - 1]
+
+
+# ── Simulated clients ─────────────────────────────────────────────────────────
+
+def random_cart(catalog, rng):
+    """1-5 lines, mostly single quantities, about a third with modifiers."""
+    products = [product for category_id, _ in catalog.categories for product in catalog.products(category_id)]
+    cart = []
+    for _ in range(rng.choice([1, 1, 2, 2, 2, 3, 3, 4, 5])):
+        product_id, description, price = rng.choice(products)
+        modifiers = []
+        if rng.random() < 0.35:
+            for group in catalog.modifier_groups(product_id).values():
+                modifier = rng.choice(group['modifiers'])
+                modifiers.append({'modifier_id': modifier['modifier_id'], 'description': modifier['description'],
+                                  'price': modifier['price']})
+        cart.append({'product_id': product_id, 'name': description, 'quantity': rng.choice([1, 1, 1, 2, 3]),
+                     'price': price + sum(mod['price'] for mod in modifiers), 'modifiers': modifiers})
+    return cart
+
+def register(rec, stop, register_id, think, rng):
+    """Ring up a cart line by line (mirrored to the CFD), place the order, settle it."""
+    while not stop.is_set():
+        cart = random_cart(rec.time('menu', get_catalog), rng)
+        for i, item in enumerate(cart):
+            line_key = f"{item['product_id']}|{i}"
+            row = (item['name'], '', item['quantity'], item['price'], item['price'] * item['quantity'])
+            rec.time('live_cart_sync', run_write, apply_live_cart_changes, register_id, {line_key: row}, [])
+            time.sleep(think)
+        order_id = rec.time('create_order', run_write, insert_order, f"bench{register_id}", 'bench', '', cart)
+        rec.time('checkout_load', get_order_details)
+        if order_id is not None:
+            total = sum(item['price'] * item['quantity'] for item in cart)
+            rec.time('settle', run_write, settle_orders, {order_id: total})
+        rec.time('live_cart_clear', run_write, clear_live_cart, register_id)
+        time.sleep(think)
+
+def kitchen(rec, stop, refresh):
+    """KDS / COD screen: check the change feed each tick; reload and bump the oldest ticket on change."""
+    seen = None
+    while not stop.is_set():
+        versions = rec.time('feed_check', get_feed_versions, ['orders'])
+        if versions != seen:
+            seen = versions
+            board = rec.time('kds_refresh', get_kitchen_board, 11) or []
+            if board:
+                rec.time('kds_confirm', run_write, advance, [board[0]['order_id']], READY)
+            confirmed = rec.time('cod_refresh', get_kitchen_board, 12) or []
+            if confirmed:
+                rec.time('deliver', run_write, advance, [confirmed[0]['order_id']], DELIVERED)
+        time.sleep(refresh)
+
+def cfd(rec, stop, register_id, refresh):
+    def read_live_cart():
+        with get_db_connection() as conn:
+            return conn.execute(
+                "SELECT product_name, modifiers_text, quantity, unit_price, total_price "
+                "FROM Live_Cart WHERE session_id = ? ORDER BY rowid", (register_id,)
+            ).fetchall()
+    seen = None
+    while not stop.is_set():
+        versions = rec.time('feed_check', get_feed_versions, ['live_cart', 'orders'])
+        if versions != seen:
+            seen = versions
+            rec.time('cfd_refresh', read_live_cart)
+        time.sleep(refresh)
+
+def reports(rec, stop, interval):
+    """Manager flipping between the 30-day sales and order history reports."""
+    def sales_report(start, end):
+        with get_db_connection() as conn:
+            return conn.execute('''
+                SELECT product_id, SUM(quantity), SUM(subtotal), SUM(tax), SUM(order_count)
+                FROM Sales_Rollup WHERE grain = 'day' AND period >= ? AND period < ?
+                GROUP BY product_id
+            ''', date_bounds(start, end)).fetchall()
+    def history_report(start, end):
+        with get_db_connection() as conn:
+            with history_tables(conn, start, end) as tables:
+                return conn.execute(f'''
+                    SELECT oh.order_id, oh.order_status, oh.timestamp, op.product_id, op.line_total
+                    FROM (SELECT order_id, order_status, timestamp FROM {tables['Order_History']}
+                          UNION ALL
+                          SELECT order_id, to_status, timestamp FROM Order_Event WHERE to_status IN (12, 13)) oh
+                    LEFT JOIN Order_Product op ON oh.order_id = op.order_id
+                    WHERE oh.timestamp >= ? AND oh.timestamp < ?
+                    ORDER BY oh.timestamp DESC
+                ''', date_bounds(start, end)).fetchall()
+    while not stop.is_set():
+        end = date.today()
+        rec.time('report_sales', sales_report, end - timedelta(days=30), end)
+        rec.time('report_history', history_report, end - timedelta(days=7), end)
+        time.sleep(interval)
+
+
+# ── Runner ────────────────────────────────────────────────────────────────────
+
+def run(registers=4, kitchens=2, cfds=1, report_clients=1, duration=30.0, think=0.05,
+        refresh=0.5, report_interval=5.0, seed=1, db_path=DB_PATH):
+    workdir = tempfile.mkdtemp()
+    path = os.path.join(workdir, 'bench.database')
+    shutil.copy(db_path, path)
+    configure_pool(path)
+    rec = Recorder()
+    stop = threading.Event()
+    actors = []
+    for i in range(registers):
+        actors.append(threading.Thread(target=register, args=(rec, stop, str(i + 1), think, random.Random(seed + i))))
+    for _ in range(kitchens):
+        actors.append(threading.Thread(target=kitchen, args=(rec, stop, refresh)))
+    for i in range(cfds):
+        actors.append(threading.Thread(target=cfd, args=(rec, stop, str(i % max(registers, 1) + 1), refresh)))
+    for _ in range(report_clients):
+        actors.append(threading.Thread(target=reports, args=(rec, stop, report_interval)))
+
+    started = time.perf_counter()
+    for actor in actors:
+        actor.daemon = True
+        actor.start()
+    try:
+        time.sleep(duration)
+    finally:
+        stop.set()
+        for actor in actors:
+            actor.join(timeout=10)
+    elapsed = time.perf_counter() - started
+
+    result = {
+        'config': {'registers': registers, 'kitchens': kitchens, 'cfds': cfds, 'reports': report_clients,
+                   'duration': round(elapsed, 2), 'think': think, 'refresh': refresh},
+        'operations': rec.summary(elapsed),
+        'writer': get_write_queue().metrics(),
+        'pool': get_pool_metrics(),
+    }
+    configure_pool(DB_PATH)
+    shutil.rmtree(workdir, ignore_errors=True)
+    return result
+
+def print_report(result):
+    config = result['config']
+    print(f"{config['registers']} registers, {config['kitchens']} kitchen screens, {config['cfds']} CFDs, "
+          f"{config['reports']} report clients for {config['duration']} s\n")
+    print(f"{'operation':<16}{'count':>8}{'err':>6}{'ops/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}")
+    for op, row in result['operations'].items():
+        print(f"{op:<16}{row['count']:>8}{row['errors']:>6}{row['per_sec']:>9.1f}"
+              f"{row['p50']:>9.2f}{row['p95']:>9.2f}{row['p99']:>9.2f}{row['max']:>9.2f}")
+    writer = result['writer']
+    print(f"\nwriter: {writer['jobs']} jobs in {writer['batches']} commits "
+          f"(avg batch {writer['avg_batch']:.1f}, largest {writer['largest_batch']}), {writer['failed_jobs']} failed")
+    pool = result['pool']
+    print("pool: " + ", ".join(f"{key} {value:.1f}" if isinstance(value, float) else f"{key} {value}"
+                               for key, value in pool.items()))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent POS load test against a copy of the database")
+    parser.add_argument('--registers', type=int, default=4)
+    parser.add_argument('--kitchens', type=int, default=2, help="KDS / COD screens")
+    parser.add_argument('--cfds', type=int, default=1, help="customer-facing displays")
+    parser.add_argument('--reports', type=int, default=1, help="report page users")
+    parser.add_argument('--duration', type=float, default=30.0, help="seconds")
+    parser.add_argument('--think', type=float, default=0.05, help="seconds between register actions")
+    parser.add_argument('--refresh', type=float, default=0.5, help="seconds between screen polls")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--db', default=DB_PATH, help="database to copy")
+    parser.add_argument('--json', help="also write the results to this file")
+    args = parser.parse_args()
+
+    result = run(args.registers, args.kitchens, args.cfds, args.reports, args.duration,
+                 args.think, args.refresh, seed=args.seed, db_path=args.db)
+    print_report(result)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(result, f, indent=2)
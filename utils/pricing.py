@@ -0,0 +1,95 @@
+# Order pricing shared by checkout, the CFD, receipts and the sales rollups.
+#
+# Money is integer cents throughout. Tax rates (Product.tax, Order_Product.tax_rate)
+# are percentages like 4.712; they are handled as integer thousandths of a
+# percent (4712) so that tax comes out in whole cents with one rounding rule:
+# per order, each rate's tax is its line totals times the rate, rounded half up.
+# The sales rollups apply the same rule in SQL (utils.rollups) with RATE_UNITS_SQL.
+
+DEFAULT_TAX_RATE = 4.712  # percent; Product.tax default
+RATE_SCALE = 1000         # rate units per percent
+TAX_DIVISOR = 100 * RATE_SCALE  # amount × rate units per cent of tax
+
+# rate_units() for a REAL percentage column
+RATE_UNITS_SQL = "CAST(round(({rate}) * 1000) AS INTEGER)"
+
+def rate_units(rate):
+    """4.712 (percent) → 4712; None means the default rate."""
+    return int(round((DEFAULT_TAX_RATE if rate is None else rate) * RATE_SCALE))
+
+def format_rate(units):
+    return f"{units / RATE_SCALE:.3f}%"
+
+def tax_cents(amount, units):
+    """Tax on amount cents at a rate in rate units, rounded half up to a cent."""
+    return (amount * units + TAX_DIVISOR // 2) // TAX_DIVISOR
+
+def line_total(unit_price, modifier_total, quantity):
+    return ((unit_price or 0) + (modifier_total or 0)) * (quantity or 0)
+
+def _summarize(subtotal, by_rate):
+    """Totals dict from a subtotal and {rate units: taxable cents}."""
+    tax_by_rate = {units: tax_cents(amount, units) for units, amount in sorted(by_rate.items())}
+    tax = sum(tax_by_rate.values())
+    return {'subtotal': subtotal, 'tax_by_rate': tax_by_rate, 'tax': tax, 'total': subtotal + tax}
+
+def price_orders(lines):
+    """
+    Price a batch of order lines (utils.database.get_order_lines rows) in one pass.
+    Returns (orders, totals):
+      orders: {order_id: {'items': [...], 'subtotal', 'tax_by_rate', 'tax', 'total'}}
+              in first-seen order; orders without lines have no items
+      totals: the same figures across all orders (tax is the sum of each order's tax)
+    """
+    items = {}
+    taxable = {}  # order_id -> {rate units: line totals}
+    for line in lines:
+        order_id = line['order_id']
+        order_items = items.setdefault(order_id, [])
+        order_taxable = taxable.setdefault(order_id, {})
+        if not line['product_id']:
+            continue
+        modifiers = line['modifiers']
+        modifier_total = line['modifier_total']
+        if modifier_total is None:
+            modifier_total = sum(mod['price'] or 0 for mod in modifiers)
+        item_total = line_total(line['product_price'], modifier_total, line['product_quantity'])
+        units = rate_units(line['tax'])
+        order_taxable[units] = order_taxable.get(units, 0) + item_total
+        order_items.append({
+            'order_id': order_id,
+            'order_product_id': line['order_product_id'],
+            'product_id': line['product_id'],
+            'description': line['product_description'],
+            'note': line['note'],
+            'quantity': line['product_quantity'],
+            'base_price': line['product_price'] or 0,
+            'modifiers': modifiers,
+            'modifier_total': modifier_total,
+            'item_total': item_total,
+            'tax_rate': units / RATE_SCALE,
+        })
+
+    orders = {}
+    subtotal = 0
+    tax_by_rate = {}
+    for order_id, order_items in items.items():
+        order = _summarize(sum(item['item_total'] for item in order_items), taxable[order_id])
+        order['items'] = order_items
+        orders[order_id] = order
+        subtotal += order['subtotal']
+        for units, tax in order['tax_by_rate'].items():
+            tax_by_rate[units] = tax_by_rate.get(units, 0) + tax
+    tax = sum(tax_by_rate.values())
+    totals = {'subtotal': subtotal, 'tax_by_rate': dict(sorted(tax_by_rate.items())),
+              'tax': tax, 'total': subtotal + tax}
+    return orders, totals
+
+def price_cart(lines):
+    """Totals for a register cart (Live_Cart) from (line total, tax rate) pairs; a None rate is the default."""
+    taxable = {}
+    for amount, rate in lines:
+        if amount:
+            units = rate_units(rate)
+            taxable[units] = taxable.get(units, 0) + amount
+    return _summarize(sum(amount for amount, _ in lines), taxable)
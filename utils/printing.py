@@ -0,0 +1,272 @@
+import base64
+import json
+import os
+import queue
+import select
+import socket
+import threading
+import time
+import uuid
+from utils import events
+
+# Raw (port 9100) printers by name
+PRINTERS = {
+    'receipt': ("192.168.0.41", 9100),
+}
+
+SPOOL_DIR = 'spool'
+
+CONNECT_TIMEOUT = 3.0   # seconds
+WRITE_TIMEOUT = 5.0
+IDLE_TIMEOUT = 60.0     # drop the persistent socket after this long without a job
+MAX_ATTEMPTS = 5
+BACKOFF_BASE = 0.5      # 0.5, 1, 2, 4 ... seconds between attempts
+BACKOFF_MAX = 15.0
+KEEP_FINISHED = 24 * 3600  # finished job files are pruned after a day
+
+# Job states
+QUEUED = 'queued'
+PRINTING = 'printing'
+DONE = 'done'
+FAILED = 'failed'
+
+def backoff_delay(attempts):
+    """Seconds to wait after the given number of failed attempts."""
+    return min(BACKOFF_BASE * 2 ** (attempts - 1), BACKOFF_MAX)
+
+
+class PrinterWorker(threading.Thread):
+    """Sends one printer's jobs in order over a persistent socket."""
+
+    def __init__(self, spooler, name):
+        super().__init__(name=f"printer-{name}", daemon=True)
+        self.spooler = spooler
+        self.printer = name
+        self.address = None
+        self.jobs = queue.Queue()
+        self.stopping = threading.Event()
+        self._sock = None
+        self._last_used = 0.0
+
+    def _connect(self):
+        self.address = self.spooler.printers[self.printer]
+        sock = socket.create_connection(self.address, timeout=CONNECT_TIMEOUT)
+        sock.settimeout(WRITE_TIMEOUT)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        self._sock = sock
+
+    def _disconnect(self):
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+            self._sock = None
+
+    def _peer_closed(self):
+        # sendall() on a socket the printer has closed still "succeeds" into the
+        # kernel buffer, so check for a pending EOF before reusing it
+        try:
+            readable, _, _ = select.select([self._sock], [], [], 0)
+            return bool(readable) and self._sock.recv(1, socket.MSG_PEEK) == b''
+        except OSError:
+            return True
+
+    def _send(self, data):
+        if (self._sock is None or time.monotonic() - self._last_used > IDLE_TIMEOUT
+                or self.address != self.spooler.printers[self.printer] or self._peer_closed()):
+            # Printers drop idle raw connections; don't trust an old one
+            self._disconnect()
+            self._connect()
+        self._sock.sendall(data)
+        self._last_used = time.monotonic()
+
+    def run(self):
+        while not self.stopping.is_set():
+            try:
+                job_id = self.jobs.get(timeout=IDLE_TIMEOUT)
+            except queue.Empty:
+                self._disconnect()
+                continue
+            if job_id is None or self.stopping.is_set():  # stop()
+                break
+            self._print_job(job_id)
+        self._disconnect()
+
+    def stop(self):
+        """Finish the send in progress and exit; jobs not yet printed stay spooled."""
+        self.stopping.set()
+        self.jobs.put(None)
+
+    def _print_job(self, job_id):
+        job = self.spooler.load_job(job_id)
+        if job is None or job['status'] in (DONE, FAILED):
+            return
+        data = base64.b64decode(job['data'])
+        while True:
+            job['attempts'] += 1
+            self.spooler.update_job(job, status=PRINTING)
+            try:
+                self._send(data)
+            except OSError as e:
+                self._disconnect()
+                if job['attempts'] >= MAX_ATTEMPTS:
+                    self.spooler.update_job(job, status=FAILED, error=str(e) or type(e).__name__)
+                    return
+                self.spooler.update_job(job, status=QUEUED, error=str(e) or type(e).__name__)
+                if self.stopping.wait(backoff_delay(job['attempts'])):
+                    return
+            else:
+                self.spooler.update_job(job, status=DONE, error=None)
+                return
+
+
+class PrintSpooler:
+    """Background print spooler backed by one JSON file per job in spool_dir.
+
+    Jobs survive a restart: anything not yet printed is re-queued on start.
+    Each printer gets its own worker thread, so a jammed kitchen printer can't
+    hold up receipts. Status changes are published as PRINT_JOB_UPDATED.
+    """
+
+    def __init__(self, printers=None, spool_dir=SPOOL_DIR):
+        self.printers = dict(PRINTERS if printers is None else printers)
+        self.spool_dir = spool_dir
+        self._workers = {}
+        self._unrouted = {}  # printer -> spooled job ids waiting for set_printer()
+        self._lock = threading.Lock()
+        os.makedirs(spool_dir, exist_ok=True)
+        self._recover()
+
+    def _path(self, job_id):
+        return os.path.join(self.spool_dir, f"{job_id}.json")
+
+    def _write(self, job):
+        # Write then rename, so a crash never leaves a half-written job file
+        path = self._path(job['job_id'])
+        tmp = path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(job, f)
+        os.replace(tmp, path)
+
+    def load_job(self, job_id):
+        try:
+            with open(self._path(job_id)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def update_job(self, job, **changes):
+        job.update(changes)
+        job['updated_at'] = time.time()
+        self._write(job)
+        events.emit(events.PRINT_JOB_UPDATED, job_id=job['job_id'], printer=job['printer'],
+                    status=job['status'], **job['meta'])
+
+    def _worker(self, printer):
+        with self._lock:
+            worker = self._workers.get(printer)
+            if worker is None:
+                worker = PrinterWorker(self, printer)
+                worker.start()
+                self._workers[printer] = worker
+            return worker
+
+    def _recover(self):
+        pending = []
+        now = time.time()
+        for name in os.listdir(self.spool_dir):
+            if not name.endswith('.json'):
+                continue
+            job = self.load_job(name[:-5])
+            if job is None:
+                continue
+            if job['status'] in (DONE, FAILED):
+                if now - job['updated_at'] > KEEP_FINISHED:
+                    os.remove(self._path(job['job_id']))
+            else:
+                pending.append(job)
+        for job in sorted(pending, key=lambda job: job['created_at']):
+            if job['printer'] in self.printers:
+                self._worker(job['printer']).jobs.put(job['job_id'])
+            else:
+                self._unrouted.setdefault(job['printer'], []).append(job['job_id'])
+
+    def set_printer(self, printer, address):
+        """Add or re-point a printer (host, port); resumes jobs spooled for it earlier."""
+        with self._lock:
+            self.printers[printer] = tuple(address)
+            waiting = self._unrouted.pop(printer, [])
+        for job_id in waiting:
+            self._worker(printer).jobs.put(job_id)
+
+    def submit(self, printer, data, **meta):
+        """Spool raw bytes for a printer; returns the job id straight away."""
+        if printer not in self.printers:
+            raise KeyError(f"Unknown printer: {printer}")
+        now = time.time()
+        job = {
+            'job_id': uuid.uuid4().hex,
+            'printer': printer,
+            'data': base64.b64encode(data).decode('ascii'),
+            'status': QUEUED,
+            'attempts': 0,
+            'error': None,
+            'meta': meta,
+            'created_at': now,
+            'updated_at': now,
+        }
+        self._write(job)
+        self._worker(printer).jobs.put(job['job_id'])
+        return job['job_id']
+
+    def stop(self, timeout=CONNECT_TIMEOUT + WRITE_TIMEOUT):
+        """Stop and join the printer workers. Unprinted jobs stay in spool_dir and
+        are resumed by the next spooler started on it."""
+        with self._lock:
+            workers = list(self._workers.values())
+            self._workers.clear()
+        for worker in workers:
+            worker.stop()
+        for worker in workers:
+            worker.join(timeout)
+
+    def status(self, job_id):
+        """Job dict without its payload, or None if unknown."""
+        job = self.load_job(job_id)
+        if job is not None:
+            del job['data']
+        return job
+
+
+_spooler = None
+_spooler_lock = threading.Lock()
+
+def get_spooler():
+    """Process-wide spooler; started (and any leftover jobs resumed) on first use."""
+    global _spooler
+    if _spooler is None:
+        with _spooler_lock:
+            if _spooler is None:
+                _spooler = PrintSpooler()
+    return _spooler
+
+def configure_spooler(printers=None, spool_dir=SPOOL_DIR):
+    """Replace the process-wide spooler (e.g. to point at utils.fake_printer).
+
+    The previous spooler's workers are stopped first, so its jobs are not sent twice.
+    """
+    global _spooler
+    with _spooler_lock:
+        if _spooler is not None:
+            _spooler.stop()
+        _spooler = PrintSpooler(printers, spool_dir)
+    return _spooler
+
+# Queue raw bytes for a printer; returns the job id
+def submit_print(printer, data, **meta):
+    return get_spooler().submit(printer, data, **meta)
+
+# Current state of a print job: queued / printing / done / failed
+def get_print_status(job_id):
+    return get_spooler().status(job_id)
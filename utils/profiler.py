@@ -0,0 +1,150 @@
+# Rerun profiler: wall time of each script rerun, split into phases.
+#
+#   if __name__ == "__main__":
+#       with profile_rerun("10_Order"):
+#           st.set_page_config(...)
+#           init_session_state()
+#           show_order_page()
+#
+# Wrap everything the script runs, page config and session state set-up
+# included; only imports and defs belong at module level, outside the timing.
+#
+# Statements on the rerun's thread count as 'db' (reported by
+# utils.query_stats), run_write() waits as 'write_wait', and code wrapped in
+# phase("name") under its own name: 'load_css', and 'dataframe' for the pages'
+# row shaping (pricing checkout's orders, diffing the cart for the CFD);
+# whatever is left is widget layout and page logic. Reruns go into a rolling buffer for the Rerun Profiler admin
+# page, which can also arm cProfile for a session's next few reruns.
+import cProfile
+import io
+import pstats
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+
+RERUNS_KEPT = 500
+PROFILE_LINES = 40  # pstats rows kept per profiled rerun
+
+_lock = threading.Lock()
+_reruns = deque(maxlen=RERUNS_KEPT)
+_armed = {}  # session_id -> reruns left to profile
+_local = threading.local()
+
+def _session_id():
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx else None
+
+def _take_armed(session_id):
+    with _lock:
+        left = _armed.get(session_id, 0)
+        if left <= 0:
+            return False
+        if left == 1:
+            del _armed[session_id]
+        else:
+            _armed[session_id] = left - 1
+        return True
+
+def _outcome(exc_type):
+    if exc_type is None:
+        return 'ok'
+    name = exc_type.__name__
+    # st.rerun() / st.switch_page() / st.stop() end the script with a control exception
+    if name in ('RerunException', 'StopException'):
+        return name[:-len('Exception')].lower()
+    return 'error'
+
+# ── Recording ─────────────────────────────────────────────────────────────────
+
+@contextmanager
+def profile_rerun(page):
+    """Time one run of a page script; nested calls on the same thread are ignored."""
+    if getattr(_local, 'rerun', None) is not None:
+        yield
+        return
+    session_id = _session_id()
+    rerun = {
+        'at': datetime.now().isoformat(sep=' ', timespec='seconds'),
+        'page': page,
+        'session': session_id,
+        'phases': {},
+        'db_ms': 0.0,
+        'statements': 0,
+        'accounted_ms': 0.0,  # db + phases so far, so nested phases aren't counted twice
+    }
+    profiler = cProfile.Profile() if session_id and _take_armed(session_id) else None
+    _local.rerun = rerun
+    exc_type = None
+    started = time.perf_counter()
+    if profiler:
+        profiler.enable()
+    try:
+        yield
+    except BaseException as e:
+        exc_type = type(e)
+        raise
+    finally:
+        if profiler:
+            profiler.disable()
+        total_ms = (time.perf_counter() - started) * 1000
+        _local.rerun = None
+        phases = rerun.pop('phases')
+        rerun.pop('accounted_ms')
+        rerun['total_ms'] = total_ms
+        rerun['outcome'] = _outcome(exc_type)
+        rerun.update({f"{name}_ms": ms for name, ms in phases.items()})
+        rerun['other_ms'] = max(0.0, total_ms - rerun['db_ms'] - sum(phases.values()))
+        if profiler:
+            out = io.StringIO()
+            pstats.Stats(profiler, stream=out).sort_stats('cumulative').print_stats(PROFILE_LINES)
+            rerun['profile'] = out.getvalue()
+        with _lock:
+            _reruns.append(rerun)
+
+@contextmanager
+def phase(name):
+    """Charge the block's time to a named phase of the current rerun, less the
+    statements and inner phases it contains."""
+    rerun = getattr(_local, 'rerun', None)
+    if rerun is None:
+        yield
+        return
+    accounted_before = rerun['accounted_ms']
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed_ms = (time.perf_counter() - started) * 1000 - (rerun['accounted_ms'] - accounted_before)
+        rerun['phases'][name] = rerun['phases'].get(name, 0.0) + elapsed_ms
+        rerun['accounted_ms'] += elapsed_ms
+
+def add_db_time(elapsed_ms, new_statement):
+    """Called by InstrumentedCursor for every statement / fetch on this thread."""
+    rerun = getattr(_local, 'rerun', None)
+    if rerun is not None:
+        rerun['db_ms'] += elapsed_ms
+        rerun['accounted_ms'] += elapsed_ms
+        rerun['statements'] += new_statement
+
+# ── Control / reading ─────────────────────────────────────────────────────────
+
+def arm_profiler(session_id, reruns=1):
+    """cProfile the next `reruns` profiled page runs of a session."""
+    with _lock:
+        _armed[session_id] = reruns
+
+def get_armed():
+    with _lock:
+        return dict(_armed)
+
+def get_reruns():
+    """Recorded reruns, newest first."""
+    with _lock:
+        return list(reversed(_reruns))
+
+def clear_reruns():
+    with _lock:
+        _reruns.clear()
@@ -0,0 +1,193 @@
+# Statement timing for every pooled connection (see PooledConnection.cursor).
+#
+# Each execute / executemany is timed together with the fetchone / fetchmany /
+# fetchall calls that read its rows, and aggregated per normalized SQL text and
+# calling page (or utils module for queued writes). Statements slower than
+# SLOW_QUERY_MS are appended to SLOW_QUERY_LOG and kept in memory for the
+# Query Stats admin page. Rows read by iterating a cursor directly are not
+# timed beyond the first row, which execute() already steps to.
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from functools import lru_cache
+from utils.profiler import add_db_time
+
+SLOW_QUERY_MS = 100.0
+SLOW_QUERY_LOG = 'slow_queries.log'
+SLOW_QUERIES_KEPT = 200
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_PAGES = os.path.join(_ROOT, 'pages')
+# Frames in these files are plumbing, not callers
+_SKIP = {os.path.join(_ROOT, 'utils', name) for name in ('database.py', 'query_stats.py', 'writer.py')}
+
+_lock = threading.Lock()
+_stats = {}  # (normalized sql, source) -> {'count', 'total_ms', 'max_ms', 'slow'}
+_slow = deque(maxlen=SLOW_QUERIES_KEPT)
+
+# ── Normalizing ───────────────────────────────────────────────────────────────
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.I)
+_SPACE = re.compile(r"\s+")
+
+@lru_cache(maxsize=2048)
+def normalize_sql(sql):
+    """One-line SQL with literals replaced by ? and IN (?, ?, ...) lists collapsed."""
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _IN_LIST.sub('IN (...)', sql)
+    return _SPACE.sub(' ', sql).strip()
+
+# ── Attribution ───────────────────────────────────────────────────────────────
+
+_code_labels = {}
+
+def _label(code):
+    """'pages/12_Checkout.py' for pages, 'utils/orders.py:insert_order' for other repo code, else None."""
+    label = _code_labels.get(code, False)
+    if label is False:
+        path = os.path.abspath(code.co_filename)
+        if path.startswith(_PAGES + os.sep) or path == os.path.join(_ROOT, 'Home.py'):
+            label = ('page', os.path.relpath(path, _ROOT))
+        elif path.startswith(_ROOT + os.sep) and path not in _SKIP and path.endswith('.py'):
+            label = ('module', f"{os.path.relpath(path, _ROOT)}:{code.co_name}")
+        else:
+            label = None
+        _code_labels[code] = label
+    return label
+
+def caller():
+    """The page on the stack, else the nearest repo function that issued the statement."""
+    nearest = None
+    frame = sys._getframe(2)
+    while frame is not None:
+        label = _label(frame.f_code)
+        if label is not None:
+            if label[0] == 'page':
+                return label[1]
+            nearest = nearest or label[1]
+        frame = frame.f_back
+    return nearest or 'other'
+
+# ── Recording ─────────────────────────────────────────────────────────────────
+
+def _record(key, elapsed_ms, new_statement, statement_ms, logged):
+    """Add to key's totals; True when this statement has just become slow."""
+    with _lock:
+        entry = _stats.get(key)
+        if entry is None:
+            entry = _stats[key] = {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'slow': 0}
+        entry['count'] += new_statement
+        entry['total_ms'] += elapsed_ms
+        entry['max_ms'] = max(entry['max_ms'], statement_ms)
+        if statement_ms >= SLOW_QUERY_MS and not logged:
+            entry['slow'] += 1
+            return True
+        return False
+
+def _log_slow(sql, parameters, source, elapsed_ms):
+    entry = {
+        'at': datetime.now().isoformat(sep=' ', timespec='seconds'),
+        'ms': round(elapsed_ms, 1),
+        'source': source,
+        'sql': _SPACE.sub(' ', sql).strip(),
+        'params': repr(parameters)[:200] if parameters is not None else '',
+    }
+    with _lock:
+        _slow.append(entry)
+        try:
+            with open(SLOW_QUERY_LOG, 'a', encoding='utf-8') as f:
+                f.write('\t'.join(str(entry[field]) for field in ('at', 'ms', 'source', 'sql', 'params')) + '\n')
+        except OSError as e:
+            print(f"Error writing slow query log: {e}")
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """Cursor that reports each statement's execute + fetch time to the stats."""
+
+    _statement = None  # [key, sql, parameters, source, elapsed_ms, logged]
+
+    def _start(self, sql, parameters, started):
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        source = caller()
+        self._statement = [(normalize_sql(sql), source), sql, parameters, source, 0.0, False]
+        self._add(elapsed_ms, 1)
+
+    def _add(self, elapsed_ms, new_statement=0):
+        statement = self._statement
+        if statement is None:
+            return
+        statement[4] += elapsed_ms
+        add_db_time(elapsed_ms, new_statement)
+        if _record(statement[0], elapsed_ms, new_statement, statement[4], statement[5]):
+            statement[5] = True
+            _log_slow(statement[1], statement[2], statement[3], statement[4])
+
+    def execute(self, sql, parameters=()):
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._start(sql, parameters, started)
+
+    def executemany(self, sql, seq_of_parameters):
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self._start(sql, None, started)
+
+    def executescript(self, sql_script):
+        started = time.perf_counter()
+        try:
+            return super().executescript(sql_script)
+        finally:
+            self._start(sql_script, None, started)
+
+    def fetchone(self):
+        started = time.perf_counter()
+        try:
+            return super().fetchone()
+        finally:
+            self._add((time.perf_counter() - started) * 1000)
+
+    def fetchmany(self, size=None):
+        started = time.perf_counter()
+        try:
+            return super().fetchmany(self.arraysize if size is None else size)
+        finally:
+            self._add((time.perf_counter() - started) * 1000)
+
+    def fetchall(self):
+        started = time.perf_counter()
+        try:
+            return super().fetchall()
+        finally:
+            self._add((time.perf_counter() - started) * 1000)
+
+# ── Reading ───────────────────────────────────────────────────────────────────
+
+def get_query_stats():
+    """One dict per (normalized sql, source): count, total_ms, avg_ms, max_ms, slow."""
+    with _lock:
+        rows = [dict(entry, sql=sql, source=source) for (sql, source), entry in _stats.items()]
+    for row in rows:
+        row['avg_ms'] = row['total_ms'] / row['count'] if row['count'] else 0.0
+    return sorted(rows, key=lambda row: row['total_ms'], reverse=True)
+
+def get_slow_queries():
+    """Most recent slow statements, newest first."""
+    with _lock:
+        return list(reversed(_slow))
+
+def reset_query_stats():
+    with _lock:
+        _stats.clear()
+        _slow.clear()
@@ -0,0 +1,143 @@
+# Sales rollups (Sales_Rollup / Sales_Rollup_Order, see utils/schema.py migration 7).
+#
+# The rollup_order_paid trigger adds each order as it is paid. Rebuild from
+# history after fixing data or restoring a backup:
+#
+#   python -m utils.rollups [--since 2026-01-01]
+import argparse
+from utils.database import get_write_connection
+from utils.pricing import DEFAULT_TAX_RATE, RATE_UNITS_SQL, TAX_DIVISOR
+
+# First status-11 row per order: when it was paid and the total it was paid with.
+# SQLite takes the bare columns (total, username) from the row holding MIN(timestamp).
+_PAID_ORDERS = '''
+    SELECT oh.order_id, MIN(oh.timestamp) AS paid_at, oh.total
+    FROM Order_History oh
+    WHERE oh.order_status = 11
+    GROUP BY oh.order_id
+    HAVING MIN(oh.timestamp) >= :since
+'''
+
+# Each paid order's lines per product, for the orders in {paid} (order_id, paid_at).
+# Tax is rounded as at checkout (utils.pricing): once per order and rate, on the
+# rate's line totals. Each product gets its exact share rounded down, and the
+# cents left over go to the largest remainders, so an order's products add up to
+# the tax it was charged. The rebuild and the rollup_order_paid trigger
+# (ROLLUP_TRIGGER) both read this. Lines without a stored rate (sold before
+# Order_Product.tax_rate existed) use the default rate, as checkout does.
+_RATE_UNITS = RATE_UNITS_SQL.format(rate=f'COALESCE(op.tax_rate, {DEFAULT_TAX_RATE})')
+_PAID_LINES = f'''
+    SELECT order_id, paid_at, product_id,
+           SUM(quantity) AS quantity, SUM(subtotal) AS subtotal, SUM(tax) AS tax
+    FROM (SELECT order_id, paid_at, product_id, quantity, subtotal,
+                 share / {TAX_DIVISOR}
+                 + (ROW_NUMBER() OVER rate_lines
+                    <= (SUM(share) OVER rate_lines + {TAX_DIVISOR // 2}) / {TAX_DIVISOR}
+                       - SUM(share / {TAX_DIVISOR}) OVER rate_lines) AS tax
+          FROM (SELECT paid.order_id, paid.paid_at, op.product_id,
+                       {_RATE_UNITS} AS units,
+                       SUM(op.product_quantity) AS quantity, SUM(op.line_total) AS subtotal,
+                       SUM(op.line_total) * {_RATE_UNITS} AS share
+                FROM ({{paid}}) paid
+                JOIN Order_Product op ON op.order_id = paid.order_id
+                WHERE op.product_id IS NOT NULL
+                GROUP BY paid.order_id, op.product_id, units)
+          WINDOW rate_lines AS (PARTITION BY order_id, units
+                                ORDER BY share % {TAX_DIVISOR} DESC, product_id
+                                ROWS BETWEEN UNBOUNDED PRECEDING AND UNBOUNDED FOLLOWING))
+    GROUP BY order_id, product_id
+'''
+
+_GRAINS = '''
+    SELECT 'day' AS grain, '%Y-%m-%d' AS format
+    UNION ALL
+    SELECT 'hour', '%Y-%m-%d %H:00:00'
+'''
+
+# Adds an order to the rollups as it is paid (see create_rollup_trigger).
+# The order is its own {paid} row, paid now.
+ROLLUP_TRIGGER = f'''
+    CREATE TRIGGER rollup_order_paid
+    AFTER UPDATE OF order_status ON Order_Cart
+    FOR EACH ROW
+    WHEN NEW.order_status = 11 AND OLD.order_status <> 11
+    BEGIN
+        INSERT INTO Sales_Rollup (grain, period, product_id, category_id, username, service_area_id,
+                                  quantity, subtotal, tax, order_count)
+        SELECT g.grain, strftime(g.format, l.paid_at), l.product_id, COALESCE(p.category_id, 0),
+               COALESCE(NEW.username, ''), NEW.service_area_id,
+               SUM(l.quantity), SUM(l.subtotal), SUM(l.tax), 1
+        FROM ({_PAID_LINES.format(paid="SELECT NEW.order_id AS order_id, CURRENT_TIMESTAMP AS paid_at")}) l
+        LEFT JOIN Product p ON p.product_id = l.product_id
+        CROSS JOIN ({_GRAINS}) g
+        GROUP BY 1, 2, 3, 4
+        ON CONFLICT (grain, period, product_id, category_id, username, service_area_id) DO UPDATE SET
+            quantity = quantity + excluded.quantity,
+            subtotal = subtotal + excluded.subtotal,
+            tax = tax + excluded.tax,
+            order_count = order_count + 1;
+
+        INSERT INTO Sales_Rollup_Order (grain, period, username, service_area_id, order_count, revenue)
+        SELECT g.grain, strftime(g.format, CURRENT_TIMESTAMP), COALESCE(NEW.username, ''), NEW.service_area_id,
+               1, COALESCE(NEW.total, 0)
+        FROM ({_GRAINS}) g
+        WHERE true
+        ON CONFLICT (grain, period, username, service_area_id) DO UPDATE SET
+            order_count = order_count + 1,
+            revenue = revenue + excluded.revenue;
+    END
+'''
+
+def create_rollup_trigger(conn):
+    """(Re)create rollup_order_paid from ROLLUP_TRIGGER (utils/schema.py migration 19)."""
+    conn.execute("DROP TRIGGER IF EXISTS rollup_order_paid")
+    conn.execute(ROLLUP_TRIGGER)
+
+def rebuild_sales_rollup(conn, since=''):
+    """Recompute the rollups for orders paid on or after since (a date; '' = everything).
+
+    Months already moved to archive databases (utils.archive) are closed; their
+    rollups are kept as they are and the rebuild starts after the last one.
+    """
+    since = str(since or '')
+    has_archive = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'Archive_Month'"
+    ).fetchone()
+    if has_archive:
+        last_month = conn.execute("SELECT MAX(month) FROM Archive_Month").fetchone()[0]
+        if last_month:
+            year, month = int(last_month[:4]), int(last_month[5:7])
+            since = max(since, f"{year + month // 12:04d}-{month % 12 + 1:02d}-01")
+    conn.execute("DELETE FROM Sales_Rollup WHERE period >= ?", (since,))
+    conn.execute("DELETE FROM Sales_Rollup_Order WHERE period >= ?", (since,))
+    conn.execute(f'''
+        INSERT INTO Sales_Rollup (grain, period, product_id, category_id, username, service_area_id,
+                                  quantity, subtotal, tax, order_count)
+        SELECT g.grain, strftime(g.format, l.paid_at), l.product_id, COALESCE(p.category_id, 0),
+               COALESCE(oc.username, ''), oc.service_area_id,
+               SUM(l.quantity), SUM(l.subtotal), SUM(l.tax), COUNT(DISTINCT l.order_id)
+        FROM ({_PAID_LINES.format(paid=_PAID_ORDERS)}) l
+        JOIN Order_Cart oc ON oc.order_id = l.order_id
+        LEFT JOIN Product p ON p.product_id = l.product_id
+        CROSS JOIN ({_GRAINS}) g
+        GROUP BY 1, 2, 3, 4, 5, 6
+    ''', {'since': since})
+    conn.execute(f'''
+        INSERT INTO Sales_Rollup_Order (grain, period, username, service_area_id, order_count, revenue)
+        SELECT g.grain, strftime(g.format, paid.paid_at), COALESCE(oc.username, ''), oc.service_area_id,
+               COUNT(*), SUM(COALESCE(paid.total, 0))
+        FROM ({_PAID_ORDERS}) paid
+        JOIN Order_Cart oc ON oc.order_id = paid.order_id
+        CROSS JOIN ({_GRAINS}) g
+        GROUP BY 1, 2, 3, 4
+    ''', {'since': since})
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild the sales rollup tables from order history")
+    parser.add_argument('--since', default='', help="only orders paid on or after this date (YYYY-MM-DD)")
+    args = parser.parse_args()
+    with get_write_connection() as conn:
+        rebuild_sales_rollup(conn, args.since)
+        days = conn.execute("SELECT COUNT(DISTINCT period) FROM Sales_Rollup_Order WHERE grain = 'day'").fetchone()[0]
+    print(f"Sales rollups rebuilt ({days} days)")
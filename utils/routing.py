@@ -0,0 +1,70 @@
+import time
+from utils.catalog import get_catalog
+from utils.database import get_kitchen_board
+from utils.printing import get_spooler
+
+DEFAULT_PRINTER_PORT = 9100
+
+# Spooler printer name for a Workcenter
+def workcenter_printer(workcenter_id):
+    return f"workcenter-{workcenter_id}"
+
+# "192.168.0.60" or "192.168.0.60:9101" → (host, port)
+def parse_address(ip_address):
+    if not ip_address or not ip_address.strip():
+        return None
+    host, _, port = ip_address.strip().partition(':')
+    return (host, int(port) if port else DEFAULT_PRINTER_PORT)
+
+def split_order(order, catalog=None):
+    """Group a kitchen board order's items by the Workcenter that makes them: {workcenter_id: [items]}."""
+    catalog = catalog or get_catalog()
+    tickets = {}
+    for item in order['items']:
+        tickets.setdefault(catalog.workcenter_for(item['product_id']), []).append(item)
+    return tickets
+
+def format_ticket(order, station, items):
+    lines = [
+        f"** {station} **\n",
+        f"Order: {order['order_id'] % 100}\n",
+    ]
+    if order['provided_name']:
+        lines.append(f"Name: {order['provided_name']}\n")
+    lines.append(time.strftime("%H:%M:%S") + "\n")
+    lines.append("-" * 32 + "\n")
+    for item in items:
+        lines.append(f"{item['product_quantity']} x {item['product_name']}\n")
+        if item['modifier_names']:
+            lines.append(f"    {item['modifier_names']}\n")
+    if order['note'] and str(order['note']).strip():
+        lines.append("-" * 32 + "\n")
+        lines.append(f"Note: {order['note']}\n")
+    lines.append("\n\n")
+    return "".join(lines).encode("utf-8") + b"\x1dV\x00"
+
+def dispatch_tickets(order_ids, order_status=11):
+    """
+    Split paid orders into one ticket per Workcenter and spool each to that
+    station's printer. Every printer has its own spooler worker, so stations
+    print in parallel and a slow one doesn't hold up the rest.
+    Workcenters without an ip_address only see the order on the KDS screen.
+    Returns: {order_id: {workcenter_id: job_id or None}}
+    """
+    catalog = get_catalog()
+    spooler = get_spooler()
+    dispatched = {}
+    for order in get_kitchen_board(order_status, order_ids):
+        jobs = dispatched[order['order_id']] = {}
+        for workcenter_id, items in split_order(order, catalog).items():
+            station, ip_address = catalog.workcenters.get(workcenter_id, ("Kitchen", None))
+            address = parse_address(ip_address)
+            if address is None:
+                jobs[workcenter_id] = None
+                continue
+            printer = workcenter_printer(workcenter_id)
+            if spooler.printers.get(printer) != address:
+                spooler.set_printer(printer, address)
+            jobs[workcenter_id] = spooler.submit(printer, format_ticket(order, station, items),
+                                                 order_id=order['order_id'], workcenter_id=workcenter_id)
+    return dispatched
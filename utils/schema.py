@@ -0,0 +1,548 @@
+# Schema migrations for pos.database, tracked with PRAGMA user_version.
+# Each entry runs once, in order, the first time the connection pool is used.
+# A step is either an SQL script or a function taking the connection (for backfills).
+
+def _backfill_sales_rollup(conn):
+    from utils.rollups import rebuild_sales_rollup
+    rebuild_sales_rollup(conn)
+
+def _recreate_rollup_trigger(conn):
+    from utils.rollups import create_rollup_trigger, rebuild_sales_rollup
+    create_rollup_trigger(conn)
+    rebuild_sales_rollup(conn)
+
+def _backfill_order_lifecycle(conn):
+    from utils.lifecycle import rebuild_order_lifecycle
+    rebuild_order_lifecycle(conn)
+
+
+MIGRATIONS = [
+    # 1: Order_Product.modifiers (comma-separated ids) → Order_Product_Modifier rows
+    (1, """
+        CREATE TABLE IF NOT EXISTS Order_Product_Modifier (
+            order_product_id INTEGER NOT NULL,
+            modifier_id INTEGER NOT NULL,
+            description TEXT,  -- text as chosen at the register, e.g. 'Spice: Hot'
+            PRIMARY KEY (order_product_id, modifier_id),
+            FOREIGN KEY (order_product_id) REFERENCES Order_Product(order_product_id),
+            FOREIGN KEY (modifier_id) REFERENCES Modifier(modifier_id)
+        ) WITHOUT ROWID;
+
+        CREATE INDEX IF NOT EXISTS idx_order_product_modifier_modifier_id
+        ON Order_Product_Modifier(modifier_id);
+
+        WITH RECURSIVE split(order_product_id, rest, modifier_id) AS (
+            SELECT order_product_id, modifiers || ',', NULL
+            FROM Order_Product
+            WHERE modifiers IS NOT NULL AND modifiers <> ''
+            UNION ALL
+            SELECT order_product_id,
+                   substr(rest, instr(rest, ',') + 1),
+                   CAST(trim(substr(rest, 1, instr(rest, ',') - 1)) AS INTEGER)
+            FROM split
+            WHERE rest <> ''
+        )
+        INSERT OR IGNORE INTO Order_Product_Modifier (order_product_id, modifier_id)
+        SELECT order_product_id, modifier_id
+        FROM split
+        WHERE modifier_id > 0;
+
+        CREATE TRIGGER IF NOT EXISTS delete_order_product_modifiers
+        AFTER DELETE ON Order_Product
+        FOR EACH ROW
+        BEGIN
+            DELETE FROM Order_Product_Modifier WHERE order_product_id = OLD.order_product_id;
+        END;
+    """),
+
+    # 2: change feed versions bumped by triggers, so polling screens can skip unchanged reruns
+    (2, """
+        CREATE TABLE IF NOT EXISTS Change_Feed (
+            feed TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID;
+
+        INSERT OR IGNORE INTO Change_Feed (feed, version) VALUES ('orders', 0), ('live_cart', 0);
+
+        CREATE TRIGGER IF NOT EXISTS feed_order_cart_insert AFTER INSERT ON Order_Cart
+        BEGIN UPDATE Change_Feed SET version = version + 1 WHERE feed = 'orders'; END;
+        CREATE TRIGGER IF NOT EXISTS feed_order_cart_update AFTER UPDATE ON Order_Cart
+        BEGIN UPDATE Change_Feed SET version = version + 1 WHERE feed = 'orders'; END;
+        CREATE TRIGGER IF NOT EXISTS feed_order_cart_delete AFTER DELETE ON Order_Cart
+        BEGIN UPDATE Change_Feed SET version = version + 1 WHERE feed = 'orders'; END;
+
+        CREATE TRIGGER IF NOT EXISTS feed_order_product_insert AFTER INSERT ON Order_Product
+        BEGIN UPDATE Change_Feed SET version = version + 1 WHERE feed = 'orders'; END;
+        CREATE TRIGGER IF NOT EXISTS feed_order_product_update AFTER UPDATE ON Order_Product
+        BEGIN UPDATE Change_Feed SET version = version + 1 WHERE feed = 'orders'; END;
+        CREATE TRIGGER IF NOT EXISTS feed_order_product_delete AFTER DELETE ON Order_Product
+        BEGIN UPDATE Change_Feed SET version = version + 1 WHERE feed = 'orders'; END;
+
+        CREATE TRIGGER IF NOT EXISTS feed_live_cart_insert AFTER INSERT ON Live_Cart
+        BEGIN UPDATE Change_Feed SET version = version + 1 WHERE feed = 'live_cart'; END;
+        CREATE TRIGGER IF NOT EXISTS feed_live_cart_update AFTER UPDATE ON Live_Cart
+        BEGIN UPDATE Change_Feed SET version = version + 1 WHERE feed = 'live_cart'; END;
+        CREATE TRIGGER IF NOT EXISTS feed_live_cart_delete AFTER DELETE ON Live_Cart
+        BEGIN UPDATE Change_Feed SET version = version + 1 WHERE feed = 'live_cart'; END;
+    """),
+
+    # 3: Live_Cart rows keyed by register (session_id) and cart line, for incremental upserts
+    (3, """
+        ALTER TABLE Live_Cart ADD COLUMN line_key TEXT;
+
+        DELETE FROM Live_Cart;
+
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_live_cart_session_line
+        ON Live_Cart(session_id, line_key);
+    """),
+
+    # 4: menu catalog version, bumped by any change to the menu tables
+    (4, """
+        INSERT OR IGNORE INTO Change_Feed (feed, version) VALUES ('catalog', 0);
+
+        CREATE TRIGGER IF NOT EXISTS feed_category_insert AFTER INSERT ON Category
+        BEGIN UPDATE Change_Feed SET version = version + 1 WHERE feed = 'catalog'; END;
+        CREATE TRIGGER IF NOT EXISTS feed_category_update AFTER UPDATE ON Category
+        BEGIN UPDATE Change_Feed SET version = version + 1 WHERE feed = 'catalog'; END;
+        CREATE TRIGGER IF NOT EXISTS feed_category_delete AFTER DELETE ON Category
+        BEGIN UPDATE Change_Feed SET version = version + 1 WHERE feed = 'catalog'; END;
+        CREATE TRIGGER IF NOT EXISTS feed_product_insert AFTER INSERT ON Product
+        BEGIN UPDATE Change_Feed SET version = version + 1 WHERE feed = 'catalog'; END;
+        CREATE TRIGGER IF NOT EXISTS feed_product_update AFTER UPDATE ON Product
+        BEGIN UPDATE Change_Feed SET version = version + 1 WHERE feed = 'catalog'; END;
+        CREATE TRIGGER IF NOT EXISTS feed_product_delete AFTER DELETE ON Product
+        BEGIN UPDATE Change_Feed SET version = version + 1 WHERE feed = 'catalog'; END;
+        CREATE TRIGGER IF NOT EXISTS feed_modifier_insert AFTER INSERT ON Modifier
+        BEGIN UPDATE Change_Feed SET version = version + 1 WHERE feed = 'catalog'; END;
+        CREATE TRIGGER IF NOT EXISTS feed_modifier_update AFTER UPDATE ON Modifier
+        BEGIN UPDATE Change_Feed SET version = version + 1 WHERE feed = 'catalog'; END;
+        CREATE TRIGGER IF NOT EXISTS feed_modifier_delete AFTER DELETE ON Modifier
+        BEGIN UPDATE Change_Feed SET version = version + 1 WHERE feed = 'catalog'; END;
+        CREATE TRIGGER IF NOT EXISTS feed_modifier_type_insert AFTER INSERT ON Modifier_Type
+        BEGIN UPDATE Change_Feed SET version = version + 1 WHERE feed = 'catalog'; END;
+        CREATE TRIGGER IF NOT EXISTS feed_modifier_type_update AFTER UPDATE ON Modifier_Type
+        BEGIN UPDATE Change_Feed SET version = version + 1 WHERE feed = 'catalog'; END;
+        CREATE TRIGGER IF NOT EXISTS feed_modifier_type_delete AFTER DELETE ON Modifier_Type
+        BEGIN UPDATE Change_Feed SET version = version + 1 WHERE feed = 'catalog'; END;
+        CREATE TRIGGER IF NOT EXISTS feed_modifier_type_item_insert AFTER INSERT ON Modifier_Type_Item
+        BEGIN UPDATE Change_Feed SET version = version + 1 WHERE feed = 'catalog'; END;
+        CREATE TRIGGER IF NOT EXISTS feed_modifier_type_item_update AFTER UPDATE ON Modifier_Type_Item
+        BEGIN UPDATE Change_Feed SET version = version + 1 WHERE feed = 'catalog'; END;
+        CREATE TRIGGER IF NOT EXISTS feed_modifier_type_item_delete AFTER DELETE ON Modifier_Type_Item
+        BEGIN UPDATE Change_Feed SET version = version + 1 WHERE feed = 'catalog'; END;
+    """),
+
+    # 5: kitchen routing — which Workcenter makes each category / product
+    (5, """
+        CREATE TABLE IF NOT EXISTS Workcenter_Route (
+            route_id INTEGER PRIMARY KEY,
+            workcenter_id INTEGER NOT NULL,
+            category_id INTEGER,
+            product_id INTEGER,  -- overrides the product's category route
+            CHECK ((category_id IS NULL) <> (product_id IS NULL)),
+            FOREIGN KEY (workcenter_id) REFERENCES Workcenter(workcenter_id),
+            FOREIGN KEY (category_id) REFERENCES Category(category_id),
+            FOREIGN KEY (product_id) REFERENCES Product(product_id)
+        );
+
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_workcenter_route_category
+        ON Workcenter_Route(category_id) WHERE category_id IS NOT NULL;
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_workcenter_route_product
+        ON Workcenter_Route(product_id) WHERE product_id IS NOT NULL;
+
+        CREATE TRIGGER IF NOT EXISTS feed_workcenter_insert AFTER INSERT ON Workcenter
+        BEGIN UPDATE Change_Feed SET version = version + 1 WHERE feed = 'catalog'; END;
+        CREATE TRIGGER IF NOT EXISTS feed_workcenter_update AFTER UPDATE ON Workcenter
+        BEGIN UPDATE Change_Feed SET version = version + 1 WHERE feed = 'catalog'; END;
+        CREATE TRIGGER IF NOT EXISTS feed_workcenter_delete AFTER DELETE ON Workcenter
+        BEGIN UPDATE Change_Feed SET version = version + 1 WHERE feed = 'catalog'; END;
+        CREATE TRIGGER IF NOT EXISTS feed_workcenter_route_insert AFTER INSERT ON Workcenter_Route
+        BEGIN UPDATE Change_Feed SET version = version + 1 WHERE feed = 'catalog'; END;
+        CREATE TRIGGER IF NOT EXISTS feed_workcenter_route_update AFTER UPDATE ON Workcenter_Route
+        BEGIN UPDATE Change_Feed SET version = version + 1 WHERE feed = 'catalog'; END;
+        CREATE TRIGGER IF NOT EXISTS feed_workcenter_route_delete AFTER DELETE ON Workcenter_Route
+        BEGIN UPDATE Change_Feed SET version = version + 1 WHERE feed = 'catalog'; END;
+    """),
+
+    # 6: report queries filter on a timestamp range plus status and join on order_id;
+    # the composite index covers all three (and supersedes the timestamp-only one)
+    (6, """
+        CREATE INDEX IF NOT EXISTS idx_order_history_timestamp_status
+        ON Order_History(timestamp, order_status, order_id);
+
+        DROP INDEX IF EXISTS idx_order_history_timestamp;
+    """),
+
+    # 7: sales rollups by day and by hour, added to as each order is paid (status → 11).
+    # Periods are UTC like Order_History.timestamp: '2026-10-17' / '2026-10-17 14:00:00'.
+    (7, """
+        CREATE TABLE IF NOT EXISTS Sales_Rollup (
+            grain TEXT NOT NULL,  -- 'day' or 'hour'
+            period TEXT NOT NULL,
+            product_id INTEGER NOT NULL,
+            category_id INTEGER NOT NULL DEFAULT 0,
+            username TEXT NOT NULL DEFAULT '',
+            service_area_id INTEGER NOT NULL DEFAULT 0,
+            quantity INTEGER NOT NULL DEFAULT 0,
+            subtotal INTEGER NOT NULL DEFAULT 0,
+            tax REAL NOT NULL DEFAULT 0,
+            order_count INTEGER NOT NULL DEFAULT 0,  -- orders containing the product
+            PRIMARY KEY (grain, period, product_id, category_id, username, service_area_id)
+        ) WITHOUT ROWID;
+
+        CREATE TABLE IF NOT EXISTS Sales_Rollup_Order (
+            grain TEXT NOT NULL,
+            period TEXT NOT NULL,
+            username TEXT NOT NULL DEFAULT '',
+            service_area_id INTEGER NOT NULL DEFAULT 0,
+            order_count INTEGER NOT NULL DEFAULT 0,
+            revenue INTEGER NOT NULL DEFAULT 0,  -- Order_Cart.total when paid
+            PRIMARY KEY (grain, period, username, service_area_id)
+        ) WITHOUT ROWID;
+
+        CREATE TRIGGER IF NOT EXISTS rollup_order_paid
+        AFTER UPDATE OF order_status ON Order_Cart
+        FOR EACH ROW
+        WHEN NEW.order_status = 11 AND OLD.order_status <> 11
+        BEGIN
+            INSERT INTO Sales_Rollup (grain, period, product_id, category_id, username, service_area_id,
+                                      quantity, subtotal, tax, order_count)
+            SELECT g.grain, g.period, op.product_id, COALESCE(p.category_id, 0),
+                   COALESCE(NEW.username, ''), NEW.service_area_id,
+                   SUM(op.product_quantity), SUM(op.product_quantity * p.price),
+                   SUM(op.product_quantity * p.tax), 1
+            FROM Order_Product op
+            JOIN Product p ON p.product_id = op.product_id
+            CROSS JOIN (SELECT 'day' AS grain, date(CURRENT_TIMESTAMP) AS period
+                        UNION ALL
+                        SELECT 'hour', strftime('%Y-%m-%d %H:00:00', CURRENT_TIMESTAMP)) g
+            WHERE op.order_id = NEW.order_id
+            GROUP BY g.grain, g.period, op.product_id, p.category_id
+            ON CONFLICT (grain, period, product_id, category_id, username, service_area_id) DO UPDATE SET
+                quantity = quantity + excluded.quantity,
+                subtotal = subtotal + excluded.subtotal,
+                tax = tax + excluded.tax,
+                order_count = order_count + 1;
+
+            INSERT INTO Sales_Rollup_Order (grain, period, username, service_area_id, order_count, revenue)
+            SELECT g.grain, g.period, COALESCE(NEW.username, ''), NEW.service_area_id, 1, COALESCE(NEW.total, 0)
+            FROM (SELECT 'day' AS grain, date(CURRENT_TIMESTAMP) AS period
+                  UNION ALL
+                  SELECT 'hour', strftime('%Y-%m-%d %H:00:00', CURRENT_TIMESTAMP)) g
+            WHERE true
+            ON CONFLICT (grain, period, username, service_area_id) DO UPDATE SET
+                order_count = order_count + 1,
+                revenue = revenue + excluded.revenue;
+        END;
+    """),
+
+    # 8: fill the rollups from orders paid before migration 7. This is
+    # utils.rollups.rebuild_sales_rollup as it was then (live Product prices);
+    # the rebuild has since moved on to columns added by 9, and 10 recomputes with it.
+    (8, """
+        DELETE FROM Sales_Rollup;
+        DELETE FROM Sales_Rollup_Order;
+
+        INSERT INTO Sales_Rollup (grain, period, product_id, category_id, username, service_area_id,
+                                  quantity, subtotal, tax, order_count)
+        SELECT g.grain, strftime(g.format, paid.paid_at), op.product_id, COALESCE(p.category_id, 0),
+               COALESCE(oc.username, ''), oc.service_area_id,
+               SUM(op.product_quantity), SUM(op.product_quantity * p.price),
+               SUM(op.product_quantity * p.tax), COUNT(DISTINCT op.order_id)
+        FROM (SELECT oh.order_id, MIN(oh.timestamp) AS paid_at, oh.total
+              FROM Order_History oh
+              WHERE oh.order_status = 11
+              GROUP BY oh.order_id) paid
+        JOIN Order_Cart oc ON oc.order_id = paid.order_id
+        JOIN Order_Product op ON op.order_id = paid.order_id
+        JOIN Product p ON p.product_id = op.product_id
+        CROSS JOIN (SELECT 'day' AS grain, '%Y-%m-%d' AS format
+                    UNION ALL
+                    SELECT 'hour', '%Y-%m-%d %H:00:00') g
+        GROUP BY 1, 2, 3, 4, 5, 6;
+
+        INSERT INTO Sales_Rollup_Order (grain, period, username, service_area_id, order_count, revenue)
+        SELECT g.grain, strftime(g.format, paid.paid_at), COALESCE(oc.username, ''), oc.service_area_id,
+               COUNT(*), SUM(COALESCE(paid.total, 0))
+        FROM (SELECT oh.order_id, MIN(oh.timestamp) AS paid_at, oh.total
+              FROM Order_History oh
+              WHERE oh.order_status = 11
+              GROUP BY oh.order_id) paid
+        JOIN Order_Cart oc ON oc.order_id = paid.order_id
+        CROSS JOIN (SELECT 'day' AS grain, '%Y-%m-%d' AS format
+                    UNION ALL
+                    SELECT 'hour', '%Y-%m-%d %H:00:00') g
+        GROUP BY 1, 2, 3, 4;
+    """),
+
+    # 9: prices snapshotted onto each order line when the order is placed, so checkout
+    # and reports don't depend on the live Product / Modifier prices.
+    # Lines placed before this migration take today's prices.
+    (9, """
+        ALTER TABLE Order_Product ADD COLUMN unit_price INTEGER;      -- Product.price, cents
+        ALTER TABLE Order_Product ADD COLUMN modifier_total INTEGER;  -- sum of modifier prices per unit
+        ALTER TABLE Order_Product ADD COLUMN tax_rate REAL;           -- percent, e.g. 4.712
+        ALTER TABLE Order_Product ADD COLUMN line_total INTEGER;      -- (unit_price + modifier_total) * quantity
+        ALTER TABLE Order_Product_Modifier ADD COLUMN price INTEGER;
+
+        UPDATE Order_Product_Modifier
+        SET price = COALESCE((SELECT m.price FROM Modifier m
+                              WHERE m.modifier_id = Order_Product_Modifier.modifier_id), 0);
+
+        UPDATE Order_Product
+        SET unit_price = COALESCE((SELECT p.price FROM Product p WHERE p.product_id = Order_Product.product_id), 0),
+            tax_rate = COALESCE((SELECT p.tax FROM Product p WHERE p.product_id = Order_Product.product_id), 4.712),
+            modifier_total = (SELECT COALESCE(SUM(opm.price), 0) FROM Order_Product_Modifier opm
+                              WHERE opm.order_product_id = Order_Product.order_product_id);
+
+        UPDATE Order_Product
+        SET line_total = (unit_price + modifier_total) * COALESCE(product_quantity, 0);
+
+        -- Rollups now add up the snapshots: subtotal = line totals, tax = tax amount in cents
+        DROP TRIGGER IF EXISTS rollup_order_paid;
+
+        CREATE TRIGGER rollup_order_paid
+        AFTER UPDATE OF order_status ON Order_Cart
+        FOR EACH ROW
+        WHEN NEW.order_status = 11 AND OLD.order_status <> 11
+        BEGIN
+            INSERT INTO Sales_Rollup (grain, period, product_id, category_id, username, service_area_id,
+                                      quantity, subtotal, tax, order_count)
+            SELECT g.grain, g.period, op.product_id, COALESCE(p.category_id, 0),
+                   COALESCE(NEW.username, ''), NEW.service_area_id,
+                   SUM(op.product_quantity), SUM(op.line_total),
+                   SUM(op.line_total * op.tax_rate / 100.0), 1
+            FROM Order_Product op
+            LEFT JOIN Product p ON p.product_id = op.product_id
+            CROSS JOIN (SELECT 'day' AS grain, date(CURRENT_TIMESTAMP) AS period
+                        UNION ALL
+                        SELECT 'hour', strftime('%Y-%m-%d %H:00:00', CURRENT_TIMESTAMP)) g
+            WHERE op.order_id = NEW.order_id AND op.product_id IS NOT NULL
+            GROUP BY g.grain, g.period, op.product_id, p.category_id
+            ON CONFLICT (grain, period, product_id, category_id, username, service_area_id) DO UPDATE SET
+                quantity = quantity + excluded.quantity,
+                subtotal = subtotal + excluded.subtotal,
+                tax = tax + excluded.tax,
+                order_count = order_count + 1;
+
+            INSERT INTO Sales_Rollup_Order (grain, period, username, service_area_id, order_count, revenue)
+            SELECT g.grain, g.period, COALESCE(NEW.username, ''), NEW.service_area_id, 1, COALESCE(NEW.total, 0)
+            FROM (SELECT 'day' AS grain, date(CURRENT_TIMESTAMP) AS period
+                  UNION ALL
+                  SELECT 'hour', strftime('%Y-%m-%d %H:00:00', CURRENT_TIMESTAMP)) g
+            WHERE true
+            ON CONFLICT (grain, period, username, service_area_id) DO UPDATE SET
+                order_count = order_count + 1,
+                revenue = revenue + excluded.revenue;
+        END;
+    """),
+
+    # 10: recompute the rollups from the snapshot columns
+    (10, _backfill_sales_rollup),
+
+    # 11: months of Order_History / Customer_History moved out to archive databases
+    (11, """
+        CREATE TABLE IF NOT EXISTS Archive_Month (
+            month TEXT PRIMARY KEY,  -- '2026-01'
+            path TEXT NOT NULL,
+            order_history_rows INTEGER NOT NULL DEFAULT 0,
+            customer_history_rows INTEGER NOT NULL DEFAULT 0,
+            archived_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        ) WITHOUT ROWID;
+    """),
+
+    # 12: per-cart idempotency key, so a retried "Place Order" can't insert the order twice
+    (12, """
+        ALTER TABLE Order_Cart ADD COLUMN idempotency_key TEXT;
+
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_order_cart_idempotency_key
+        ON Order_Cart(idempotency_key) WHERE idempotency_key IS NOT NULL;
+    """),
+
+    # 13: rollup tax in whole cents, rounded per order, product and rate (checkout
+    # rounds per order and rate; migration 19 brings the rollups in line)
+    (13, """
+        DROP TRIGGER IF EXISTS rollup_order_paid;
+
+        CREATE TRIGGER rollup_order_paid
+        AFTER UPDATE OF order_status ON Order_Cart
+        FOR EACH ROW
+        WHEN NEW.order_status = 11 AND OLD.order_status <> 11
+        BEGIN
+            INSERT INTO Sales_Rollup (grain, period, product_id, category_id, username, service_area_id,
+                                      quantity, subtotal, tax, order_count)
+            SELECT g.grain, g.period, l.product_id, COALESCE(p.category_id, 0),
+                   COALESCE(NEW.username, ''), NEW.service_area_id,
+                   SUM(l.quantity), SUM(l.subtotal), SUM(l.tax), 1
+            FROM (SELECT op.product_id, SUM(op.product_quantity) AS quantity, SUM(op.line_total) AS subtotal,
+                         (SUM(op.line_total) * CAST(round(COALESCE(op.tax_rate, 4.712) * 1000) AS INTEGER)
+                          + 50000) / 100000 AS tax
+                  FROM Order_Product op
+                  WHERE op.order_id = NEW.order_id AND op.product_id IS NOT NULL
+                  GROUP BY op.product_id, op.tax_rate) l
+            LEFT JOIN Product p ON p.product_id = l.product_id
+            CROSS JOIN (SELECT 'day' AS grain, date(CURRENT_TIMESTAMP) AS period
+                        UNION ALL
+                        SELECT 'hour', strftime('%Y-%m-%d %H:00:00', CURRENT_TIMESTAMP)) g
+            GROUP BY g.grain, g.period, l.product_id, p.category_id
+            ON CONFLICT (grain, period, product_id, category_id, username, service_area_id) DO UPDATE SET
+                quantity = quantity + excluded.quantity,
+                subtotal = subtotal + excluded.subtotal,
+                tax = tax + excluded.tax,
+                order_count = order_count + 1;
+
+            INSERT INTO Sales_Rollup_Order (grain, period, username, service_area_id, order_count, revenue)
+            SELECT g.grain, g.period, COALESCE(NEW.username, ''), NEW.service_area_id, 1, COALESCE(NEW.total, 0)
+            FROM (SELECT 'day' AS grain, date(CURRENT_TIMESTAMP) AS period
+                  UNION ALL
+                  SELECT 'hour', strftime('%Y-%m-%d %H:00:00', CURRENT_TIMESTAMP)) g
+            WHERE true
+            ON CONFLICT (grain, period, username, service_area_id) DO UPDATE SET
+                order_count = order_count + 1,
+                revenue = revenue + excluded.revenue;
+        END;
+    """),
+
+    # 14: recompute the open months' rollups with the cent-rounded tax
+    (14, _backfill_sales_rollup),
+
+    # 15: open orders (10 unpaid, 11 paid, 12 ready) indexed apart from the delivered
+    # ones, so the boards stay fast however many orders pile up at 13. Queries must
+    # repeat the predicate (utils.database.OPEN_ORDERS) for SQLite to use it.
+    (15, """
+        CREATE INDEX IF NOT EXISTS idx_order_cart_open_status
+        ON Order_Cart(order_status) WHERE order_status < 13;
+    """),
+
+    # 16: status moves (utils.order_state) logged as compact Order_Event rows; Order_History
+    # keeps full copies only when an order is paid or its owner/amounts change, not on
+    # every kitchen/delivery tap or tip edit
+    (16, """
+        CREATE TABLE IF NOT EXISTS Order_Event (
+            order_id INTEGER NOT NULL,
+            from_status INTEGER,
+            to_status INTEGER NOT NULL,
+            timestamp DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+        );
+
+        CREATE INDEX IF NOT EXISTS idx_order_event_order_id
+        ON Order_Event(order_id);
+
+        CREATE INDEX IF NOT EXISTS idx_order_event_timestamp_status
+        ON Order_Event(timestamp, to_status, order_id);
+
+        DROP TRIGGER IF EXISTS log_order_update;
+
+        CREATE TRIGGER log_order_update
+        AFTER UPDATE ON Order_Cart
+        FOR EACH ROW
+        WHEN (NEW.order_status = 11 AND OLD.order_status <> 11)
+            OR NEW.username IS NOT OLD.username
+            OR NEW.subtotal IS NOT OLD.subtotal
+            OR NEW.total IS NOT OLD.total
+        BEGIN
+            INSERT INTO Order_History (order_id, order_status, username, subtotal, total, timestamp)
+            VALUES (NEW.order_id, NEW.order_status, NEW.username, NEW.subtotal, NEW.total, CURRENT_TIMESTAMP);
+        END;
+    """),
+
+    # 17: order lifecycle facts for speed-of-service reports (utils/lifecycle.py): each paid
+    # line with its station, stamped (UTC) as the order is paid, confirmed and delivered
+    (17, """
+        CREATE TABLE IF NOT EXISTS Order_Lifecycle (
+            order_product_id INTEGER PRIMARY KEY,
+            order_id INTEGER NOT NULL,
+            product_id INTEGER NOT NULL,
+            workcenter_id INTEGER,  -- routed when paid, like the kitchen tickets
+            quantity INTEGER NOT NULL DEFAULT 0,
+            created_at DATETIME,
+            paid_at DATETIME NOT NULL,
+            ready_at DATETIME,
+            delivered_at DATETIME
+        );
+
+        CREATE INDEX IF NOT EXISTS idx_order_lifecycle_order_id
+        ON Order_Lifecycle(order_id);
+
+        CREATE INDEX IF NOT EXISTS idx_order_lifecycle_paid_at
+        ON Order_Lifecycle(paid_at);
+
+        CREATE TRIGGER IF NOT EXISTS lifecycle_order_paid
+        AFTER INSERT ON Order_Event
+        FOR EACH ROW
+        WHEN NEW.to_status = 11
+        BEGIN
+            INSERT OR IGNORE INTO Order_Lifecycle (order_product_id, order_id, product_id, workcenter_id,
+                                                   quantity, created_at, paid_at)
+            SELECT op.order_product_id, op.order_id, op.product_id,
+                   COALESCE(rp.workcenter_id, rc.workcenter_id, (SELECT MIN(workcenter_id) FROM Workcenter)),
+                   op.product_quantity, datetime(oc.created_at, 'utc'), NEW.timestamp
+            FROM Order_Product op
+            JOIN Order_Cart oc ON oc.order_id = op.order_id
+            LEFT JOIN Product p ON p.product_id = op.product_id
+            LEFT JOIN Workcenter_Route rp ON rp.product_id = op.product_id
+            LEFT JOIN Workcenter_Route rc ON rc.category_id = p.category_id
+            WHERE op.order_id = NEW.order_id AND op.product_id IS NOT NULL;
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS lifecycle_order_ready
+        AFTER INSERT ON Order_Event
+        FOR EACH ROW
+        WHEN NEW.to_status = 12
+        BEGIN
+            UPDATE Order_Lifecycle SET ready_at = NEW.timestamp WHERE order_id = NEW.order_id;
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS lifecycle_order_delivered
+        AFTER INSERT ON Order_Event
+        FOR EACH ROW
+        WHEN NEW.to_status = 13
+        BEGIN
+            UPDATE Order_Lifecycle SET delivered_at = NEW.timestamp WHERE order_id = NEW.order_id;
+        END;
+    """),
+
+    # 18: lifecycle facts for the orders already in history
+    (18, _backfill_order_lifecycle),
+
+    # 19: rollup tax rounded once per order and rate like checkout, and spread over the
+    # order's products by largest remainder; the trigger comes from utils/rollups.py so
+    # it shares the rebuild's query. Recomputes the open months.
+    (19, _recreate_rollup_trigger),
+
+    # 20: kitchen readiness per station. A KDS screen bound to one workcenter confirms only
+    # its part of an order; the order moves to 12 once every station it is routed to has
+    # (utils.order_state.confirm_station)
+    (20, """
+        CREATE TABLE IF NOT EXISTS Order_Station_Ready (
+            order_id INTEGER NOT NULL,
+            workcenter_id INTEGER NOT NULL,
+            ready_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (order_id, workcenter_id)
+        ) WITHOUT ROWID;
+
+        CREATE TRIGGER IF NOT EXISTS feed_order_station_ready_insert AFTER INSERT ON Order_Station_Ready
+        BEGIN UPDATE Change_Feed SET version = version + 1 WHERE feed = 'orders'; END;
+    """),
+]
+
+def migrate(conn):
+    """Apply pending migrations; returns the resulting schema version."""
+    version = conn.execute('PRAGMA user_version').fetchone()[0]
+    for target, script in MIGRATIONS:
+        if target <= version:
+            continue
+        try:
+            if callable(script):
+                conn.execute('BEGIN IMMEDIATE')
+                script(conn)
+                conn.execute(f'PRAGMA user_version = {target}')
+                conn.commit()
+            else:
+                conn.executescript(f"BEGIN IMMEDIATE;\n{script}\nPRAGMA user_version = {target};\nCOMMIT;")
+        except Exception:
+            if conn.in_transaction:
+                conn.rollback()
+            raise
+        version = target
+    return version
@@ -1,10 +1,15 @@
 import streamlit as st
+from utils.profiler import phase
 
 def load_css():
     """
     Loads compact CSS styles for the Streamlit application.
     Buttons are smaller, spacing is condensed, and layout is tighter.
     """
+    with phase('load_css'):
+        _load_css()
+
+def _load_css():
     st.markdown("""
     <style>
     :root {
@@ -2,7 +2,8 @@ import streamlit as st
 import streamlit.components.v1 as components
 import base64
 import datetime
-import socket
+from utils.printing import submit_print
+from utils.pricing import format_rate
 
 # # Format price from integer to dollar format
 # def format_price(price_cents):
@@ -34,6 +35,14 @@ def format_timestamp(timestamp_str):
     
 #     return amounts
 
+# Register this browser session is bound to (?register=2); defaults to register 1.
+# Kept in session state so it survives st.switch_page between POS pages.
+def get_register_id():
+    register_id = st.query_params.get("register")
+    if register_id:
+        st.session_state.register_id = str(register_id)
+    return st.session_state.get("register_id", "1")
+
 # Format price helper
 def format_price(cents):
     return f"${cents / 100:.2f}"
@@ -81,53 +90,50 @@ def hide_sidebar():
     """, unsafe_allow_html=True)
 
 
-# Printer IP and port
-PRINTER_IP = "192.168.0.41"
-PRINTER_PORT = 9100  # Standard raw printing port
+# Build the ESC/POS receipt for orders priced by utils.pricing.price_orders
+def format_receipt(orders, totals):
+    receipt_lines = []
+
+    # Items
+    for order_id, order in orders.items():
+        for item in order['items']:
+            # Main product line
+            receipt_lines.append(f"{item['description']}\n")
+            receipt_lines.append(f"  Quantity: {item['quantity']}\n")
+            receipt_lines.append(f"  Price: {format_price(item['base_price'])}\n")
+
+            # Modifiers
+            if item['modifiers']:
+                receipt_lines.append("  Modifiers:\n")
+                for mod in item['modifiers']:
+                    receipt_lines.append(f"    - {mod['description']}: +{format_price(mod['price'] or 0)}\n")
+                receipt_lines.append(
+                    f"  Item Price w/ Modifiers: {format_price(item['base_price'] + item['modifier_total'])}\n"
+                )
+
+            receipt_lines.append(f"  Item Total: {format_price(item['item_total'])}\n")
+            receipt_lines.append("-" * 50 + "\n")
+
+        receipt_lines.append(f"Order ID: {order_id % 100}\n")
+        receipt_lines.append(f"Order Total: {format_price(order['total'])}\n")
+        receipt_lines.append("-" * 50 + "\n")
 
-def print_receipt(orders, subtotal, tax=45):
+    # Payment summary
+    receipt_lines.append("\n")
+    receipt_lines.append(f"Subtotal: {format_price(totals['subtotal'])}\n")
+    for units, tax in totals['tax_by_rate'].items():
+        receipt_lines.append(f"Tax ({format_rate(units)}): {format_price(tax)}\n")
+    receipt_lines.append(f"Total: {format_price(totals['total'])}\n")
+    receipt_lines.append("=" * 50 + "\n")
+
+    # Cut paper command (ESC/POS)
+    return "".join(receipt_lines).encode("utf-8") + b"\x1dV\x00"
+
+# Hand the receipt to the print spooler; returns the job id (or False) without
+# waiting for the printer. Track it with utils.printing.get_print_status.
+def print_receipt(orders, totals, printer='receipt', **meta):
     try:
-        # Connect to printer
-        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        sock.connect((PRINTER_IP, PRINTER_PORT))
-        receipt_lines = []
-        
-        # Items
-        for order_id, items in orders.items():
-            for item in items:
-                # Main product line
-                receipt_lines.append(f"{item['description']}\n")
-                receipt_lines.append(f"  Quantity: {item['quantity']}\n")
-                receipt_lines.append(f"  Price: {format_price(item['base_price'])}\n")
-                
-                # Modifiers
-                if item['modifiers']:
-                    receipt_lines.append("  Modifiers:\n")
-                    for mod in item['modifiers']:
-                        receipt_lines.append(f"    - {mod['description']}: +{format_price(mod['price'])}\n")
-                    receipt_lines.append(
-                        f"  Item Price w/ Modifiers: {format_price(item['base_price'] + item['modifier_total'])}\n"
-                    )
-                
-                receipt_lines.append(f"  Item Total: {format_price(item['item_total'])}\n")
-                receipt_lines.append("-" * 50 + "\n")
-            
-            # Payment summary
-            receipt_lines.append("\n")
-            receipt_lines.append(f"Order ID: {'order_id'}%100 \n")
-            receipt_lines.append(f"Subtotal: {format_price(subtotal)}\n")
-            receipt_lines.append(f"Tax: {format_price(tax)}\n")
-            receipt_lines.append("=" * 50 + "\n")
-     
-        # Convert to bytes
-        receipt_data = "".join(receipt_lines).encode("utf-8")
-        
-        # Send receipt data
-        sock.sendall(receipt_data)
-        
-        # Cut paper command (ESC/POS)
-        sock.sendall(b"\x1dV\x00")    
-        return True
+        return submit_print(printer, format_receipt(orders, totals), **meta)
     except Exception as e:
         st.error(f"Error saving receipt: {e}")
-        return False
\ No newline at end of file
+        return False
@@ -0,0 +1,138 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from utils.database import get_pool
+from utils import events
+from utils.profiler import phase
+
+
+class WriteQueue:
+    """Single-writer service: every queued mutation runs on the pool's writer connection.
+
+    The worker thread drains whatever is queued (up to max_batch, waiting at most
+    max_delay seconds after the first job) and runs it as one transaction (group
+    commit). Each job gets its own SAVEPOINT, so one failing job is rolled back
+    and reported on its future without discarding the rest of the batch.
+    Events a job emits (utils.events.emit) are published only once it commits.
+    """
+
+    def __init__(self, max_batch=64, max_delay=0.005):
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self.stats = {
+            'jobs': 0,
+            'failed_jobs': 0,
+            'batches': 0,
+            'largest_batch': 0,
+            'commit_ms_total': 0.0,
+        }
+
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="pos-writer", daemon=True)
+                self._thread.start()
+
+    def submit(self, fn, *args, **kwargs):
+        """Queue fn(conn, *args, **kwargs); returns a Future with fn's result."""
+        if threading.current_thread() is self._thread:
+            # Waiting on a future from inside a job would deadlock the writer
+            raise RuntimeError("submit() called from the writer thread; call the function directly")
+        future = Future()
+        self._ensure_started()
+        self._queue.put((future, fn, args, kwargs))
+        return future
+
+    def _collect_batch(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining <= 0:
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+            # Skip jobs whose callers already gave up
+            batch = [job for job in batch if job[0].set_running_or_notify_cancel()]
+            if batch:
+                self._run_batch(batch)
+
+    def _run_batch(self, batch):
+        outcomes = []
+        started = time.monotonic()
+        try:
+            with get_pool().writer() as conn:
+                for future, fn, args, kwargs in batch:
+                    conn.execute('SAVEPOINT write_job')
+                    events.begin_deferred()
+                    try:
+                        result = fn(conn, *args, **kwargs)
+                    except Exception as e:
+                        events.end_deferred()
+                        conn.execute('ROLLBACK TO write_job')
+                        conn.execute('RELEASE write_job')
+                        outcomes.append((future, None, e, []))
+                    else:
+                        conn.execute('RELEASE write_job')
+                        outcomes.append((future, result, None, events.end_deferred()))
+        except Exception as e:
+            events.end_deferred()
+            # Commit (or BEGIN) failed: nothing in this batch was written
+            for future, _, _, _ in batch:
+                future.set_exception(e)
+            self.stats['failed_jobs'] += len(batch)
+            return
+
+        self.stats['batches'] += 1
+        self.stats['jobs'] += len(batch)
+        self.stats['largest_batch'] = max(self.stats['largest_batch'], len(batch))
+        self.stats['commit_ms_total'] += (time.monotonic() - started) * 1000
+        for future, result, error, emitted in outcomes:
+            if error is None:
+                events.publish_all(emitted)
+                future.set_result(result)
+            else:
+                self.stats['failed_jobs'] += 1
+                future.set_exception(error)
+
+    def metrics(self):
+        snapshot = dict(self.stats)
+        snapshot['queued'] = self._queue.qsize()
+        snapshot['avg_batch'] = snapshot['jobs'] / snapshot['batches'] if snapshot['batches'] else 0
+        return snapshot
+
+
+_write_queue = None
+_write_queue_lock = threading.Lock()
+
+def get_write_queue():
+    """Process-wide write queue shared by every session."""
+    global _write_queue
+    if _write_queue is None:
+        with _write_queue_lock:
+            if _write_queue is None:
+                _write_queue = WriteQueue()
+    return _write_queue
+
+# Queue a mutation; fn receives the writer connection as its first argument
+def submit_write(fn, *args, **kwargs):
+    return get_write_queue().submit(fn, *args, **kwargs)
+
+# Queue a mutation and wait for it to commit
+def run_write(fn, *args, timeout=10, **kwargs):
+    with phase('write_wait'):
+        return submit_write(fn, *args, **kwargs).result(timeout=timeout)